@@ -0,0 +1,195 @@
+import os
+import glob
+import numbers
+import threading
+import pandas as pd
+
+from esquema_microdados import harmonizar_colunas
+from armazenamento_colunar import ler_particao, pasta_colunar_ies, salvar_particao
+
+# Armazém das planilhas de trajetória, uma linha por versão de
+# (curso, coorte, ano de referência), particionado pela coorte:
+#   DADOS_ES_UFRJ/colunar/trajetoria/ingresso=2015/parte-0.parquet
+#
+# Janelas publicadas pelo INEP que se sobrepõem (ex: 2016_2024 e, no ano
+# seguinte, 2016_2025) trazem as mesmas linhas: uma linha idêntica é guardada
+# uma só vez e 'janelas' lista todas as janelas que a trouxeram. Se uma
+# republicação revisar os números, as duas versões ficam guardadas, de modo
+# que qualquer janela pode ser reconstruída exatamente.
+CHAVES_COORTE = ('CO_CURSO', 'NU_ANO_INGRESSO', 'NU_ANO_REFERENCIA')
+COLUNA_JANELAS = 'janelas'
+COLUNA_HASH = 'hash_linha'
+SEPARADOR_JANELAS = ';'
+
+# Duas janelas da mesma coorte podem ser incorporadas por threads diferentes do pipeline
+_trava_armazem = threading.Lock()
+
+
+def _ordem_janela(janela):
+    """Janelas mais recentes (maior ano final) ganham; ex: '2016-2025' -> 20252016."""
+    inicio, fim = janela.split('-')
+    return int(fim) * 10000 + int(inicio)
+
+
+def _limites_janela(janela):
+    inicio, fim = janela.split('-')
+    return int(inicio), int(fim)
+
+
+def _texto_canonico(serie):
+    """
+    Cada valor como texto, com os números escritos sempre do mesmo jeito:
+    100, 100.0 e um 100 numa coluna 'object' viram '100'. O harmonizar_colunas
+    só converte uma coluna para inteiro quando todos os valores da janela são
+    inteiros, então o mesmo valor pode chegar como int numa janela e como
+    float em outra.
+    """
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.astype('string')
+    if pd.api.types.is_numeric_dtype(serie):
+        numeros = serie.astype('Float64')
+    elif serie.dtype == object:
+        # Planilhas trazem colunas com números e textos misturados; só os números são reescritos
+        e_numero = serie.map(lambda valor: isinstance(valor, numbers.Number) and not isinstance(valor, bool))
+        if not e_numero.any():
+            return serie.astype('string')
+        numeros = pd.to_numeric(serie.where(e_numero), errors='coerce').astype('Float64')
+    else:
+        return serie.astype('string')
+    inteiros = numeros.notna() & (numeros == numeros.round())
+    texto = serie.astype('string').mask(numeros.notna(), numeros.astype('string'))
+    return texto.mask(inteiros, numeros.where(inteiros).astype('Int64').astype('string'))
+
+
+def hash_linhas(df):
+    """
+    Hash do conteúdo de cada linha (fora as chaves), independente da ordem
+    das colunas, de o número ter vindo como 14323 ou 14323.0 e de uma coluna
+    ausente ou nula (as janelas nem sempre têm as mesmas colunas).
+    """
+    colunas = sorted(coluna for coluna in df.columns
+                     if coluna not in CHAVES_COORTE and coluna not in (COLUNA_JANELAS, COLUNA_HASH))
+    canonico = pd.Series('', index=df.index, dtype='string')
+    for coluna in colunas:
+        texto = _texto_canonico(df[coluna])
+        canonico += (f'{coluna}=' + texto + '\x1f').fillna('')
+    return pd.util.hash_pandas_object(canonico, index=False).astype('uint64')
+
+
+def _tem_janela(serie_janelas, janela):
+    return serie_janelas.str.split(SEPARADOR_JANELAS).apply(lambda janelas: janela in janelas)
+
+
+def _remover_janela(serie_janelas, janela):
+    return serie_janelas.str.split(SEPARADOR_JANELAS).apply(
+        lambda janelas: SEPARADOR_JANELAS.join(j for j in janelas if j != janela))
+
+
+def incorporar_janela(df_janela, janela, co_ies, pasta_base='.', metadados=None):
+    """
+    Faz o upsert de uma janela de trajetória no armazém da IES e devolve
+    ({'identicas': n, 'novas': n, 'revisadas': n}, [partições gravadas]).
+    Linhas idênticas a uma já guardada só ganham a janela na lista; linhas
+    com chave nova são inseridas; linhas cuja chave já existe com outros
+    valores entram como uma nova versão ('revisadas'). Reincorporar a mesma
+    janela substitui o que ela tinha trazido antes.
+    """
+    novos = harmonizar_colunas(df_janela).dropna(subset=list(CHAVES_COORTE))
+    novos = novos.astype({chave: 'int64' for chave in CHAVES_COORTE})
+    novos[COLUNA_HASH] = hash_linhas(novos)
+    novos[COLUNA_JANELAS] = janela
+
+    with _trava_armazem:
+        return _incorporar(novos, janela, co_ies, pasta_base, metadados)
+
+
+def _incorporar(novos, janela, co_ies, pasta_base, metadados):
+    estatisticas = {'identicas': 0, 'novas': 0, 'revisadas': 0}
+    caminhos = []
+    for ingresso, novos_coorte in novos.groupby('NU_ANO_INGRESSO', sort=True):
+        atual = ler_particao(co_ies, 'trajetoria', ingresso, pasta_base)
+        if atual is None:
+            atual = novos_coorte.iloc[0:0]
+        else:
+            atual[COLUNA_JANELAS] = _remover_janela(atual[COLUNA_JANELAS], janela)
+            atual = atual[atual[COLUNA_JANELAS] != ''].copy()
+            # Recalculado: a partição pode ter sido gravada com outra regra de hash ou outros tipos de coluna
+            atual[COLUNA_HASH] = hash_linhas(atual)
+
+        chave_versao = list(CHAVES_COORTE) + [COLUNA_HASH]
+        indice_atual = pd.MultiIndex.from_frame(atual[chave_versao])
+        indice_novos = pd.MultiIndex.from_frame(novos_coorte[chave_versao])
+        ja_guardadas = indice_novos.isin(indice_atual)
+
+        # Versões idênticas: só acrescenta a janela
+        trazidas_de_novo = indice_atual.isin(indice_novos[ja_guardadas])
+        atual.loc[trazidas_de_novo, COLUNA_JANELAS] += SEPARADOR_JANELAS + janela
+
+        inseridas = novos_coorte[~ja_guardadas]
+        chave_existente = pd.MultiIndex.from_frame(inseridas[list(CHAVES_COORTE)]).isin(
+            pd.MultiIndex.from_frame(atual[list(CHAVES_COORTE)]))
+        estatisticas['identicas'] += int(ja_guardadas.sum())
+        estatisticas['revisadas'] += int(chave_existente.sum())
+        estatisticas['novas'] += int((~chave_existente).sum())
+
+        particao = pd.concat([atual, inseridas], ignore_index=True).sort_values(list(CHAVES_COORTE))
+        caminhos.append(salvar_particao(particao, co_ies, 'trajetoria', ingresso, metadados=metadados,
+                                        pasta_base=pasta_base))
+    return estatisticas, caminhos
+
+
+def _ler_particoes(co_ies, pasta_base='.', ingressos=None):
+    pasta = pasta_colunar_ies(co_ies, 'trajetoria', pasta_base)
+    if ingressos is None:
+        prefixo = 'ingresso='
+        ingressos = sorted(int(os.path.basename(os.path.dirname(caminho))[len(prefixo):])
+                           for caminho in glob.glob(os.path.join(pasta, prefixo + '*', '*.parquet')))
+    partes = [ler_particao(co_ies, 'trajetoria', ingresso, pasta_base) for ingresso in ingressos]
+    partes = [parte for parte in partes if parte is not None]
+    return pd.concat(partes, ignore_index=True) if partes else None
+
+
+def versao_atual(df):
+    """Para cada chave, a versão trazida pela janela mais recente."""
+    ordem = df[COLUNA_JANELAS].str.split(SEPARADOR_JANELAS).apply(
+        lambda janelas: max(_ordem_janela(janela) for janela in janelas))
+    atual = df.assign(_ordem=ordem).sort_values('_ordem', kind='stable')
+    atual = atual.drop_duplicates(list(CHAVES_COORTE), keep='last').sort_values(list(CHAVES_COORTE))
+    return atual.drop(columns=['_ordem']).reset_index(drop=True)
+
+
+def ler_coortes(co_ies, pasta_base='.', ingressos=None, manter_controle=False):
+    """
+    Todas as coortes guardadas (ou só as de `ingressos`), sem duplicatas:
+    uma linha por (CO_CURSO, NU_ANO_INGRESSO, NU_ANO_REFERENCIA), na versão
+    mais recente. As colunas de controle ('janelas', 'hash_linha') só vêm
+    com `manter_controle`.
+    """
+    df = _ler_particoes(co_ies, pasta_base, ingressos)
+    if df is None:
+        return pd.DataFrame(columns=list(CHAVES_COORTE))
+    df = versao_atual(df)
+    return df if manter_controle else df.drop(columns=[COLUNA_JANELAS, COLUNA_HASH])
+
+
+def reconstruir_janela(janela, co_ies, pasta_base='.'):
+    """
+    Devolve exatamente as linhas que a janela 'AAAA-AAAA' trouxe (como na
+    planilha original, sem as colunas de controle), ou um DataFrame vazio se
+    ela nunca foi incorporada.
+    """
+    inicio, fim = _limites_janela(janela)
+    df = _ler_particoes(co_ies, pasta_base, range(inicio, fim + 1))
+    if df is None:
+        return pd.DataFrame(columns=list(CHAVES_COORTE))
+    df = df[_tem_janela(df[COLUNA_JANELAS], janela)]
+    return df.drop(columns=[COLUNA_JANELAS, COLUNA_HASH]).reset_index(drop=True)
+
+
+def janelas_incorporadas(co_ies, pasta_base='.'):
+    """Janelas presentes no armazém, da mais antiga para a mais recente."""
+    df = _ler_particoes(co_ies, pasta_base)
+    if df is None:
+        return []
+    janelas = set(SEPARADOR_JANELAS.join(df[COLUNA_JANELAS].unique()).split(SEPARADOR_JANELAS))
+    return sorted(janelas, key=_ordem_janela)
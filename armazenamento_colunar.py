@@ -0,0 +1,149 @@
+import os
+import json
+import glob
+import time
+import pandas as pd
+
+from instituicoes import pasta_raiz_ies
+
+# O pyarrow (Parquet) é opcional: sem ele, só os CSVs são gravados
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Formatos gravados pelos extratores. O CSV continua sendo gerado por compatibilidade.
+FORMATOS_SAIDA_PADRAO = ('csv', 'parquet')
+
+# Layout (uma pasta por fonte, partições no estilo Hive):
+#   DADOS_ES_UFRJ/colunar/censo/ano=2022/parte-0.parquet
+#   DADOS_ES_UFRJ/colunar/trajetoria/ingresso=2015/parte-0.parquet
+#   DADOS_ES_UFRJ/colunar/painel/ano=2022/parte-0.parquet (ver painel_cursos)
+# A trajetória é o armazém de coortes deduplicado (ver armazem_coortes), e não
+# uma cópia por janela publicada.
+PASTA_COLUNAR = 'colunar'
+PARTICOES = {
+    'censo': 'ano',
+    'trajetoria': 'ingresso',
+    'painel': 'ano',
+}
+NOME_ARQUIVO_PARTICAO = 'parte-0.parquet'
+COMPRESSAO_PADRAO = 'zstd'
+
+_aviso_pyarrow_emitido = False
+
+
+def formatos_disponiveis(formatos=FORMATOS_SAIDA_PADRAO):
+    """Remove 'parquet' de `formatos` (com um aviso, uma única vez) se o pyarrow não estiver instalado."""
+    global _aviso_pyarrow_emitido
+    formatos = tuple(formatos)
+    if 'parquet' in formatos and pa is None:
+        if not _aviso_pyarrow_emitido:
+            print("   AVISO: pyarrow não instalado; os dados serão salvos só em CSV.")
+            _aviso_pyarrow_emitido = True
+        formatos = tuple(formato for formato in formatos if formato != 'parquet')
+    return formatos
+
+
+def _tipo_particao(nome):
+    return pa.int16() if nome in ('ano', 'ingresso') else pa.string()
+
+
+def pasta_colunar_ies(co_ies, fonte, pasta_base='.'):
+    return os.path.join(pasta_raiz_ies(co_ies, pasta_base), PASTA_COLUNAR, fonte)
+
+
+def caminho_particao(co_ies, fonte, valor, pasta_base='.'):
+    """Ex: DADOS_ES_UFRJ/colunar/censo/ano=2022/parte-0.parquet"""
+    return os.path.join(pasta_colunar_ies(co_ies, fonte, pasta_base), f'{PARTICOES[fonte]}={valor}',
+                        NOME_ARQUIVO_PARTICAO)
+
+
+def _tabela_arrow(df):
+    """
+    Converte o DataFrame para uma tabela Arrow. Categóricas viram texto (os
+    dicionários mudam de um ano para outro) e colunas 'object' com valores
+    mistos, comuns nas planilhas de trajetória, também.
+    """
+    df = df.copy()
+    df.columns = [str(coluna) for coluna in df.columns]
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            df[coluna] = serie.astype('string')
+        elif serie.dtype == object:
+            try:
+                pa.array(serie, from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                df[coluna] = serie.astype('string')
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def salvar_particao(df, co_ies, fonte, valor, metadados=None, pasta_base='.', compressao=COMPRESSAO_PADRAO):
+    """
+    Grava o recorte de uma IES como uma partição Parquet (com estatísticas por
+    coluna, para que leituras com filtro pulem o que não interessa) e devolve
+    o caminho. `metadados` (ex: URL de origem, versão do extrator) vão para os
+    metadados do esquema, na chave 'dexinep'.
+    """
+    tabela = _tabela_arrow(df)
+    metadados_esquema = dict(tabela.schema.metadata or {})
+    metadados_esquema[b'dexinep'] = json.dumps({
+        'fonte': fonte,
+        PARTICOES[fonte]: str(valor),
+        'gerado_em': time.time(),
+        **(metadados or {}),
+    }, ensure_ascii=False).encode('utf-8')
+    tabela = tabela.replace_schema_metadata(metadados_esquema)
+
+    caminho = caminho_particao(co_ies, fonte, valor, pasta_base)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    caminho_temporario = caminho + '.tmp'
+    pq.write_table(tabela, caminho_temporario, compression=compressao, write_statistics=True)
+    os.replace(caminho_temporario, caminho)
+    return caminho
+
+
+def ler_particao(co_ies, fonte, valor, pasta_base='.'):
+    """Uma partição inteira como DataFrame, ou None se ela ainda não existir."""
+    caminho = caminho_particao(co_ies, fonte, valor, pasta_base)
+    if not os.path.exists(caminho):
+        return None
+    return pq.read_table(caminho).to_pandas()
+
+
+def ler_metadados_particao(caminho):
+    """Os metadados 'dexinep' gravados por salvar_particao, ou {}."""
+    metadados = pq.read_schema(caminho).metadata or {}
+    return json.loads(metadados.get(b'dexinep', b'{}'))
+
+
+def ler_colunar(co_ies, fonte, colunas=None, filtros=None, pasta_base='.'):
+    """
+    Lê o conjunto colunar de uma IES e fonte como um único DataFrame. Só as
+    `colunas` pedidas são lidas, e `filtros` (expressão do pyarrow ou lista no
+    formato do pq.read_table, ex: [('ano', '>=', 2015), ('CO_CURSO', '==', 12)])
+    pulam partições e grupos de linhas pelas estatísticas, sem ler tudo.
+    Colunas que só existem em alguns anos vêm como nulas nos demais.
+    """
+    if pa is None:
+        raise Exception("A leitura do formato colunar exige o pacote pyarrow.")
+
+    pasta = pasta_colunar_ies(co_ies, fonte, pasta_base)
+    arquivos = sorted(glob.glob(os.path.join(pasta, '*', '*.parquet')))
+    if not arquivos:
+        return pd.DataFrame(columns=colunas)
+
+    nome_particao = PARTICOES[fonte]
+    campo_particao = pa.field(nome_particao, _tipo_particao(nome_particao))
+    esquema = pa.unify_schemas([pq.read_schema(arquivo) for arquivo in arquivos], promote_options='permissive')
+    esquema = esquema.append(campo_particao)
+    particionamento = ds.partitioning(pa.schema([campo_particao]), flavor='hive')
+    dataset = ds.dataset(arquivos, schema=esquema, format='parquet', partitioning=particionamento,
+                         partition_base_dir=pasta)
+
+    if filtros is not None and not isinstance(filtros, ds.Expression):
+        filtros = pq.filters_to_expression(filtros)
+    return dataset.to_table(columns=colunas, filter=filtros).to_pandas()
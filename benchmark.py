@@ -0,0 +1,452 @@
+import os
+import re
+import sys
+import glob
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from resolvedor_links import PASTA_CACHE
+from instituicoes import CO_IES_UFRJ
+from servidor_local import ManipuladorInep, subir_servidor
+
+# Benchmark offline dos extratores: gera arquivos sintéticos no formato do
+# INEP (zip dos microdados com o CSV em dados/, latin-1 e ';'; zips de
+# trajetória com uma planilha de 8 linhas de preâmbulo), serve-os junto com
+# as páginas de listagem num servidor HTTP local e roda os extratores de
+# ponta a ponta, cada execução num processo e numa pasta de trabalho novos
+# (caches frios: downloads e esquema compilado do dicionário). As métricas
+# por etapa vêm do módulo metricas. Execuções com erro ou sem todas as saídas
+# contam como regressão.
+#
+#   python benchmark.py                      # roda e compara com a baseline
+#   python benchmark.py --salvar-baseline    # grava os números atuais como baseline
+#   python benchmark.py --escala 5 --repeticoes 5 --cenarios trajetoria --taxa-mb 2
+PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+PASTA_FIXTURES = os.path.join(PASTA_PROJETO, PASTA_CACHE, 'benchmark')
+CAMINHO_BASELINE = os.path.join(PASTA_PROJETO, 'benchmark_baseline.json')
+
+# Incremente quando o formato das fixtures mudar, para que sejam geradas de novo
+VERSAO_FIXTURES = 2
+
+CENARIOS = ('censo', 'censo_lote', 'trajetoria')
+ANO_FINAL = 2022
+
+# Tamanho das fixtures na escala 1.0 (o cadastro de cursos real tem dezenas de milhares de linhas)
+LINHAS_CENSO = 40_000
+LINHAS_TRAJETORIA = 30_000
+FRACAO_UFRJ = 0.01
+LINHAS_PREAMBULO_TRAJETORIA = 8
+
+COLUNAS_BASE_CENSO = ('NU_ANO_CENSO', 'CO_IES', 'CO_CURSO', 'NO_CURSO', 'QT_VG_TOTAL', 'QT_INSCRITO_TOTAL',
+                      'QT_ING', 'QT_MAT', 'QT_CONC')
+COLUNAS_TRAJETORIA = (
+    'CO_IES', 'NO_IES', 'TP_CATEGORIA_ADMINISTRATIVA', 'TP_ORGANIZACAO_ACADEMICA', 'CO_CURSO', 'NO_CURSO',
+    'CO_REGIAO', 'CO_UF', 'CO_MUNICIPIO', 'TP_GRAU_ACADEMICO', 'TP_MODALIDADE_ENSINO', 'CO_CINE_ROTULO',
+    'NO_CINE_ROTULO', 'CO_CINE_AREA_GERAL', 'NO_CINE_AREA_GERAL', 'NU_ANO_INGRESSO', 'NU_ANO_REFERENCIA',
+    'NU_PRAZO_INTEGRALIZACAO', 'NU_ANO_INTEGRALIZACAO', 'NU_PRAZO_ACOMPANHAMENTO', 'NU_ANO_MAXIMO_ACOMPANHAMENTO',
+    'QT_INGRESSANTE', 'QT_PERMANENCIA', 'QT_CONCLUINTE', 'QT_DESISTENCIA', 'QT_FALECIDO',
+    'TAP', 'TCA', 'TDA', 'TCAN', 'TADA',
+)
+NOMES_SINTETICOS = ('Administração', 'Física', 'Educação Física', 'Engenharia Elétrica', 'Ciências Contábeis',
+                    'Música', 'Pedagogia', 'Química')
+
+# Diferenças maiores que isto (além da tolerância relativa) contam como regressão
+TOLERANCIA_PADRAO = 0.2
+PISO_RUIDO_S = 0.05
+
+
+# --- Fixtures ---
+
+def _caminho_fixtures(parametros):
+    chave = '_'.join(f'{nome}-{valor}' for nome, valor in sorted(parametros.items()))
+    return os.path.join(PASTA_FIXTURES, re.sub(r'[^A-Za-z0-9_.-]', '', chave))
+
+
+def _colunas_censo(ano):
+    """As variáveis do dicionário de dados para o ano (nomes e tipos reais), com as básicas na frente."""
+    try:
+        from esquema_microdados import tipos_do_ano
+        do_dicionario = list(tipos_do_ano(ano))
+    except Exception as e:
+        print(f"   AVISO: dicionário de dados indisponível ({e}); usando só as colunas básicas.")
+        do_dicionario = []
+    return list(dict.fromkeys([*COLUNAS_BASE_CENSO, *do_dicionario]))
+
+
+def _valores_sinteticos(coluna, n, aleatorio):
+    if coluna.startswith(('NO_', 'SG_')):
+        return aleatorio.choice(np.array(NOMES_SINTETICOS, dtype=object), n)
+    if coluna.startswith('IN_'):
+        return aleatorio.integers(0, 2, n)
+    if coluna.startswith('TP_'):
+        return aleatorio.integers(1, 6, n)
+    if coluna.startswith('CO_'):
+        return aleatorio.integers(1, 9_999_999, n)
+    return aleatorio.integers(0, 100, n)
+
+
+def _gerar_zip_censo(caminho_zip, ano, linhas, aleatorio):
+    colunas = _colunas_censo(ano)
+    df = pd.DataFrame({coluna: _valores_sinteticos(coluna, linhas, aleatorio) for coluna in colunas})
+    df['NU_ANO_CENSO'] = ano
+    df['CO_IES'] = np.where(aleatorio.random(linhas) < FRACAO_UFRJ, CO_IES_UFRJ,
+                            aleatorio.integers(1, 25_000, linhas))
+    df.loc[0, 'CO_IES'] = CO_IES_UFRJ  # Ao menos um curso da UFRJ, mesmo nas escalas pequenas
+    df['CO_CURSO'] = np.arange(1, linhas + 1)
+    # Campos em branco, como nos microdados
+    for coluna in colunas[4:]:
+        df.loc[aleatorio.random(linhas) < 0.02, coluna] = None
+
+    pasta = f'microdados_censo_da_educacao_superior_{ano}'
+    with zipfile.ZipFile(caminho_zip, 'w', compression=zipfile.ZIP_DEFLATED) as zip_ref:
+        with zip_ref.open(f'{pasta}/dados/MICRODADOS_CADASTRO_CURSOS_{ano}.CSV', 'w', force_zip64=True) as f:
+            df.to_csv(f, sep=';', index=False, encoding='latin-1')
+        # Outro CSV em dados/ (o extrator deve preferir o de cursos) e um anexo
+        ies = df[['NU_ANO_CENSO', 'CO_IES']].drop_duplicates().head(2_000)
+        zip_ref.writestr(f'{pasta}/dados/MICRODADOS_ED_SUP_IES_{ano}.CSV',
+                         ies.to_csv(sep=';', index=False).encode('latin-1'))
+        zip_ref.writestr(f'{pasta}/leia-me/leia-me.txt', 'Arquivo sintético para benchmark.'.encode('latin-1'))
+
+
+def _gerar_zip_trajetoria(caminho_zip, inicio, fim, linhas, aleatorio):
+    import openpyxl
+
+    anos = list(range(inicio, fim + 1))
+    cursos = max(1, linhas // len(anos))
+    co_ies = np.where(aleatorio.random(cursos) < FRACAO_UFRJ, CO_IES_UFRJ, aleatorio.integers(1, 25_000, cursos))
+    co_ies[0] = CO_IES_UFRJ
+    ingressantes = aleatorio.integers(10, 200, cursos)
+
+    planilha = openpyxl.Workbook(write_only=True)
+    aba = planilha.create_sheet('Indicadores')
+    aba.append([f'Indicadores de Fluxo da Educação Superior {inicio}-{fim} (arquivo sintético)'])
+    for numero in range(LINHAS_PREAMBULO_TRAJETORIA - 2):
+        aba.append([f'Nota {numero + 1}: linha de preâmbulo.'])
+    aba.append([])
+    aba.append(list(COLUNAS_TRAJETORIA))
+    for curso in range(cursos):
+        permanencia = int(ingressantes[curso])
+        for ano in anos:
+            concluintes = int(aleatorio.integers(0, 3)) if ano - inicio >= 3 else 0
+            desistentes = int(aleatorio.integers(0, max(1, permanencia // 5)))
+            permanencia = max(0, permanencia - concluintes - desistentes)
+            aba.append([
+                int(co_ies[curso]), 'INSTITUIÇÃO SINTÉTICA', 1, 1, 100_000 + curso, NOMES_SINTETICOS[curso % 8],
+                3, 33, 3304557, 1, 1, '0533F01', 'Física', 5, 'Ciências naturais, matemática e estatística',
+                inicio, ano, 5, inicio + 4, 8, fim, int(ingressantes[curso]), permanencia, concluintes,
+                desistentes, 0, 80.0, 1.5, 18.5, 0.0, 18.5,
+            ])
+    nome = os.path.splitext(os.path.basename(caminho_zip))[0]
+    caminho_xlsx = caminho_zip[:-len('.zip')] + '.xlsx'
+    planilha.save(caminho_xlsx)
+    with zipfile.ZipFile(caminho_zip, 'w', compression=zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.write(caminho_xlsx, f'{nome}/{nome}.xlsx')
+    os.remove(caminho_xlsx)
+
+
+def gerar_fixtures(escala=1.0, anos_censo=2, janelas_trajetoria=3, semente=42):
+    """
+    Gera (ou reaproveita, se já existirem com os mesmos parâmetros) os zips
+    sintéticos e devolve o descritor {'pasta', 'censo': {ano: arquivo},
+    'trajetoria': {janela: arquivo}, 'bytes': {arquivo: tamanho}, ...}.
+    A mesma `semente` gera sempre os mesmos arquivos.
+    """
+    parametros = {'versao': VERSAO_FIXTURES, 'escala': escala, 'anos_censo': anos_censo,
+                  'janelas': janelas_trajetoria, 'semente': semente}
+    pasta = _caminho_fixtures(parametros)
+    caminho_descritor = os.path.join(pasta, 'fixtures.json')
+    try:
+        with open(caminho_descritor, 'r', encoding='utf-8') as f:
+            descritor = json.load(f)
+        if descritor.get('parametros') == parametros:
+            return descritor
+    except (OSError, ValueError):
+        pass
+
+    print(f"Gerando fixtures sintéticas em '{pasta}' (escala {escala})...")
+    shutil.rmtree(pasta, ignore_errors=True)
+    os.makedirs(pasta)
+    aleatorio = np.random.default_rng(semente)
+    descritor = {'parametros': parametros, 'pasta': pasta, 'censo': {}, 'trajetoria': {}, 'bytes': {}}
+
+    for ano in range(ANO_FINAL - anos_censo + 1, ANO_FINAL + 1):
+        nome = f'microdados_censo_da_educacao_superior_{ano}.zip'
+        _gerar_zip_censo(os.path.join(pasta, nome), ano, int(LINHAS_CENSO * escala), aleatorio)
+        descritor['censo'][str(ano)] = nome
+    # Janelas de tamanhos diferentes com o mesmo ano final, para passarem todas pelo pipeline
+    for inicio in range(ANO_FINAL - 9, ANO_FINAL - 9 + janelas_trajetoria):
+        nome = f'indicadores_trajetoria_educacao_superior_{inicio}_{ANO_FINAL}.zip'
+        _gerar_zip_trajetoria(os.path.join(pasta, nome), inicio, ANO_FINAL,
+                              int(LINHAS_TRAJETORIA * escala / janelas_trajetoria), aleatorio)
+        descritor['trajetoria'][f'{inicio}-{ANO_FINAL}'] = nome
+
+    for nome in [*descritor['censo'].values(), *descritor['trajetoria'].values()]:
+        descritor['bytes'][nome] = os.path.getsize(os.path.join(pasta, nome))
+    with open(caminho_descritor, 'w', encoding='utf-8') as f:
+        json.dump(descritor, f, ensure_ascii=False, indent=2)
+    return descritor
+
+
+# --- Servidor HTTP local ---
+
+PREFIXO_DOWNLOAD = '/download.inep.gov.br'
+
+
+def _paginas_listagem(descritor):
+    """HTML mínimo das páginas do Censo e da trajetória, com os links no formato das páginas reais."""
+    censo = ''.join(
+        f'<li><a href="{PREFIXO_DOWNLOAD}/microdados/{nome}">Microdados do Censo da Educação Superior {ano}</a></li>'
+        for ano, nome in sorted(descritor['censo'].items()))
+    trajetoria = ''.join(
+        f'<li><a href="{PREFIXO_DOWNLOAD}/informacoes_estatisticas/{nome}">{janela}</a></li>'
+        for janela, nome in sorted(descritor['trajetoria'].items()))
+    modelo = '<html><head><meta charset="utf-8"></head><body><ul>{}</ul></body></html>'
+    return {'/censo': modelo.format(censo).encode('utf-8'), '/trajetoria': modelo.format(trajetoria).encode('utf-8')}
+
+
+def servir_fixtures(descritor, taxa_mb=None):
+    """
+    Sobe o servidor local numa porta livre e devolve (servidor, url_base).
+    `taxa_mb` limita a vazão de cada conexão (MB/s), para simular a rede até o INEP.
+    """
+    arquivos = {}
+    for subpasta, nomes in (('microdados', descritor['censo'].values()),
+                            ('informacoes_estatisticas', descritor['trajetoria'].values())):
+        for nome in nomes:
+            arquivos[f'{PREFIXO_DOWNLOAD}/{subpasta}/{nome}'] = os.path.join(descritor['pasta'], nome)
+    manipulador = type('ManipuladorFixtures', (ManipuladorInep,), {
+        'paginas': _paginas_listagem(descritor),
+        'arquivos': arquivos,
+        'taxa': taxa_mb * 1024 ** 2 if taxa_mb else None,
+    })
+    return subir_servidor(manipulador)
+
+
+# --- Execução de um cenário (num processo filho) ---
+
+def _bytes_do_cenario(cenario, descritor):
+    nomes = descritor['trajetoria'].values() if cenario == 'trajetoria' else \
+        [descritor['censo'][str(ANO_FINAL)]] if cenario == 'censo' else descritor['censo'].values()
+    return sum(descritor['bytes'][nome] for nome in nomes)
+
+
+def _executar_cenario(cenario, url_base, descritor):
+    """Roda um cenário na pasta atual (vazia) e devolve os números da execução."""
+    import metricas
+    import resolvedor_links
+    import update_censo
+    import update_trajetoria
+
+    # As páginas do INEP passam a ser as do servidor local
+    resolvedor_links.URL_BASE_CENSO = update_censo.URL_BASE_CENSO = f'{url_base}/censo'
+    resolvedor_links.URL_BASE_TRAJETORIA = update_trajetoria.URL_BASE_TRAJETORIA = f'{url_base}/trajetoria'
+
+    registros = []
+    metricas.adicionar_hook(registros.append)
+    anos = sorted(descritor['censo'])
+    cronometro = time.perf_counter()
+    if cenario == 'censo':
+        update_censo.baixar_censo_superior_ufrj(str(ANO_FINAL))
+    elif cenario == 'censo_lote':
+        update_censo.baixar_censo_superior_ufrj(f'{anos[0]}-{anos[-1]}')
+    else:
+        update_trajetoria.baixar_e_processar_dados(str(ANO_FINAL))
+    duracao = time.perf_counter() - cronometro
+
+    # Os extratores imprimem os erros e seguem: confere se as saídas foram geradas
+    saidas = glob.glob(os.path.join('DADOS_ES_*', '*', '*.csv'))
+    esperadas = len(descritor['trajetoria']) if cenario == 'trajetoria' else \
+        1 if cenario == 'censo' else len(anos)
+    # O pico dos processos filhos (pool de filtros do modo em lote) também conta; os
+    # registros deles trazem o pico do processo filho inteiro em rss_pico_processo_mb
+    rss = [metricas.rss_pico_mb() or 0, metricas.rss_pico_mb(filhos=True) or 0]
+    return {
+        'cenario': cenario,
+        'duracao_s': duracao,
+        'bytes': _bytes_do_cenario(cenario, descritor),
+        'rss_pico_mb': max([*rss, *(r.get('rss_pico_processo_mb') or 0 for r in registros)]),
+        'saidas_csv': len(saidas),
+        'saidas_esperadas': esperadas,
+        'erros': [r['erro'] for r in registros if r.get('erro')],
+        'etapas': registros,
+    }
+
+
+def _rodar_em_processo(cenario, url_base, caminho_descritor, verboso=False):
+    pasta_trabalho = tempfile.mkdtemp(prefix=f'benchmark_{cenario}_')
+    caminho_saida = os.path.join(pasta_trabalho, 'resultado.json')
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--executar', cenario, '--url-base', url_base,
+             '--descritor', caminho_descritor, '--saida', caminho_saida],
+            cwd=pasta_trabalho, check=True,
+            stdout=None if verboso else subprocess.DEVNULL, stderr=None if verboso else subprocess.DEVNULL,
+        )
+        with open(caminho_saida, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(pasta_trabalho, ignore_errors=True)
+
+
+# --- Resumo, baseline e comparação ---
+
+def resumir(execucoes):
+    """Medianas das repetições de um cenário: tempo total, vazão, latência de cada etapa e pico de memória."""
+    duracao = statistics.median(e['duracao_s'] for e in execucoes)
+    por_etapa = {}
+    for execucao in execucoes:
+        soma = {}
+        for registro in execucao['etapas']:
+            if registro['etapa'] == 'perfil' or registro.get('duracao_s') is None:
+                continue
+            soma[registro['etapa']] = soma.get(registro['etapa'], 0.0) + registro['duracao_s']
+        for etapa, segundos in soma.items():
+            por_etapa.setdefault(etapa, []).append(segundos)
+    linhas_lidas = statistics.median(
+        sum(r.get('linhas_lidas') or 0 for r in e['etapas'] if r['etapa'] == 'ler') for e in execucoes)
+    return {
+        'repeticoes': len(execucoes),
+        'duracao_s': round(duracao, 4),
+        'mb_por_s': round(execucoes[0]['bytes'] / 1024 ** 2 / duracao, 2) if duracao else None,
+        'linhas_por_s': round(linhas_lidas / duracao) if duracao else None,
+        'rss_pico_mb': round(max(e['rss_pico_mb'] for e in execucoes), 1),
+        'etapas': {etapa: round(statistics.median(valores), 4) for etapa, valores in sorted(por_etapa.items())},
+        'falhas': sum(bool(e['erros']) or e['saidas_csv'] < e['saidas_esperadas'] for e in execucoes),
+    }
+
+
+def comparar(atual, baseline, tolerancia=TOLERANCIA_PADRAO):
+    """
+    Lista de (cenario, métrica, baseline, atual, variação, regressão?) para
+    tempo total, cada etapa e pico de memória. Um tempo só é regressão se
+    passar da tolerância relativa e de PISO_RUIDO_S em valor absoluto.
+    """
+    linhas = []
+    for cenario, resumo in atual.items():
+        base = baseline.get(cenario)
+        if not base:
+            continue
+        metricas_cenario = [('duracao_s', resumo['duracao_s'], base.get('duracao_s'), True),
+                            ('rss_pico_mb', resumo['rss_pico_mb'], base.get('rss_pico_mb'), False)]
+        metricas_cenario += [(f'etapa:{etapa}', valor, base.get('etapas', {}).get(etapa), True)
+                             for etapa, valor in resumo['etapas'].items()]
+        for nome, valor, valor_base, e_tempo in metricas_cenario:
+            if valor is None or not valor_base:
+                continue
+            variacao = valor / valor_base - 1
+            regressao = variacao > tolerancia and (not e_tempo or valor - valor_base > PISO_RUIDO_S)
+            linhas.append((cenario, nome, valor_base, valor, variacao, regressao))
+    return linhas
+
+
+def imprimir_resumo(resumos):
+    print("\nResultados (medianas):")
+    for cenario, resumo in resumos.items():
+        etapas = ', '.join(f'{etapa}={segundos:.3f}s' for etapa, segundos in resumo['etapas'].items())
+        falhas = f", {resumo['falhas']} execução(ões) com falha" if resumo['falhas'] else ''
+        print(f"   {cenario}: {resumo['duracao_s']:.3f} s, {resumo['mb_por_s']} MB/s, "
+              f"{resumo['linhas_por_s']} linhas/s, pico de RSS {resumo['rss_pico_mb']} MB{falhas}")
+        print(f"      etapas: {etapas}")
+
+
+def executar_benchmark(cenarios=CENARIOS, escala=1.0, repeticoes=3, anos_censo=2, janelas_trajetoria=3,
+                       taxa_mb=None, caminho_baseline=CAMINHO_BASELINE, salvar_baseline=False,
+                       tolerancia=TOLERANCIA_PADRAO, verboso=False):
+    """
+    Gera as fixtures, sobe o servidor local, roda cada cenário `repeticoes`
+    vezes (cada vez num processo e numa pasta novos), imprime o resumo e o
+    compara com a baseline. Devolve (resumos, regressoes); um cenário com
+    execuções que falharam entra em `regressoes` com a métrica 'falhas'.
+    """
+    descritor = gerar_fixtures(escala, anos_censo, janelas_trajetoria)
+    caminho_descritor = os.path.join(descritor['pasta'], 'fixtures.json')
+    servidor, url_base = servir_fixtures(descritor, taxa_mb)
+    parametros = {**descritor['parametros'], 'taxa_mb': taxa_mb}
+    try:
+        resumos = {}
+        for cenario in cenarios:
+            print(f"Rodando '{cenario}' ({repeticoes}x)...")
+            execucoes = [_rodar_em_processo(cenario, url_base, caminho_descritor, verboso) for _ in range(repeticoes)]
+            resumos[cenario] = resumir(execucoes)
+    finally:
+        servidor.shutdown()
+    imprimir_resumo(resumos)
+
+    # Uma execução que falhou (sem saídas, por exemplo) pode parecer mais rápida: nunca passa
+    falhas = [(cenario, 'falhas', 0, resumo['falhas'], None, True)
+              for cenario, resumo in resumos.items() if resumo['falhas']]
+    if falhas:
+        print(f"\nERRO: execuções com falha em {', '.join(linha[0] for linha in falhas)} "
+              f"(rode com --verboso para ver a saída dos extratores).")
+
+    if salvar_baseline:
+        if falhas:
+            print("A baseline não foi gravada.")
+            return resumos, falhas
+        with open(caminho_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'parametros': parametros, 'gerado_em': time.time(), 'cenarios': resumos}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"\nBaseline gravada em '{caminho_baseline}'.")
+        return resumos, []
+
+    try:
+        with open(caminho_baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        print("\nNenhuma baseline encontrada; use --salvar-baseline para criar uma.")
+        return resumos, falhas
+    if baseline.get('parametros') != parametros:
+        print(f"\nAVISO: a baseline foi gerada com outros parâmetros ({baseline.get('parametros')}); "
+              f"a comparação pode não ser justa.")
+
+    comparacao = comparar(resumos, baseline.get('cenarios', {}), tolerancia)
+    print(f"\nComparação com a baseline (tolerância {tolerancia:.0%}):")
+    for cenario, nome, valor_base, valor, variacao, regressao in comparacao:
+        print(f"   {'REGRESSÃO' if regressao else 'ok':>9}  {cenario:<11} {nome:<18} "
+              f"{valor_base:>10.3f} -> {valor:>10.3f} ({variacao:+.1%})")
+    regressoes = [linha for linha in comparacao if linha[5]]
+    return resumos, falhas + regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline dos extratores com fixtures sintéticas.")
+    parser.add_argument('--cenarios', nargs='+', choices=CENARIOS, default=list(CENARIOS))
+    parser.add_argument('--escala', type=float, default=1.0, help="multiplica o tamanho das fixtures")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--anos-censo', type=int, default=2, help="anos do Censo (cenário censo_lote)")
+    parser.add_argument('--janelas', type=int, default=3, help="janelas de trajetória")
+    parser.add_argument('--taxa-mb', type=float, default=None, help="limite de MB/s por conexão no servidor")
+    parser.add_argument('--baseline', default=CAMINHO_BASELINE)
+    parser.add_argument('--salvar-baseline', action='store_true')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO)
+    parser.add_argument('--verboso', action='store_true', help="mostra a saída dos extratores")
+    # Uso interno: execução de um cenário no processo filho
+    parser.add_argument('--executar', choices=CENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument('--url-base', help=argparse.SUPPRESS)
+    parser.add_argument('--descritor', help=argparse.SUPPRESS)
+    parser.add_argument('--saida', help=argparse.SUPPRESS)
+    argumentos = parser.parse_args()
+
+    if argumentos.executar:
+        with open(argumentos.descritor, 'r', encoding='utf-8') as f:
+            resultado = _executar_cenario(argumentos.executar, argumentos.url_base, json.load(f))
+        with open(argumentos.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, default=str)
+        sys.exit(0)
+
+    _, regressoes = executar_benchmark(
+        cenarios=argumentos.cenarios, escala=argumentos.escala, repeticoes=argumentos.repeticoes,
+        anos_censo=argumentos.anos_censo, janelas_trajetoria=argumentos.janelas, taxa_mb=argumentos.taxa_mb,
+        caminho_baseline=argumentos.baseline, salvar_baseline=argumentos.salvar_baseline,
+        tolerancia=argumentos.tolerancia, verboso=argumentos.verboso,
+    )
+    sys.exit(1 if regressoes else 0)
@@ -0,0 +1,407 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from resolvedor_links import PASTA_CACHE
+
+# Estrutura do cache:
+#   .cache_inep/downloads/indice/<sha1 da url>.json   metadados (ETag, Last-Modified, sha256...)
+#   .cache_inep/downloads/parciais/<sha1 da url>      download em andamento (retomável)
+#   .cache_inep/downloads/objetos/<sha256>            conteúdo, endereçado pelo hash
+PASTA_CACHE_DOWNLOADS = os.path.join(PASTA_CACHE, 'downloads')
+
+CHUNK_MINIMO = 256 * 1024
+CHUNK_MAXIMO = 8 * 1024 * 1024
+
+# Download segmentado: conexões paralelas por arquivo e tamanho dos segmentos
+CONEXOES_PADRAO = 4
+SEGMENTOS_POR_CONEXAO = 4
+TAMANHO_SEGMENTO_MINIMO = 4 * 1024 * 1024
+
+
+def _chave_url(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def _caminhos(url, pasta_cache):
+    chave = _chave_url(url)
+    return (os.path.join(pasta_cache, 'indice', chave + '.json'),
+            os.path.join(pasta_cache, 'parciais', chave))
+
+
+def _ler_json(caminho):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_json(caminho, dados):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    caminho_temporario = caminho + '.tmp'
+    with open(caminho_temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(caminho_temporario, caminho)
+
+
+def _calcular_chunk(tamanho_total):
+    """Chunk proporcional ao arquivo (~1/256 dele), entre 256 KB e 8 MB."""
+    if not tamanho_total:
+        return CHUNK_MINIMO
+    return max(CHUNK_MINIMO, min(CHUNK_MAXIMO, tamanho_total // 256))
+
+
+def _hash_arquivo(caminho):
+    hash_sha256 = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(CHUNK_MAXIMO), b''):
+            hash_sha256.update(bloco)
+    return hash_sha256
+
+
+def consultar_cache(url, pasta_cache=PASTA_CACHE_DOWNLOADS):
+    """Devolve os metadados em cache da URL (com 'caminho' do objeto), ou None."""
+    caminho_indice, _ = _caminhos(url, pasta_cache)
+    metadados = _ler_json(caminho_indice)
+    if not metadados or not os.path.exists(metadados.get('caminho', '')):
+        return None
+    return metadados
+
+
+def _remover_objeto_orfao(sha256, pasta_cache):
+    """Apaga um objeto que não é mais referenciado por nenhuma URL do índice."""
+    pasta_indice = os.path.join(pasta_cache, 'indice')
+    for nome in os.listdir(pasta_indice):
+        metadados = _ler_json(os.path.join(pasta_indice, nome))
+        if metadados and metadados.get('sha256') == sha256:
+            return
+    try:
+        os.remove(os.path.join(pasta_cache, 'objetos', sha256))
+    except OSError:
+        pass
+
+
+def criar_sessao(conexoes=CONEXOES_PADRAO):
+    """Session com um pool de conexões do tamanho de `conexoes`, reaproveitado entre os segmentos."""
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, conexoes))
+    sessao.mount('http://', adaptador)
+    sessao.mount('https://', adaptador)
+    return sessao
+
+
+def dividir_segmentos(tamanho_total, conexoes=CONEXOES_PADRAO):
+    """
+    Faixas de bytes [inicio, fim] (inclusive) que cobrem o arquivo. São
+    SEGMENTOS_POR_CONEXAO por conexão, para que uma conexão lenta não segure
+    o final do download, e nunca menores que TAMANHO_SEGMENTO_MINIMO.
+    """
+    tamanho = max(TAMANHO_SEGMENTO_MINIMO, -(-tamanho_total // (max(1, conexoes) * SEGMENTOS_POR_CONEXAO)))
+    return [[inicio, min(inicio + tamanho, tamanho_total) - 1] for inicio in range(0, tamanho_total, tamanho)]
+
+
+def _preallocar(caminho, tamanho_total):
+    with open(caminho, 'wb') as f:
+        if hasattr(os, 'posix_fallocate') and tamanho_total:
+            os.posix_fallocate(f.fileno(), 0, tamanho_total)
+        else:
+            f.truncate(tamanho_total)
+
+
+def _sondar(url, headers, sessao, em_cache, timeout):
+    """
+    Pede só o primeiro byte (revalidando a cópia em cache, se houver) e
+    devolve (status, cabeçalhos), ou None se a requisição falhar. 206 indica
+    que o servidor aceita Range e traz o tamanho total no Content-Range.
+    """
+    cabecalhos = dict(headers or {})
+    cabecalhos['Range'] = 'bytes=0-0'
+    if em_cache:
+        if em_cache.get('etag'):
+            cabecalhos['If-None-Match'] = em_cache['etag']
+        if em_cache.get('last_modified'):
+            cabecalhos['If-Modified-Since'] = em_cache['last_modified']
+    try:
+        with sessao.get(url, headers=cabecalhos, stream=True, timeout=timeout) as r:
+            return r.status_code, dict(r.headers)
+    except requests.exceptions.RequestException as e:
+        print(f"   AVISO: falha ao consultar o servidor ({e}); tentando o download em uma conexão.")
+        return None
+
+
+def _baixar_segmento(url, caminho, segmento, validador, headers, sessao, timeout, tentativas, alterado):
+    """
+    Baixa os bytes [inicio, fim] de `segmento` e os grava na mesma posição de
+    `caminho` (já preallocado). Uma falha retoma o segmento de onde parou.
+    Devolve os bytes transferidos, ou None se o arquivo mudou no servidor
+    (If-Range não bateu e veio o arquivo inteiro), sinalizado em `alterado`.
+    """
+    inicio, fim = segmento
+    posicao = inicio
+    transferidos = 0
+    for tentativa in range(tentativas):
+        if alterado.is_set():
+            return None
+        cabecalhos = dict(headers or {})
+        cabecalhos['Range'] = f'bytes={posicao}-{fim}'
+        if validador:
+            cabecalhos['If-Range'] = validador
+        try:
+            with sessao.get(url, headers=cabecalhos, stream=True, timeout=timeout) as r:
+                r.raise_for_status()
+                if r.status_code != 206:
+                    alterado.set()
+                    return None
+                with open(caminho, 'r+b') as f:
+                    f.seek(posicao)
+                    for chunk in r.iter_content(chunk_size=CHUNK_MINIMO):
+                        chunk = chunk[:fim + 1 - posicao]
+                        f.write(chunk)
+                        posicao += len(chunk)
+                        transferidos += len(chunk)
+                        if posicao > fim:
+                            break
+            if posicao > fim:
+                return transferidos
+            raise requests.exceptions.ConnectionError("Conexão encerrada antes do fim do segmento.")
+        except requests.exceptions.RequestException as e:
+            print(f"   FALHA no segmento {inicio}-{fim} (tentativa {tentativa + 1}/{tentativas}): {e}")
+            if tentativa < tentativas - 1:
+                time.sleep(min(2 ** tentativa, 30))
+    raise Exception(f"Não foi possível baixar os bytes {inicio}-{fim} após {tentativas} tentativas.")
+
+
+def _baixar_segmentado(url, caminho_parcial, estado_parcial, headers, sessao, conexoes, timeout, tentativas):
+    """
+    Baixa os segmentos ainda pendentes de `estado_parcial` em até `conexoes`
+    conexões, registrando cada segmento concluído (o download é retomável
+    entre execuções). Devolve os bytes transferidos, ou None se o arquivo
+    mudou no servidor no meio do caminho.
+    """
+    segmentos = estado_parcial['segmentos']
+    concluidos = set(estado_parcial.get('concluidos', []))
+    pendentes = [indice for indice in range(len(segmentos)) if indice not in concluidos]
+    validador = estado_parcial.get('etag') or estado_parcial.get('last_modified')
+    alterado = threading.Event()
+    trava = threading.Lock()
+    transferidos = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, min(conexoes, len(pendentes)))) as pool:
+        futuros = {pool.submit(_baixar_segmento, url, caminho_parcial, segmentos[indice], validador, headers,
+                               sessao, timeout, tentativas, alterado): indice
+                   for indice in pendentes}
+        erro = None
+        for futuro in as_completed(futuros):
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                # Os outros segmentos continuam e ficam registrados para a próxima execução
+                erro = erro or e
+                continue
+            if resultado is None:
+                continue
+            transferidos += resultado
+            with trava:
+                concluidos.add(futuros[futuro])
+                estado_parcial['concluidos'] = sorted(concluidos)
+                _gravar_json(caminho_parcial + '.json', estado_parcial)
+
+    if alterado.is_set():
+        return None
+    if erro:
+        raise erro
+    return transferidos
+
+
+def _descartar_parcial(caminho_parcial):
+    for caminho in (caminho_parcial, caminho_parcial + '.json'):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+def _usar_copia_em_cache(em_cache, caminho_indice):
+    print("   Arquivo inalterado no servidor (304); usando a cópia em cache.")
+    em_cache['verificado_em'] = time.time()
+    em_cache['bytes_ultima_execucao'] = 0
+    _gravar_json(caminho_indice, em_cache)
+    return em_cache['caminho']
+
+
+def obter_arquivo(url, headers=None, sessao=None, pasta_cache=PASTA_CACHE_DOWNLOADS,
+                  timeout=120, tentativas=5, conexoes=CONEXOES_PADRAO, sha256_esperado=None):
+    """
+    Devolve o caminho local de `url`, baixando apenas o necessário:
+
+    - se já estiver em cache, revalida com If-None-Match / If-Modified-Since
+      e, se o servidor responder 304, não transfere nada;
+    - se o servidor aceitar Range, divide o arquivo em segmentos e os baixa
+      em até `conexoes` conexões paralelas (de uma mesma Session), cada um
+      gravado na sua posição de um arquivo preallocado e com suas próprias
+      tentativas;
+    - senão, baixa em uma conexão, retomando um download parcial com Range
+      (e If-Range, para não emendar versões diferentes do arquivo);
+    - ao terminar, confere o tamanho (e o sha256, se `sha256_esperado` for
+      informado), guarda o conteúdo pelo seu sha256 e atualiza o índice.
+
+    Cada falha de rede retoma o download (ou o segmento) em vez de recomeçar do zero.
+    """
+    sessao = sessao or criar_sessao(conexoes)
+    caminho_indice, caminho_parcial = _caminhos(url, pasta_cache)
+    os.makedirs(os.path.dirname(caminho_parcial), exist_ok=True)
+    os.makedirs(os.path.join(pasta_cache, 'objetos'), exist_ok=True)
+
+    em_cache = consultar_cache(url, pasta_cache)
+    estado_parcial = _ler_json(caminho_parcial + '.json') or {}
+    bytes_transferidos = 0
+    tamanho_esperado = None
+
+    # Um parcial sequencial é retomado em uma conexão; os demais casos passam pela sondagem
+    parcial_sequencial = os.path.exists(caminho_parcial) and estado_parcial and 'segmentos' not in estado_parcial
+    resposta = None
+    if conexoes > 1 and not parcial_sequencial:
+        resposta = _sondar(url, headers, sessao, em_cache, timeout)
+    if resposta and resposta[0] == 304 and em_cache:
+        return _usar_copia_em_cache(em_cache, caminho_indice)
+
+    total = (resposta[1].get('Content-Range', '') if resposta and resposta[0] == 206 else '').rsplit('/', 1)[-1]
+    if total.isdigit():
+        tamanho_esperado = int(total)
+        etag, last_modified = resposta[1].get('ETag'), resposta[1].get('Last-Modified')
+        mesmo_arquivo = (estado_parcial.get('tamanho_total') == tamanho_esperado
+                         and estado_parcial.get('etag') == etag
+                         and estado_parcial.get('last_modified') == last_modified)
+        if not (mesmo_arquivo and os.path.exists(caminho_parcial)):
+            estado_parcial = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'tamanho_total': tamanho_esperado,
+                'segmentos': dividir_segmentos(tamanho_esperado, conexoes),
+                'concluidos': [],
+            }
+            _preallocar(caminho_parcial, tamanho_esperado)
+            _gravar_json(caminho_parcial + '.json', estado_parcial)
+        elif estado_parcial.get('concluidos'):
+            print(f"   Retomando download: {len(estado_parcial['concluidos'])} de "
+                  f"{len(estado_parcial['segmentos'])} segmentos já baixados.")
+        print(f"   Baixando {tamanho_esperado / 1024 ** 2:.1f} MB em {len(estado_parcial['segmentos'])} "
+              f"segmento(s), até {conexoes} conexões...")
+        bytes_transferidos = _baixar_segmentado(url, caminho_parcial, estado_parcial, headers, sessao, conexoes,
+                                                timeout, tentativas)
+        if bytes_transferidos is None:
+            print("   O arquivo mudou no servidor durante o download; recomeçando em uma conexão.")
+            _descartar_parcial(caminho_parcial)
+            estado_parcial, bytes_transferidos, tamanho_esperado = {}, 0, None
+
+    if tamanho_esperado is None:
+        if 'segmentos' in estado_parcial:
+            # Parcial segmentado que não pode ser continuado (conexoes=1 ou servidor sem Range)
+            _descartar_parcial(caminho_parcial)
+            estado_parcial = {}
+        estado_parcial, bytes_transferidos = _baixar_sequencial(
+            url, caminho_parcial, caminho_indice, estado_parcial, em_cache, headers, sessao, timeout, tentativas,
+            tentar_cache=resposta is None)
+        if estado_parcial is None:
+            return em_cache['caminho']
+
+    # Download completo: confere e move para o armazenamento endereçado por conteúdo
+    tamanho_baixado = os.path.getsize(caminho_parcial)
+    if tamanho_esperado is not None and tamanho_baixado != tamanho_esperado:
+        _descartar_parcial(caminho_parcial)
+        raise Exception(f"Tamanho do download ({tamanho_baixado} bytes) diferente do "
+                        f"anunciado pelo servidor ({tamanho_esperado} bytes).")
+    sha256 = _hash_arquivo(caminho_parcial).hexdigest()
+    if sha256_esperado and sha256 != sha256_esperado:
+        _descartar_parcial(caminho_parcial)
+        raise Exception(f"sha256 do download ({sha256}) diferente do esperado ({sha256_esperado}).")
+    caminho_objeto = os.path.join(pasta_cache, 'objetos', sha256)
+    os.replace(caminho_parcial, caminho_objeto)
+    try:
+        os.remove(caminho_parcial + '.json')
+    except OSError:
+        pass
+
+    metadados = {
+        'url': url,
+        'etag': estado_parcial.get('etag'),
+        'last_modified': estado_parcial.get('last_modified'),
+        'tamanho': os.path.getsize(caminho_objeto),
+        'sha256': sha256,
+        'caminho': caminho_objeto,
+        'verificado_em': time.time(),
+        'bytes_ultima_execucao': bytes_transferidos,
+    }
+    _gravar_json(caminho_indice, metadados)
+    if em_cache and em_cache.get('sha256') != sha256:
+        _remover_objeto_orfao(em_cache['sha256'], pasta_cache)
+    return caminho_objeto
+
+
+def _baixar_sequencial(url, caminho_parcial, caminho_indice, estado_parcial, em_cache, headers, sessao,
+                       timeout, tentativas, tentar_cache=True):
+    """
+    Download em uma única conexão, retomável com Range/If-Range. Devolve
+    (estado_parcial, bytes transferidos), ou (None, 0) se o servidor
+    confirmou (304) a cópia em cache.
+    """
+    bytes_transferidos = 0
+    for tentativa in range(tentativas):
+        cabecalhos = dict(headers or {})
+        tamanho_parcial = os.path.getsize(caminho_parcial) if os.path.exists(caminho_parcial) else 0
+
+        if tamanho_parcial and (estado_parcial.get('etag') or estado_parcial.get('last_modified')):
+            cabecalhos['Range'] = f'bytes={tamanho_parcial}-'
+            cabecalhos['If-Range'] = estado_parcial.get('etag') or estado_parcial.get('last_modified')
+        elif em_cache and tentar_cache:
+            if em_cache.get('etag'):
+                cabecalhos['If-None-Match'] = em_cache['etag']
+            if em_cache.get('last_modified'):
+                cabecalhos['If-Modified-Since'] = em_cache['last_modified']
+
+        try:
+            with sessao.get(url, headers=cabecalhos, stream=True, timeout=timeout) as r:
+                if r.status_code == 304 and em_cache:
+                    _usar_copia_em_cache(em_cache, caminho_indice)
+                    return None, 0
+                if r.status_code == 416:
+                    # Parcial inconsistente com o arquivo remoto: descarta e recomeça
+                    os.remove(caminho_parcial)
+                    estado_parcial = {}
+                    continue
+                r.raise_for_status()
+
+                if r.status_code == 206:
+                    modo = 'ab'
+                    print(f"   Retomando download a partir de {tamanho_parcial / 1024 ** 2:.1f} MB...")
+                else:
+                    modo = 'wb'
+                    tamanho_parcial = 0
+                    estado_parcial = {
+                        'etag': r.headers.get('ETag'),
+                        'last_modified': r.headers.get('Last-Modified'),
+                    }
+                    _gravar_json(caminho_parcial + '.json', estado_parcial)
+
+                tamanho_total = tamanho_parcial + int(r.headers.get('Content-Length') or 0)
+                chunk_size = _calcular_chunk(tamanho_total)
+                with open(caminho_parcial, modo) as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        bytes_transferidos += len(chunk)
+                if tamanho_total and os.path.getsize(caminho_parcial) < tamanho_total:
+                    raise requests.exceptions.ConnectionError("Conexão encerrada antes do fim do arquivo.")
+            break
+        except requests.exceptions.RequestException as e:
+            print(f"   FALHA no download (tentativa {tentativa + 1}/{tentativas}): {e}")
+            if tentativa < tentativas - 1:
+                time.sleep(min(2 ** tentativa, 30))
+    else:
+        raise Exception(f"Não foi possível baixar o arquivo após {tentativas} tentativas.")
+    return estado_parcial, bytes_transferidos
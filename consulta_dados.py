@@ -0,0 +1,272 @@
+import os
+import re
+import glob
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from instituicoes import CO_IES_UFRJ, sigla_ies, pasta_saida_ies
+from esquema_microdados import harmonizar_colunas
+from armazenamento_colunar import PARTICOES, pasta_colunar_ies
+from armazem_coortes import COLUNA_JANELAS, COLUNA_HASH, ler_coortes
+import armazenamento_colunar
+
+# Pasta dos CSVs de cada fonte (ver instituicoes.pasta_saida_ies)
+TIPOS_PASTA = {
+    'censo': 'censo_es',
+    'trajetoria': 'indicadores_trajetoria',
+}
+
+# Índice em memória de cada fonte: (curso, ano) -> linhas
+CHAVES_INDICE = {
+    'censo': ('CO_CURSO', 'NU_ANO_CENSO'),
+    'trajetoria': ('CO_CURSO', 'NU_ANO_INGRESSO'),
+}
+
+# Quantas partições (anos do Censo / janelas de trajetória) ficam em memória. Os recortes
+# de uma IES são pequenos; o padrão comporta todos os anos publicados de uma fonte.
+MAX_PARTICOES_PADRAO = 32
+
+PADRAO_ANO_CSV = re.compile(r'_(\d{4})\.csv$', re.IGNORECASE)
+PADRAO_JANELA_CSV = re.compile(r'_(\d{4})_(\d{4})\.csv$', re.IGNORECASE)
+
+
+def _chave_do_csv(fonte, caminho):
+    """Chave da partição a partir do nome do CSV: '2022' ou '2015-2024'."""
+    nome = os.path.basename(caminho)
+    if fonte == 'censo':
+        encontrado = PADRAO_ANO_CSV.search(nome)
+        return encontrado.group(1) if encontrado else None
+    encontrado = PADRAO_JANELA_CSV.search(nome)
+    return f"{encontrado.group(1)}-{encontrado.group(2)}" if encontrado else None
+
+
+class TabelaLongitudinal:
+    """
+    Os arquivos anuais de uma fonte ('censo' ou 'trajetoria') de uma IES
+    vistos como uma única tabela.
+
+    Cada partição (um ano do Censo; uma janela de trajetória, ou uma coorte
+    quando há o armazém de coortes) só é lida quando alguma consulta precisa
+    dela, da partição Parquet se existir (e o pyarrow estiver instalado) ou
+    do CSV, e fica em memória num LRU de até
+    `max_particoes`. Um índice (CO_CURSO, ano) -> linhas, montado lendo só
+    as colunas-chave, permite responder a consultas por curso sem abrir as
+    demais partições. Se algum arquivo mudar em disco (ex: depois de um
+    sync), índice e cache são refeitos na consulta seguinte.
+
+        censo = TabelaLongitudinal('censo')
+        censo.consultar(cursos=[14323], anos=range(2009, 2025), colunas=['QT_MAT'])
+    """
+
+    def __init__(self, fonte, co_ies=CO_IES_UFRJ, pasta_base='.', max_particoes=MAX_PARTICOES_PADRAO):
+        if fonte not in CHAVES_INDICE:
+            raise Exception(f"Fonte desconhecida: '{fonte}'. Use 'censo' ou 'trajetoria'.")
+        self.fonte = fonte
+        self.co_ies = int(co_ies)
+        self.pasta_base = pasta_base
+        self.max_particoes = max_particoes
+        self.chaves = CHAVES_INDICE[fonte]
+
+        self._trava = threading.RLock()
+        self._particoes = OrderedDict()  # LRU {chave: DataFrame harmonizado}
+        self._arquivos = None            # {chave: (caminho, formato, mtime)}
+        self._indice = None
+        self._colunas = None
+        self.acertos_cache = 0
+        self.leituras = 0
+
+    # --- Descoberta dos arquivos ---
+
+    def _listar_arquivos(self):
+        arquivos = {}
+        padrao_csv = os.path.join(pasta_saida_ies(self.co_ies, TIPOS_PASTA[self.fonte], self.pasta_base),
+                                  f'{sigla_ies(self.co_ies)}_*.csv')
+        for caminho in glob.glob(padrao_csv):
+            chave = _chave_do_csv(self.fonte, caminho)
+            if chave:
+                arquivos[chave] = (caminho, 'csv', os.path.getmtime(caminho))
+
+        # A partição Parquet, quando existe, tem prioridade sobre o CSV
+        if armazenamento_colunar.pa is not None:
+            prefixo = f'{PARTICOES[self.fonte]}='
+            pasta = pasta_colunar_ies(self.co_ies, self.fonte, self.pasta_base)
+            particoes = {
+                os.path.basename(os.path.dirname(caminho))[len(prefixo):]: (caminho, 'parquet', os.path.getmtime(caminho))
+                for caminho in glob.glob(os.path.join(pasta, prefixo + '*', '*.parquet'))
+            }
+            if self.fonte == 'trajetoria' and particoes:
+                # O armazém de coortes (uma partição por coorte) substitui os CSVs por janela,
+                # que repetem as linhas que as janelas têm em comum
+                arquivos = particoes
+            else:
+                arquivos.update(particoes)
+        return dict(sorted(arquivos.items()))
+
+    def _verificar_alteracoes(self):
+        arquivos = self._listar_arquivos()
+        if arquivos != self._arquivos:
+            self._arquivos = arquivos
+            self._particoes.clear()
+            self._indice = None
+            self._colunas = None
+
+    def particoes(self):
+        """Chaves das partições disponíveis ('2009', ... ou '2015-2024', ...)."""
+        with self._trava:
+            self._verificar_alteracoes()
+            return list(self._arquivos)
+
+    def assinaturas(self):
+        """
+        {chave: 'formato:tamanho:mtime'} dos arquivos de cada partição, para
+        quem precisa saber o que mudou desde a última leitura (ex: painel_cursos).
+        """
+        with self._trava:
+            self._verificar_alteracoes()
+            return {chave: f'{formato}:{os.path.getsize(caminho)}:{mtime}'
+                    for chave, (caminho, formato, mtime) in self._arquivos.items()}
+
+    def ler_particao(self, chave):
+        """Uma partição inteira e harmonizada (pelo LRU)."""
+        with self._trava:
+            self._verificar_alteracoes()
+            return self._particao(chave)
+
+    # --- Leitura ---
+
+    def _ler_arquivo(self, chave, colunas=None):
+        caminho, formato, _ = self._arquivos[chave]
+        if formato == 'parquet' and self.fonte == 'trajetoria':
+            df = ler_coortes(self.co_ies, self.pasta_base, ingressos=[int(chave)])
+            if colunas is not None:
+                df = df[[coluna for coluna in df.columns if coluna in set(colunas)]]
+        elif formato == 'parquet':
+            df = armazenamento_colunar.pq.read_table(caminho, columns=colunas).to_pandas()
+        elif colunas is None:
+            df = pd.read_csv(caminho, encoding='utf-8-sig', low_memory=False)
+        else:
+            selecionadas = set(colunas)
+            df = pd.read_csv(caminho, encoding='utf-8-sig', low_memory=False,
+                             usecols=lambda coluna: str(coluna).strip().upper() in selecionadas)
+        return harmonizar_colunas(df)
+
+    def _exigir_chaves(self, chave, colunas):
+        ausentes = [coluna for coluna in self.chaves if coluna not in colunas]
+        if ausentes:
+            raise Exception(f"A partição '{chave}' de {self.fonte} ({self._arquivos[chave][0]}) não tem as colunas "
+                            f"{ausentes}. Ela foi gerada com uma seleção de colunas sem as chaves; extraia o ano de novo.")
+
+    def _particao(self, chave):
+        """Partição completa e harmonizada, pelo LRU."""
+        if chave in self._particoes:
+            self._particoes.move_to_end(chave)
+            self.acertos_cache += 1
+            return self._particoes[chave]
+        df = self._ler_arquivo(chave)
+        self._exigir_chaves(chave, df.columns)
+        self.leituras += 1
+        self._particoes[chave] = df
+        while len(self._particoes) > self.max_particoes:
+            self._particoes.popitem(last=False)
+        return df
+
+    def _colunas_do_arquivo(self, chave):
+        caminho, formato, _ = self._arquivos[chave]
+        if formato == 'parquet':
+            nomes = [nome for nome in armazenamento_colunar.pq.read_schema(caminho).names
+                     if nome not in (COLUNA_JANELAS, COLUNA_HASH)]
+        else:
+            nomes = pd.read_csv(caminho, encoding='utf-8-sig', nrows=0).columns
+        return list(harmonizar_colunas(pd.DataFrame(columns=nomes)).columns)
+
+    def _montar_indice(self):
+        """
+        Lê só as colunas-chave de cada partição e monta um DataFrame indexado
+        por (CO_CURSO, ano), ordenado, com a partição e a posição de cada linha.
+        Também reúne a união das colunas de todos os anos.
+        """
+        partes = []
+        colunas = []
+        for chave in self._arquivos:
+            colunas_arquivo = self._colunas_do_arquivo(chave)
+            self._exigir_chaves(chave, colunas_arquivo)
+            for coluna in colunas_arquivo:
+                if coluna not in colunas:
+                    colunas.append(coluna)
+            chaves = self._ler_arquivo(chave, list(self.chaves))
+            partes.append(pd.DataFrame({
+                'curso': pd.to_numeric(chaves[self.chaves[0]], errors='coerce'),
+                'ano': pd.to_numeric(chaves[self.chaves[1]], errors='coerce'),
+                'particao': chave,
+                'posicao': range(len(chaves)),
+            }))
+
+        indice = pd.concat(partes, ignore_index=True) if partes else \
+            pd.DataFrame(columns=['curso', 'ano', 'particao', 'posicao'])
+        indice = indice.dropna(subset=['curso', 'ano']).astype({'curso': 'int64', 'ano': 'int64'})
+        self._indice = indice.set_index(['curso', 'ano']).sort_index()
+        self._colunas = colunas
+
+    def _garantir_indice(self):
+        self._verificar_alteracoes()
+        if self._indice is None:
+            self._montar_indice()
+
+    def colunas(self):
+        """União das colunas (harmonizadas) de todas as partições."""
+        with self._trava:
+            self._garantir_indice()
+            return list(self._colunas)
+
+    # --- Consulta ---
+
+    def consultar(self, cursos=None, anos=None, colunas=None):
+        """
+        Linhas dos `cursos` (CO_CURSO) nos `anos` (NU_ANO_CENSO no Censo,
+        NU_ANO_INGRESSO na trajetória) como um único DataFrame, com as colunas
+        alinhadas entre os anos (ausentes num ano = nulo). None = sem filtro.
+        Só as partições que contêm as linhas pedidas são lidas.
+        """
+        with self._trava:
+            self._garantir_indice()
+            selecao = self._indice
+            if cursos is not None:
+                # Busca binária no índice ordenado, só com os cursos que existem nele
+                presentes = [curso for curso in sorted({int(curso) for curso in cursos})
+                             if curso in selecao.index.levels[0]]
+                selecao = selecao.loc[presentes] if presentes else selecao.iloc[0:0]
+            if anos is not None:
+                anos = {int(ano) for ano in anos}
+                selecao = selecao[selecao.index.get_level_values('ano').isin(anos)]
+
+            colunas_saida = self._colunas if colunas is None else \
+                list(dict.fromkeys([*self.chaves, *(str(coluna).strip().upper() for coluna in colunas)]))
+
+            partes = []
+            for chave, linhas in selecao.groupby('particao', sort=True)['posicao']:
+                particao = self._particao(chave)
+                # Recorta linhas e colunas de uma vez; as colunas que o ano não tem entram como nulas
+                posicoes_colunas = [particao.columns.get_loc(coluna) for coluna in colunas_saida
+                                    if coluna in particao.columns]
+                recorte = particao.iloc[linhas.sort_values().to_numpy(), posicoes_colunas]
+                partes.append(recorte.reindex(columns=colunas_saida))
+
+        if not partes:
+            return pd.DataFrame(columns=colunas_saida)
+        return pd.concat(partes, ignore_index=True)
+
+    def limpar_cache(self):
+        with self._trava:
+            self._particoes.clear()
+
+
+def tabela_censo(co_ies=CO_IES_UFRJ, pasta_base='.', max_particoes=MAX_PARTICOES_PADRAO):
+    """Os CSVs UFRJ_CENSO_<ano> (ou o Parquet equivalente) como uma tabela, indexada por (CO_CURSO, NU_ANO_CENSO)."""
+    return TabelaLongitudinal('censo', co_ies, pasta_base, max_particoes)
+
+
+def tabela_trajetoria(co_ies=CO_IES_UFRJ, pasta_base='.', max_particoes=MAX_PARTICOES_PADRAO):
+    """As planilhas de trajetória como uma tabela, indexada por (CO_CURSO, NU_ANO_INGRESSO)."""
+    return TabelaLongitudinal('trajetoria', co_ies, pasta_base, max_particoes)
@@ -0,0 +1,207 @@
+import os
+import re
+import json
+import hashlib
+import openpyxl
+import pandas as pd
+
+from resolvedor_links import PASTA_CACHE
+
+# Dicionário de dados publicado pelo INEP, versionado junto com o projeto
+CAMINHO_DICIONARIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DADOS_ES_UFRJ', 'anexos',
+                                  'dicionário_dados_educação_superior.xlsx')
+ABA_DICIONARIO = 'cadastro_cursos'
+
+# Esquema pré-compilado (JSON), regenerado quando o dicionário ou a versão mudarem
+CAMINHO_ESQUEMA_COMPILADO = os.path.join(PASTA_CACHE, 'esquema_microdados.json')
+VERSAO_ESQUEMA = 1
+
+# Lidas mesmo quando a leitura é restrita a algumas colunas
+COLUNAS_SEMPRE_LIDAS = ('CO_IES', 'CO_CURSO', 'NU_ANO_CENSO')
+
+PADRAO_VARIAVEL = re.compile(r'^[A-Z]{2}_[A-Z0-9_]+$')
+PREFIXOS_CATEGORICOS = ('NO_', 'SG_')
+PREFIXOS_INTEIROS = ('CO_', 'TP_', 'IN_', 'QT_', 'NU_')
+
+# Colunas renomeadas pelo INEP em alguns anos -> nome usado nos demais
+ALIASES_COLUNAS = {
+    'CO_CINE_ROTULO2': 'CO_CINE_ROTULO',  # Censo 2020
+}
+
+
+def dtype_variavel(nome, tipo, tamanho):
+    """
+    Traduz uma linha do dicionário para um dtype do pandas, ou None para
+    deixar o pandas inferir. Inteiros são 'nullable' (Int8/16/32/64) porque
+    os microdados têm campos em branco.
+    """
+    tipo = (tipo or '').strip().upper()
+    if tipo == 'CHAR' and nome.startswith(PREFIXOS_CATEGORICOS):
+        return 'category'
+    if tipo == 'NUM' and nome.startswith(PREFIXOS_INTEIROS):
+        try:
+            digitos = int(tamanho)
+        except (TypeError, ValueError):
+            return 'Int64'
+        if digitos <= 2:
+            return 'Int8'
+        if digitos <= 4:
+            return 'Int16'
+        if digitos <= 9:
+            return 'Int32'
+        return 'Int64'
+    return None
+
+
+def _hash_arquivo(caminho):
+    with open(caminho, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compilar_esquema(caminho_dicionario=CAMINHO_DICIONARIO, aba=ABA_DICIONARIO):
+    """
+    Lê o dicionário de dados e devolve {'anos': [...], 'variaveis': {nome:
+    {'dtype': ..., 'anos': [...]}}}. Os anos de coleta vêm das colunas '09',
+    '10', ... logo abaixo do cabeçalho ("s" = coletada naquele ano).
+    """
+    planilha = openpyxl.load_workbook(caminho_dicionario, read_only=True, data_only=True)
+    try:
+        linhas = planilha[aba].iter_rows(values_only=True)
+
+        # Cabeçalho: linha com 'Nome da Variável'; a seguinte traz os anos
+        indice_nome = indice_tipo = indice_tamanho = None
+        for linha in linhas:
+            textos = [str(valor).strip() if valor is not None else '' for valor in linha]
+            if 'Nome da Variável' in textos:
+                indice_nome = textos.index('Nome da Variável')
+                indice_tipo = textos.index('Tipo')
+                indice_tamanho = textos.index('Tam.')
+                break
+        if indice_nome is None:
+            raise Exception(f"Cabeçalho não encontrado na aba '{aba}' do dicionário.")
+
+        colunas_ano = {}
+        for indice, valor in enumerate(next(linhas)):
+            texto = str(valor).strip() if valor is not None else ''
+            if texto.isdigit() and len(texto) == 2:
+                colunas_ano[indice] = 2000 + int(texto)
+
+        variaveis = {}
+        for linha in linhas:
+            nome = linha[indice_nome] if len(linha) > indice_nome else None
+            if not isinstance(nome, str) or not PADRAO_VARIAVEL.match(nome.strip()):
+                continue
+            nome = nome.strip()
+            anos = [ano for indice, ano in colunas_ano.items()
+                    if indice < len(linha) and str(linha[indice] or '').strip().lower() == 's']
+            variaveis[nome] = {
+                'dtype': dtype_variavel(nome, linha[indice_tipo], linha[indice_tamanho]),
+                'anos': anos,
+            }
+    finally:
+        planilha.close()
+
+    return {'anos': sorted(colunas_ano.values()), 'variaveis': variaveis}
+
+
+def carregar_esquema(caminho_dicionario=CAMINHO_DICIONARIO, caminho_compilado=CAMINHO_ESQUEMA_COMPILADO):
+    """
+    Devolve o esquema compilado, lendo o artefato em cache quando ele
+    corresponder ao dicionário atual; caso contrário compila e grava de novo.
+    """
+    hash_dicionario = _hash_arquivo(caminho_dicionario)
+    try:
+        with open(caminho_compilado, 'r', encoding='utf-8') as f:
+            compilado = json.load(f)
+        if compilado.get('versao') == VERSAO_ESQUEMA and compilado.get('hash_dicionario') == hash_dicionario:
+            return compilado['esquema']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    esquema = compilar_esquema(caminho_dicionario)
+    os.makedirs(os.path.dirname(caminho_compilado) or '.', exist_ok=True)
+    # Um arquivo temporário por processo: no modo em lote, vários processos podem compilar ao mesmo tempo
+    caminho_temporario = f'{caminho_compilado}.{os.getpid()}.tmp'
+    with open(caminho_temporario, 'w', encoding='utf-8') as f:
+        json.dump({'versao': VERSAO_ESQUEMA, 'hash_dicionario': hash_dicionario, 'esquema': esquema}, f)
+    os.replace(caminho_temporario, caminho_compilado)
+    return esquema
+
+
+def tipos_do_ano(ano, esquema=None):
+    """
+    {coluna: dtype} do dicionário para um ano do Censo. Anos fora do
+    dicionário usam o ano mais próximo que ele cobre.
+    """
+    esquema = esquema or carregar_esquema()
+    anos_dicionario = esquema['anos']
+    ano = int(ano)
+    if anos_dicionario:
+        ano = min(max(ano, anos_dicionario[0]), anos_dicionario[-1])
+    return {
+        nome: variavel['dtype'] for nome, variavel in esquema['variaveis'].items()
+        if variavel['dtype'] and (ano in variavel['anos'] or not variavel['anos'])
+    }
+
+
+def opcoes_leitura(ano=None, colunas=None, esquema=None):
+    """
+    Monta os argumentos extras de pd.read_csv para um ano do Censo:
+    'dtype' com as colunas categóricas (NO_*/SG_*) e, se `colunas` for
+    informado, 'usecols' com a projeção. CO_IES (o filtro) e as chaves
+    CO_CURSO e NU_ANO_CENSO (usadas pelo índice de consulta_dados e pelo
+    painel de cursos) são sempre incluídas.
+
+    Os inteiros compactos não entram aqui: para colunas Int8/Int16/... o parser
+    do pandas lê o texto e só depois converte, o que deixa a leitura várias
+    vezes mais lenta. Eles são aplicados depois do filtro, com converter_tipos.
+    """
+    opcoes = {}
+    if ano is not None:
+        opcoes['dtype'] = {nome: dtype for nome, dtype in tipos_do_ano(ano, esquema).items() if dtype == 'category'}
+
+    if colunas:
+        selecionadas = {str(coluna).strip().upper() for coluna in colunas} | set(COLUNAS_SEMPRE_LIDAS)
+        opcoes['usecols'] = lambda coluna: str(coluna).strip().upper() in selecionadas
+    return opcoes
+
+
+def converter_tipos(df, ano, esquema=None):
+    """
+    Aplica ao DataFrame (já filtrado, portanto pequeno) os tipos do dicionário.
+    Colunas cujos valores não cabem no tipo previsto (ex.: um número maior
+    que o 'Tam.' declarado) são mantidas como o pandas as leu.
+    """
+    for nome, dtype in tipos_do_ano(ano, esquema).items():
+        if nome not in df.columns or str(df[nome].dtype) == dtype:
+            continue
+        try:
+            df[nome] = df[nome].astype(dtype)
+        except (TypeError, ValueError):
+            pass
+    return df
+
+
+def harmonizar_colunas(df):
+    """
+    Alinha um ano ao formato dos demais: nomes sem espaços e em maiúsculas,
+    colunas renomeadas voltam ao nome usual (ALIASES_COLUNAS), códigos que o
+    INEP publicou entre aspas (ex: CO_CINE_ROTULO = '"0533F01"') perdem as
+    aspas e códigos/contagens lidos como float (ex: 14323.0 nas planilhas de
+    trajetória) voltam a ser inteiros.
+    """
+    nomes = [str(coluna).strip().upper() for coluna in df.columns]
+    nomes = [ALIASES_COLUNAS[nome] if nome in ALIASES_COLUNAS and ALIASES_COLUNAS[nome] not in nomes else nome
+             for nome in nomes]
+
+    # Monta o DataFrame de uma vez, em vez de substituir coluna por coluna
+    colunas = {}
+    for nome, (_, serie) in zip(nomes, df.items()):
+        if nome.startswith('CO_') and pd.api.types.is_string_dtype(serie):
+            serie = serie.str.strip('"')
+        elif nome.startswith(PREFIXOS_INTEIROS) and pd.api.types.is_float_dtype(serie):
+            valores = serie.dropna()
+            if (valores == valores.round()).all():
+                serie = serie.astype('Int64')
+        colunas[nome] = serie
+    return pd.DataFrame(colunas, index=df.index)
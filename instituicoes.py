@@ -0,0 +1,61 @@
+import os
+import pandas as pd
+
+# Código INEP (CO_IES) da UFRJ, a instituição padrão do projeto
+CO_IES_UFRJ = 586
+
+# Instituições extraídas quando nenhuma outra é informada
+CODIGOS_IES_PADRAO = (CO_IES_UFRJ,)
+
+# Sigla usada nos nomes de pastas e arquivos de saída. IES sem sigla cadastrada
+# aqui usam 'IES<codigo>' (ex: DADOS_ES_IES573/censo_es_ies573/IES573_CENSO_2022.csv).
+SIGLAS_IES = {
+    CO_IES_UFRJ: 'UFRJ',
+}
+
+
+def normalizar_codigos_ies(codigos_ies):
+    """Aceita um código ou uma coleção de códigos e devolve uma tupla ordenada de ints."""
+    if codigos_ies is None:
+        return CODIGOS_IES_PADRAO
+    if isinstance(codigos_ies, (int, str)):
+        codigos_ies = [codigos_ies]
+    return tuple(sorted({int(codigo) for codigo in codigos_ies}))
+
+
+def sigla_ies(co_ies):
+    return SIGLAS_IES.get(int(co_ies), f'IES{int(co_ies)}')
+
+
+def pasta_raiz_ies(co_ies, pasta_base='.'):
+    """Pasta com todos os dados de uma IES (ex: DADOS_ES_UFRJ)."""
+    return os.path.normpath(os.path.join(pasta_base, f'DADOS_ES_{sigla_ies(co_ies)}'))
+
+
+def pasta_saida_ies(co_ies, tipo, pasta_base='.'):
+    """
+    Pasta de saída de uma IES para um tipo de dado ('censo_es' ou
+    'indicadores_trajetoria'). Para a UFRJ mantém o layout original:
+    DADOS_ES_UFRJ/censo_es_ufrj e DADOS_ES_UFRJ/indicadores_trajetoria_ufrj.
+    """
+    return os.path.join(pasta_raiz_ies(co_ies, pasta_base), f'{tipo}_{sigla_ies(co_ies).lower()}')
+
+
+def mascara_ies(serie_ies, codigos_ies):
+    """Máscara vetorizada das linhas cujo CO_IES está em `codigos_ies`."""
+    return pd.to_numeric(serie_ies, errors='coerce').isin(codigos_ies)
+
+
+def separar_por_ies(df, coluna_ies, codigos_ies):
+    """
+    Divide um DataFrame já filtrado em {co_ies: DataFrame} com um único
+    groupby, devolvendo uma entrada (possivelmente vazia) para cada código pedido.
+    """
+    codigos = pd.to_numeric(df[coluna_ies], errors='coerce')
+    grupos = {int(co_ies): grupo for co_ies, grupo in df.groupby(codigos, sort=False)}
+    return {co_ies: grupos.get(co_ies, df.iloc[0:0]) for co_ies in codigos_ies}
+
+
+def encontrar_coluna_ies(colunas):
+    """Devolve o nome da coluna CO_IES (ignorando espaços e caixa), ou None."""
+    return next((col for col in colunas if str(col).strip().upper() == 'CO_IES'), None)
@@ -0,0 +1,99 @@
+import pandas as pd
+
+from instituicoes import CODIGOS_IES_PADRAO, normalizar_codigos_ies
+from metricas import iterar_cronometrado
+
+# O python-calamine (leitor em Rust) é bem mais rápido que o openpyxl, mas é opcional
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# Até quantas linhas procurar o cabeçalho (as planilhas do INEP têm 8 de preâmbulo)
+MAX_LINHAS_PREAMBULO = 50
+
+
+def _linhas_calamine(caminho_xlsx):
+    planilha = CalamineWorkbook.from_path(caminho_xlsx)
+    try:
+        aba = planilha.get_sheet_by_index(0)
+        # Linhas cruas: a normalização (ver _normalizar_linha) só é feita nas linhas mantidas
+        yield from aba.iter_rows()
+    finally:
+        planilha.close()
+
+
+def _linhas_openpyxl(caminho_xlsx):
+    import openpyxl
+    planilha = openpyxl.load_workbook(caminho_xlsx, read_only=True, data_only=True)
+    try:
+        for linha in planilha.worksheets[0].iter_rows(values_only=True):
+            yield list(linha)
+    finally:
+        planilha.close()
+
+
+def iterar_linhas_xlsx(caminho_xlsx, motor=None):
+    """
+    Itera as linhas da primeira aba como listas de valores, sem montar o
+    DataFrame nacional nem objetos de célula. `motor` pode ser 'calamine' ou
+    'openpyxl' em modo read_only (padrão: calamine, se estiver instalado).
+    """
+    motor = motor or ('calamine' if CalamineWorkbook is not None else 'openpyxl')
+    if motor == 'calamine':
+        if CalamineWorkbook is None:
+            raise Exception("O motor 'calamine' exige o pacote python-calamine.")
+        return _linhas_calamine(caminho_xlsx)
+    return _linhas_openpyxl(caminho_xlsx)
+
+
+def _normalizar_linha(linha):
+    """O calamine devolve '' para células vazias e float para todo número; alinha com o openpyxl."""
+    return [None if valor == '' else int(valor) if isinstance(valor, float) and valor.is_integer() else valor
+            for valor in linha]
+
+
+def _codigo_ies(valor):
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return None
+
+
+def ler_xlsx_filtrando_ies(caminho_xlsx, codigos_ies=CODIGOS_IES_PADRAO, motor=None, leitura=None):
+    """
+    Lê uma planilha de indicadores de trajetória linha a linha e devolve um
+    DataFrame só com as linhas cujo CO_IES está em `codigos_ies`.
+    O cabeçalho é localizado automaticamente (primeira linha com uma célula
+    'CO_IES' entre as MAX_LINHAS_PREAMBULO iniciais), em vez de um skiprows fixo.
+    Se `leitura` (um dict) for informado, recebe o tempo gasto pelo leitor da
+    planilha em 'segundos' e o número de linhas lidas em 'itens' (ver metricas).
+    """
+    codigos_ies = set(normalizar_codigos_ies(codigos_ies))
+    linhas = iterar_cronometrado(iterar_linhas_xlsx(caminho_xlsx, motor), leitura if leitura is not None else {})
+
+    colunas = None
+    indice_ies = None
+    for numero_linha, linha in enumerate(linhas):
+        linha = _normalizar_linha(linha)
+        textos = [str(valor).strip().upper() if valor is not None else '' for valor in linha]
+        if 'CO_IES' in textos:
+            colunas = [valor if valor is not None else f'Unnamed: {i}' for i, valor in enumerate(linha)]
+            indice_ies = textos.index('CO_IES')
+            break
+        if numero_linha >= MAX_LINHAS_PREAMBULO:
+            break
+
+    if colunas is None:
+        raise Exception(f"A coluna 'CO_IES' não foi encontrada nas primeiras {MAX_LINHAS_PREAMBULO} linhas da planilha.")
+
+    linhas_mantidas = [
+        _normalizar_linha(linha) for linha in linhas
+        if len(linha) > indice_ies and _codigo_ies(linha[indice_ies]) in codigos_ies
+    ]
+    linhas.close()
+
+    # Linhas podem vir mais curtas que o cabeçalho quando terminam em células vazias
+    largura = len(colunas)
+    linhas_mantidas = [linha[:largura] + [None] * (largura - len(linha)) for linha in linhas_mantidas]
+    return pd.DataFrame(linhas_mantidas, columns=colunas)
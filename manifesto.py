@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import threading
+import requests
+
+from cache_downloads import consultar_cache
+from instituicoes import pasta_raiz_ies
+
+# Um manifesto por IES, versionado junto com os dados (ex: DADOS_ES_UFRJ/manifesto.json).
+# Cada saída (caminho relativo à pasta da IES) guarda de onde veio e como foi gerada:
+#   {'fonte': 'censo' | 'trajetoria', 'chave': '2022' | '2015-2024', 'url': ...,
+#    'etag': ..., 'last_modified': ..., 'tamanho': ..., 'sha256': ...,
+#    'versao_extrator': ..., 'colunas': [...] ou None, 'linhas': ..., 'formato': 'csv' | 'parquet',
+#    'gerado_em': ...}
+# No armazém de coortes, uma janela de trajetória grava várias partições que
+# outras janelas também atualizam: a entrada da janela fica em
+# 'colunar/trajetoria/janela=2015-2024' (não é uma pasta real) e lista em
+# 'particoes' os caminhos das partições que ela gravou.
+NOME_MANIFESTO = 'manifesto.json'
+VERSAO_MANIFESTO = 1
+
+# As threads do pipeline de trajetória gravam no mesmo manifesto
+_trava_manifesto = threading.Lock()
+
+
+def caminho_manifesto(co_ies, pasta_base='.'):
+    return os.path.join(pasta_raiz_ies(co_ies, pasta_base), NOME_MANIFESTO)
+
+
+def carregar_manifesto(co_ies, pasta_base='.'):
+    """Devolve {caminho_relativo: entrada} das saídas já geradas para a IES."""
+    try:
+        with open(caminho_manifesto(co_ies, pasta_base), 'r', encoding='utf-8') as f:
+            return json.load(f).get('saidas', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _salvar_manifesto(co_ies, saidas, pasta_base='.'):
+    caminho = caminho_manifesto(co_ies, pasta_base)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    caminho_temporario = caminho + '.tmp'
+    with open(caminho_temporario, 'w', encoding='utf-8') as f:
+        json.dump({'versao': VERSAO_MANIFESTO, 'saidas': dict(sorted(saidas.items()))},
+                  f, ensure_ascii=False, indent=2)
+    os.replace(caminho_temporario, caminho)
+
+
+def metadados_origem(url, headers=None, timeout=60):
+    """
+    ETag, Last-Modified e tamanho atuais de `url` (com o sha256, se o arquivo
+    estiver no cache de downloads). Usa um HEAD, sem baixar o conteúdo;
+    devolve {} se o servidor não responder.
+    """
+    em_cache = consultar_cache(url) or {}
+    try:
+        r = requests.head(url, headers=headers, allow_redirects=True, timeout=timeout)
+        r.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"   AVISO: não foi possível consultar '{os.path.basename(url)}' no servidor: {e}")
+        return {}
+    tamanho = r.headers.get('Content-Length')
+    etag = r.headers.get('ETag')
+    return {
+        'etag': etag,
+        'last_modified': r.headers.get('Last-Modified'),
+        'tamanho': int(tamanho) if tamanho and tamanho.isdigit() else None,
+        # O hash do cache só vale se for da mesma versão do arquivo
+        'sha256': em_cache.get('sha256') if etag and em_cache.get('etag') == etag else None,
+    }
+
+
+def metadados_do_cache(url):
+    """Os mesmos campos de metadados_origem, lidos do cache de downloads (sem rede)."""
+    em_cache = consultar_cache(url) or {}
+    return {campo: em_cache.get(campo) for campo in ('etag', 'last_modified', 'tamanho', 'sha256')}
+
+
+def _caminho_relativo(caminho, co_ies, pasta_base):
+    return os.path.relpath(caminho, pasta_raiz_ies(co_ies, pasta_base)).replace(os.sep, '/')
+
+
+def _entrada(fonte, chave, url, origem, versao_extrator, linhas, colunas, formato):
+    return {
+        'fonte': fonte,
+        'chave': str(chave),
+        'url': url,
+        'etag': origem.get('etag'),
+        'last_modified': origem.get('last_modified'),
+        'tamanho': origem.get('tamanho'),
+        'sha256': origem.get('sha256'),
+        'versao_extrator': versao_extrator,
+        'colunas': sorted(colunas) if colunas else None,
+        'linhas': int(linhas),
+        'formato': formato,
+        'gerado_em': time.time(),
+    }
+
+
+def registrar_saida(co_ies, caminho_saida, fonte, chave, url, origem, versao_extrator, linhas,
+                    colunas=None, pasta_base='.', formato='csv'):
+    """
+    Grava no manifesto da IES a entrada de uma saída recém-gerada. `origem`
+    são os metadados de metadados_origem. Saídas sem registros (a IES não
+    aparece no arquivo) também são registradas, com linhas=0, para não serem
+    reprocessadas a cada sincronização.
+    """
+    relativo = _caminho_relativo(caminho_saida, co_ies, pasta_base)
+    entrada = _entrada(fonte, chave, url, origem, versao_extrator, linhas, colunas, formato)
+    with _trava_manifesto:
+        saidas = carregar_manifesto(co_ies, pasta_base)
+        saidas[relativo] = entrada
+        _salvar_manifesto(co_ies, saidas, pasta_base)
+
+
+def registrar_saidas(co_ies, saidas, fonte, chave, url, origem, versao_extrator, colunas=None, pasta_base='.'):
+    """
+    Registra de uma vez todas as saídas de uma fonte, uma entrada por item de
+    `saidas` ([{'caminho', 'formato', 'linhas', 'particoes' (opcional)}]),
+    substituindo as entradas anteriores da mesma fonte, chave e formato.
+    Chamada só depois que todos os formatos foram gravados, para que uma
+    falha no meio não deixe a fonte registrada pela metade.
+    """
+    formatos = {saida['formato'] for saida in saidas}
+    with _trava_manifesto:
+        registradas = {
+            relativo: entrada for relativo, entrada in carregar_manifesto(co_ies, pasta_base).items()
+            if not (entrada.get('fonte') == fonte and entrada.get('chave') == str(chave)
+                    and entrada.get('formato', 'csv') in formatos)
+        }
+        for saida in saidas:
+            entrada = _entrada(fonte, chave, url, origem, versao_extrator, saida['linhas'], colunas, saida['formato'])
+            if saida.get('particoes') is not None:
+                entrada['particoes'] = sorted(_caminho_relativo(particao, co_ies, pasta_base)
+                                              for particao in saida['particoes'])
+            registradas[_caminho_relativo(saida['caminho'], co_ies, pasta_base)] = entrada
+        _salvar_manifesto(co_ies, registradas, pasta_base)
+
+
+def motivo_reprocessamento(co_ies, fonte, chave, url, origem, versao_extrator, colunas=None, pasta_base='.',
+                           formatos=('csv',)):
+    """
+    Compara o manifesto da IES com o estado atual de uma fonte e devolve o
+    motivo para reprocessá-la (ex: 'nova', 'ETag alterado') ou None se as
+    saídas existentes, em todos os `formatos`, ainda correspondem a ela.
+    """
+    entradas = [(relativo, entrada) for relativo, entrada in carregar_manifesto(co_ies, pasta_base).items()
+                if entrada.get('fonte') == fonte and entrada.get('chave') == str(chave)]
+    if not entradas:
+        return 'nova'
+    formatos_registrados = {entrada.get('formato', 'csv') for _, entrada in entradas}
+    for formato in formatos:
+        if formato not in formatos_registrados:
+            return f'formato {formato} ausente'
+
+    pasta_ies = pasta_raiz_ies(co_ies, pasta_base)
+    colunas = sorted(colunas) if colunas else None
+    for relativo, entrada in entradas:
+        if entrada.get('url') != url:
+            return 'link alterado'
+        if entrada.get('versao_extrator') != versao_extrator:
+            return 'versão do extrator alterada'
+        if entrada.get('colunas') != colunas:
+            return 'colunas diferentes'
+        if entrada.get('linhas') and not all(os.path.exists(os.path.join(pasta_ies, caminho))
+                                             for caminho in entrada.get('particoes') or [relativo]):
+            return 'saída ausente'
+        if origem.get('sha256') and entrada.get('sha256'):
+            # Mesmo conteúdo: um ETag ou data diferentes não importam
+            if origem['sha256'] != entrada['sha256']:
+                return 'conteúdo alterado'
+            continue
+        for campo, motivo in (('etag', 'ETag alterado'), ('tamanho', 'tamanho alterado'),
+                              ('last_modified', 'data de modificação alterada')):
+            if origem.get(campo) and entrada.get(campo) and origem[campo] != entrada[campo]:
+                return motivo
+    return None
@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+
+# resource (pico de RSS) só existe em sistemas Unix; no Windows o campo fica nulo
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Instrumentação das etapas dos extratores. Cada etapa medida vira um registro
+#   {'etapa': 'baixar', 'fonte': 'censo', 'chave': '2022', 'inicio': ..., 'duracao_s': ...,
+#    'bytes': ..., 'linhas_lidas': ..., 'linhas_mantidas': ..., 'rss_inicio_mb': ..., 'rss_fim_mb': ...,
+#    'rss_pico_mb': ..., 'rss_compartilhado': ..., 'rss_pico_processo_mb': ..., 'pid': ..., ...}
+# gravado como uma linha JSON no arquivo de métricas (se configurado) e
+# entregue às funções registradas com adicionar_hook.
+#
+# Memória: rss_inicio_mb/rss_fim_mb são o RSS ao entrar e ao sair da etapa e
+# rss_pico_mb o pico durante ela (no Linux, o VmHWM zerado pelo
+# /proc/self/clear_refs no início; nulo onde isso não existe). O RSS é do
+# processo: se outras etapas rodaram ao mesmo tempo (threads do pipeline de
+# trajetória), rss_compartilhado vem True e o pico inclui a memória delas.
+# rss_pico_processo_mb é o pico do processo desde que ele começou.
+#
+#   DEXINEP_METRICAS=metricas.jsonl python update_censo.py sync
+#   DEXINEP_PERFIL=1 python update_trajetoria.py       (cProfile + tracemalloc)
+ETAPAS = ('descobrir', 'baixar', 'extrair', 'ler', 'filtrar', 'gravar')
+VARIAVEL_ARQUIVO = 'DEXINEP_METRICAS'
+VARIAVEL_PERFIL = 'DEXINEP_PERFIL'
+
+_trava = threading.Lock()
+_arquivo_metricas = os.environ.get(VARIAVEL_ARQUIVO) or None
+_hooks = []
+_coletores = []
+
+_medicoes_memoria = {}  # Medições de memória em andamento, por id
+_pico_zerado = False    # O VmHWM foi zerado quando a primeira das medições em andamento começou
+_pico_zeravel = sys.platform.startswith('linux')
+_pico_processo_kb = 0   # Maior VmHWM visto antes de cada zeramento (o clear_refs zera também o ru_maxrss)
+
+
+def configurar_metricas(arquivo=None):
+    """Grava os registros em `arquivo` (JSON lines, acrescentando ao fim); None desliga a gravação."""
+    global _arquivo_metricas
+    _arquivo_metricas = arquivo
+
+
+def adicionar_hook(funcao):
+    """
+    `funcao(registro)` é chamada a cada etapa medida, por exemplo para
+    repassar os números a um coletor próprio. Pode ser chamada de várias
+    threads ao mesmo tempo; uma exceção nela é avisada e ignorada.
+    """
+    with _trava:
+        _hooks.append(funcao)
+
+
+def remover_hook(funcao):
+    with _trava:
+        if funcao in _hooks:
+            _hooks.remove(funcao)
+
+
+def _status_memoria():
+    """{'VmRSS': kB, 'VmHWM': kB} do /proc/self/status (Linux), ou {}."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            return {linha.split(':')[0]: int(linha.split()[1]) for linha in f if linha.startswith(('VmRSS', 'VmHWM'))}
+    except (OSError, ValueError, IndexError):
+        return {}
+
+
+def _kb_para_mb(kb):
+    return round(kb / 1024, 1) if kb is not None else None
+
+
+def _zerar_pico():
+    """Zera o pico de RSS (VmHWM) do processo. Devolve False se o sistema não permitir."""
+    global _pico_zeravel, _pico_processo_kb
+    if not _pico_zeravel:
+        return False
+    pico = _status_memoria().get('VmHWM') or 0
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        _pico_zeravel = False
+        return False
+    _pico_processo_kb = max(_pico_processo_kb, pico)
+    return True
+
+
+@contextlib.contextmanager
+def medir_memoria():
+    """
+    Mede a memória do processo durante o bloco. O dicionário devolvido é
+    preenchido ao sair com rss_inicio_mb, rss_fim_mb, rss_pico_mb e
+    rss_compartilhado (ver o início do módulo), prontos para entrar num
+    registro (ex: registrar_etapa(..., **memoria)).
+    """
+    global _pico_zerado
+    medicao = {'rss_inicio_mb': _kb_para_mb(_status_memoria().get('VmRSS')), 'rss_compartilhado': False}
+    with _trava:
+        if _medicoes_memoria:
+            for outra in [*_medicoes_memoria.values(), medicao]:
+                outra['rss_compartilhado'] = True
+        else:
+            _pico_zerado = _zerar_pico()
+        _medicoes_memoria[id(medicao)] = medicao
+    try:
+        yield medicao
+    finally:
+        status = _status_memoria()
+        with _trava:
+            del _medicoes_memoria[id(medicao)]
+            pico_valido = _pico_zerado
+        medicao['rss_fim_mb'] = _kb_para_mb(status.get('VmRSS'))
+        medicao['rss_pico_mb'] = _kb_para_mb(status.get('VmHWM')) if pico_valido else None
+
+
+def rss_pico_mb(filhos=False):
+    """
+    Pico de memória residente do processo desde que ele começou, em MB (None
+    se indisponível). Com `filhos`, o maior pico entre os processos filhos já
+    encerrados; no Linux, só desde a última etapa medida em cada filho (o
+    pico inteiro deles está em rss_pico_processo_mb, nos seus registros).
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_CHILDREN if filhos else resource.RUSAGE_SELF).ru_maxrss
+    if not filhos:
+        pico = max(pico, _pico_processo_kb)  # Só é diferente de zero no Linux, onde os dois estão em KB
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(pico / 1024 ** (2 if sys.platform == 'darwin' else 1), 1)
+
+
+def emitir(registro):
+    """Entrega um registro pronto ao coletor ativo ou ao arquivo de métricas e aos hooks."""
+    with _trava:
+        if _coletores:
+            _coletores[-1].append(registro)
+            return
+        hooks = list(_hooks)
+        if _arquivo_metricas:
+            with open(_arquivo_metricas, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+    for hook in hooks:
+        try:
+            hook(registro)
+        except Exception as e:
+            print(f"   AVISO: hook de métricas falhou: {e}")
+
+
+@contextlib.contextmanager
+def coletar_metricas():
+    """
+    Guarda numa lista, em vez de emitir, os registros das etapas medidas
+    dentro do bloco. Usado nos processos filhos do modo em lote, que devolvem
+    os registros para o processo principal emiti-los (os hooks só existem lá).
+    """
+    registros = []
+    with _trava:
+        _coletores.append(registros)
+    try:
+        yield registros
+    finally:
+        with _trava:
+            _coletores.remove(registros)
+
+
+def _novo_registro(etapa, fonte, chave, campos):
+    return {
+        'etapa': etapa,
+        'fonte': fonte,
+        'chave': str(chave) if chave is not None else None,
+        'bytes': None,
+        'linhas_lidas': None,
+        'linhas_mantidas': None,
+        'rss_inicio_mb': None,
+        'rss_fim_mb': None,
+        'rss_pico_mb': None,
+        'rss_compartilhado': None,
+        **campos,
+    }
+
+
+def _finalizar(registro, inicio, duracao_s):
+    registro.update({
+        'inicio': inicio,
+        'duracao_s': round(duracao_s, 6) if duracao_s is not None else None,
+        'rss_pico_processo_mb': rss_pico_mb(),
+        'pid': os.getpid(),
+        'thread': threading.current_thread().name,
+    })
+    emitir(registro)
+
+
+@contextlib.contextmanager
+def medir_etapa(etapa, fonte=None, chave=None, **campos):
+    """
+    Mede o tempo de parede do bloco e emite o registro ao sair (com o campo
+    'erro' se o bloco levantar uma exceção). O bloco recebe o registro para
+    preencher os números que só ele conhece:
+
+        with medir_etapa('baixar', 'censo', 2022) as medicao:
+            caminho = obter_arquivo(link)
+            medicao['bytes'] = os.path.getsize(caminho)
+    """
+    registro = _novo_registro(etapa, fonte, chave, campos)
+    inicio = time.time()
+    cronometro = time.perf_counter()
+    try:
+        with medir_memoria() as memoria:
+            yield registro
+    except BaseException as e:
+        registro['erro'] = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        registro.update(memoria)
+        _finalizar(registro, inicio, time.perf_counter() - cronometro)
+
+
+def registrar_etapa(etapa, duracao_s, fonte=None, chave=None, **campos):
+    """
+    Emite o registro de uma etapa cujo tempo foi medido à parte (ex: com
+    iterar_cronometrado). A memória, se medida, vem em `campos` (ver medir_memoria).
+    """
+    registro = _novo_registro(etapa, fonte, chave, campos)
+    _finalizar(registro, time.time() - (duracao_s or 0), duracao_s)
+
+
+def iterar_cronometrado(iteravel, contador):
+    """
+    Itera `iteravel` somando em contador['segundos'] o tempo gasto para
+    produzir cada item e em contador['itens'] quantos foram produzidos.
+    Separa o custo de quem produz (ex: o parser do read_csv) do custo de
+    quem consome, quando os dois acontecem no mesmo laço.
+    """
+    contador.setdefault('segundos', 0.0)
+    contador.setdefault('itens', 0)
+    iterador = iter(iteravel)
+    try:
+        while True:
+            cronometro = time.perf_counter()
+            try:
+                item = next(iterador)
+            except StopIteration:
+                contador['segundos'] += time.perf_counter() - cronometro
+                return
+            contador['segundos'] += time.perf_counter() - cronometro
+            contador['itens'] += 1
+            yield item
+    finally:
+        # Fechar este iterador fecha também o de origem (ex: libera a planilha aberta)
+        if hasattr(iterador, 'close'):
+            iterador.close()
+
+
+@contextlib.contextmanager
+def perfil(nome, pasta='.', ativo=None, linhas=25):
+    """
+    Modo de perfil para uma execução isolada: liga o cProfile e o
+    tracemalloc durante o bloco, grava o perfil em
+    `pasta`/perfil_<nome>_<data>.prof (para o snakeviz/pstats), imprime as
+    funções mais caras e as linhas que mais alocaram e emite um registro
+    'perfil' com o pico do tracemalloc. `ativo`=None segue a variável de
+    ambiente DEXINEP_PERFIL. O cProfile só enxerga a thread que entrou no
+    bloco; as threads do pipeline de trajetória aparecem só pelo tracemalloc.
+    """
+    if ativo is None:
+        ativo = os.environ.get(VARIAVEL_PERFIL, '') not in ('', '0')
+    if not ativo:
+        yield
+        return
+
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    perfilador = cProfile.Profile()
+    tracemalloc.start()
+    inicio = time.time()
+    cronometro = time.perf_counter()
+    perfilador.enable()
+    try:
+        yield
+    finally:
+        perfilador.disable()
+        duracao = time.perf_counter() - cronometro
+        _, pico = tracemalloc.get_traced_memory()
+        estatisticas_memoria = tracemalloc.take_snapshot().statistics('lineno')
+        tracemalloc.stop()
+
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f"perfil_{nome}_{time.strftime('%Y%m%d_%H%M%S')}.prof")
+        perfilador.dump_stats(caminho)
+
+        print(f"\n--- Perfil de '{nome}' ({duracao:.1f} s), gravado em '{caminho}' ---")
+        pstats.Stats(perfilador).sort_stats('cumulative').print_stats(linhas)
+        print(f"Pico de memória alocada pelo Python (tracemalloc): {pico / 1024 ** 2:.1f} MB")
+        print("Linhas que mais alocaram:")
+        for estatistica in estatisticas_memoria[:10]:
+            print(f"   {estatistica}")
+
+        registro = _novo_registro('perfil', None, nome, {
+            'tracemalloc_pico_mb': round(pico / 1024 ** 2, 1),
+            'arquivo_perfil': caminho,
+        })
+        _finalizar(registro, inicio, duracao)
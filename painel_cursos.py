@@ -0,0 +1,233 @@
+import os
+import glob
+import shutil
+import pandas as pd
+
+from instituicoes import CO_IES_UFRJ, sigla_ies
+from armazem_coortes import CHAVES_COORTE
+from consulta_dados import tabela_censo, tabela_trajetoria
+import armazenamento_colunar
+from armazenamento_colunar import (FORMATOS_SAIDA_PADRAO, PARTICOES, formatos_disponiveis, pasta_colunar_ies,
+                                   caminho_particao, salvar_particao, ler_particao, ler_metadados_particao,
+                                   ler_colunar)
+
+# Painel materializado: uma linha por (CO_CURSO, NU_ANO), juntando as contagens
+# do Censo daquele ano com os indicadores de trajetória das coortes com ano de
+# referência igual a ele. Particionado por ano:
+#   DADOS_ES_UFRJ/colunar/painel/ano=2022/parte-0.parquet
+#
+# Os metadados de cada partição guardam as assinaturas dos arquivos de origem
+# que a geraram (o ano do Censo e cada partição de trajetória); uma
+# atualização só refaz os anos cujas origens mudaram.
+VERSAO_PAINEL = 1
+
+COLUNAS_CENSO_PAINEL = ('QT_VG_TOTAL', 'QT_INSCRITO_TOTAL', 'QT_ING', 'QT_MAT', 'QT_CONC')
+
+# Indicadores de trajetória somados entre as coortes ativas no ano de referência
+COLUNAS_COORTES_PAINEL = {
+    'QT_PERMANENCIA': 'QT_PERMANENCIA_COORTES',
+    'QT_CONCLUINTE': 'QT_CONCLUINTE_COORTES',
+    'QT_DESISTENCIA': 'QT_DESISTENCIA_COORTES',
+    'QT_FALECIDO': 'QT_FALECIDO_COORTES',
+}
+
+
+def _somar_por_curso(df, colunas):
+    """Soma por curso; min_count=1 mantém nulo quando nenhuma linha tem o valor."""
+    presentes = [coluna for coluna in colunas if coluna in df.columns]
+    valores = df[['CO_CURSO', *presentes]].copy()
+    for coluna in presentes:
+        valores[coluna] = pd.to_numeric(valores[coluna], errors='coerce')
+    somas = valores.groupby('CO_CURSO').sum(min_count=1)
+    return somas.reindex(columns=list(colunas))
+
+
+def _linhas_censo(df_censo):
+    """
+    Uma linha por curso. Alguns anos repetem o CO_CURSO (ex: o mesmo curso em
+    mais de um local de oferta), e as contagens são somadas.
+    """
+    df = df_censo.dropna(subset=['CO_CURSO']).astype({'CO_CURSO': 'int64'})
+    linhas = _somar_por_curso(df, COLUNAS_CENSO_PAINEL)
+    if 'NO_CURSO' in df.columns:
+        linhas.insert(0, 'NO_CURSO', df.groupby('CO_CURSO')['NO_CURSO'].first())
+    return linhas
+
+
+def _linhas_coortes(df_coortes, ano):
+    """Uma linha por curso com os indicadores das coortes no ano de referência `ano`."""
+    df = df_coortes[df_coortes['NU_ANO_REFERENCIA'] == ano]
+    linhas = _somar_por_curso(df, COLUNAS_COORTES_PAINEL).rename(columns=COLUNAS_COORTES_PAINEL)
+    # Ingressantes: a coorte que entrou naquele ano
+    ingressantes = _somar_por_curso(df[df['NU_ANO_INGRESSO'] == ano], ['QT_INGRESSANTE'])['QT_INGRESSANTE']
+    linhas.insert(0, 'QT_INGRESSANTE_COORTE', ingressantes)
+    linhas['NU_COORTES'] = df.groupby('CO_CURSO')['NU_ANO_INGRESSO'].nunique()
+    if 'NO_CURSO' in df.columns:
+        linhas.insert(0, 'NO_CURSO', df.groupby('CO_CURSO')['NO_CURSO'].first())
+    return linhas
+
+
+def montar_ano_painel(ano, df_censo=None, df_coortes=None):
+    """
+    As linhas do painel de um ano, a partir das linhas do Censo daquele ano e
+    das linhas de trajetória (qualquer coorte) com NU_ANO_REFERENCIA == ano.
+    Cursos presentes em só uma das fontes ficam com nulos nas colunas da outra.
+    """
+    partes = []
+    if df_censo is not None and len(df_censo):
+        partes.append(_linhas_censo(df_censo))
+    if df_coortes is not None and len(df_coortes):
+        partes.append(_linhas_coortes(df_coortes, ano))
+    if not partes:
+        return None
+
+    painel = partes[0]
+    for parte in partes[1:]:
+        painel = painel.join(parte, how='outer', lsuffix='', rsuffix='_TRAJETORIA')
+        if 'NO_CURSO_TRAJETORIA' in painel.columns:
+            painel['NO_CURSO'] = painel['NO_CURSO'].fillna(painel.pop('NO_CURSO_TRAJETORIA'))
+
+    colunas = ['NO_CURSO', *COLUNAS_CENSO_PAINEL, 'QT_INGRESSANTE_COORTE', *COLUNAS_COORTES_PAINEL.values(),
+               'NU_COORTES']
+    painel = painel.reindex(columns=colunas)
+    for coluna in colunas[1:]:
+        painel[coluna] = painel[coluna].astype('Int64')
+    painel.insert(0, 'NU_ANO', int(ano))
+    return painel.rename_axis('CO_CURSO').reset_index().sort_values('CO_CURSO', ignore_index=True)
+
+
+def _estado_painel(co_ies, pasta_base='.'):
+    """{ano: {'censo': assinatura ou None, 'trajetoria': {chave: assinatura}}} das partições já gravadas."""
+    prefixo = f"{PARTICOES['painel']}="
+    estado = {}
+    for caminho in glob.glob(os.path.join(pasta_colunar_ies(co_ies, 'painel', pasta_base), prefixo + '*', '*.parquet')):
+        metadados = ler_metadados_particao(caminho)
+        if metadados.get('versao_painel') != VERSAO_PAINEL:
+            continue  # Gerada por outra versão do painel: será refeita
+        ano = int(os.path.basename(os.path.dirname(caminho))[len(prefixo):])
+        estado[ano] = metadados.get('origens', {'censo': None, 'trajetoria': {}})
+    return estado
+
+
+def _anos_referencia(df_coortes):
+    return {int(ano) for ano in pd.to_numeric(df_coortes['NU_ANO_REFERENCIA'], errors='coerce').dropna().unique()}
+
+
+def _coortes_sem_duplicatas(partes):
+    """
+    Junta as partições de trajetória lidas. No armazém de coortes cada linha
+    já é única; com CSVs por janela, janelas sobrepostas repetem a mesma
+    (curso, coorte, ano) e vale a da janela mais recente.
+    """
+    if not partes:
+        return None
+    df = pd.concat([partes[chave] for chave in sorted(partes)], ignore_index=True)
+    df = df.dropna(subset=list(CHAVES_COORTE)).astype({chave: 'int64' for chave in CHAVES_COORTE})
+    return df.drop_duplicates(list(CHAVES_COORTE), keep='last')
+
+
+def atualizar_painel(co_ies=CO_IES_UFRJ, pasta_base='.'):
+    """
+    Atualiza o painel curso × ano da IES a partir do que o Censo e a
+    trajetória têm em disco (CSV ou Parquet), refazendo só os anos afetados:
+    um ano do Censo novo ou alterado refaz aquele ano; uma coorte (ou janela)
+    nova ou alterada refaz os anos de referência que ela cobre e os que ela
+    cobria antes. Anos que perderam todas as origens são removidos.
+    Devolve {'atualizados': [anos], 'removidos': [anos]}.
+    """
+    if armazenamento_colunar.pa is None:
+        raise Exception("O painel de cursos é gravado em Parquet e exige o pacote pyarrow.")
+
+    censo = tabela_censo(co_ies, pasta_base)
+    trajetoria = tabela_trajetoria(co_ies, pasta_base)
+    assinaturas_censo = {int(chave): assinatura for chave, assinatura in censo.assinaturas().items()}
+    assinaturas_trajetoria = trajetoria.assinaturas()
+    estado = _estado_painel(co_ies, pasta_base)
+
+    # --- Quais anos mudaram ---
+    afetados = {ano for ano, assinatura in assinaturas_censo.items()
+                if ano not in estado or estado[ano].get('censo') != assinatura}
+    registradas = set()
+    for ano, origens in estado.items():
+        if origens.get('censo') and ano not in assinaturas_censo:
+            afetados.add(ano)
+        for chave, assinatura in origens.get('trajetoria', {}).items():
+            registradas.add((chave, assinatura))
+            if assinaturas_trajetoria.get(chave) != assinatura:
+                afetados.add(ano)  # A partição mudou ou sumiu
+
+    lidas = {}
+    anos_por_particao = {}
+    for chave, assinatura in assinaturas_trajetoria.items():
+        if (chave, assinatura) not in registradas:
+            # Nova ou alterada: só estas partições de trajetória são lidas para descobrir os anos
+            lidas[chave] = trajetoria.ler_particao(chave)
+            anos_por_particao[chave] = _anos_referencia(lidas[chave])
+            afetados |= anos_por_particao[chave]
+
+    if not afetados:
+        print(f"Painel de cursos ({sigla_ies(co_ies)}) em dia: {len(estado)} ano(s).")
+        return {'atualizados': [], 'removidos': []}
+
+    # --- Refaz cada ano afetado ---
+    atualizados, removidos = [], []
+    for ano in sorted(afetados):
+        # Partições de trajetória que cobrem o ano: as já registradas nele e as novas/alteradas
+        chaves = {chave for chave in estado.get(ano, {}).get('trajetoria', {}) if chave in assinaturas_trajetoria}
+        chaves |= {chave for chave, anos in anos_por_particao.items() if ano in anos}
+        partes = {}
+        for chave in chaves:
+            if chave not in lidas:
+                lidas[chave] = trajetoria.ler_particao(chave)
+                anos_por_particao[chave] = _anos_referencia(lidas[chave])
+            if ano in anos_por_particao[chave]:
+                partes[chave] = lidas[chave][lidas[chave]['NU_ANO_REFERENCIA'] == ano]
+
+        df_censo = censo.ler_particao(str(ano)) if ano in assinaturas_censo else None
+        painel = montar_ano_painel(ano, df_censo, _coortes_sem_duplicatas(partes))
+        if painel is None:
+            pasta = os.path.dirname(caminho_particao(co_ies, 'painel', ano, pasta_base))
+            if os.path.isdir(pasta):
+                shutil.rmtree(pasta)
+                removidos.append(ano)
+            continue
+
+        origens = {
+            'censo': assinaturas_censo.get(ano),
+            'trajetoria': {chave: assinaturas_trajetoria[chave] for chave in sorted(partes)},
+        }
+        salvar_particao(painel, co_ies, 'painel', ano, pasta_base=pasta_base,
+                        metadados={'versao_painel': VERSAO_PAINEL, 'origens': origens})
+        atualizados.append(ano)
+
+    print(f"Painel de cursos ({sigla_ies(co_ies)}): {len(atualizados)} ano(s) atualizado(s)"
+          f"{f', {len(removidos)} removido(s)' if removidos else ''}.")
+    return {'atualizados': atualizados, 'removidos': removidos}
+
+
+def atualizar_paineis(codigos_ies, pasta_base='.', formatos=FORMATOS_SAIDA_PADRAO):
+    """
+    Chamada no fim dos downloads do Censo e da trajetória: atualiza o painel
+    de cada IES quando o Parquet está entre os `formatos` (e disponível).
+    """
+    if 'parquet' not in formatos_disponiveis(formatos):
+        return
+    for co_ies in codigos_ies:
+        atualizar_painel(co_ies, pasta_base)
+
+
+def ler_painel(co_ies=CO_IES_UFRJ, colunas=None, filtros=None, pasta_base='.'):
+    """
+    O painel (ou parte dele: ver armazenamento_colunar.ler_colunar) como
+    DataFrame, ordenado por curso e ano. Ex:
+        ler_painel(filtros=[('ano', '>=', 2019), ('CO_CURSO', '==', 14323)])
+    """
+    df = ler_colunar(co_ies, 'painel', colunas=colunas, filtros=filtros, pasta_base=pasta_base)
+    df = df.drop(columns=[PARTICOES['painel']], errors='ignore')
+    ordem = [coluna for coluna in ('CO_CURSO', 'NU_ANO') if coluna in df.columns]
+    return df.sort_values(ordem, ignore_index=True) if ordem else df
+
+
+def ler_ano_painel(ano, co_ies=CO_IES_UFRJ, pasta_base='.'):
+    """Um ano do painel, ou None se ele ainda não foi gerado."""
+    return ler_particao(co_ies, 'painel', ano, pasta_base)
@@ -0,0 +1,135 @@
+import os
+import re
+import json
+import time
+import requests
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+URL_BASE_CENSO = "https://www.gov.br/inep/pt-br/acesso-a-informacao/dados-abertos/microdados/censo-da-educacao-superior"
+URL_BASE_TRAJETORIA = "https://www.gov.br/inep/pt-br/acesso-a-informacao/dados-abertos/indicadores-educacionais/indicadores-de-trajetoria-da-educacao-superior"
+
+HEADERS_PAGINA = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36'
+}
+
+# Pasta com os artefatos de cache locais (não versionada)
+PASTA_CACHE = '.cache_inep'
+CAMINHO_CATALOGO = os.path.join(PASTA_CACHE, 'catalogo_links.json')
+
+# Validade do catálogo de links, em segundos
+TTL_CATALOGO_PADRAO = 24 * 60 * 60
+
+TEXTO_LINK_CENSO = 'Microdados do Censo da Educação Superior'
+PADRAO_ANO = re.compile(r'(?<!\d)(\d{4})(?!\d)')
+PADRAO_JANELA_TRAJETORIA = re.compile(r'(\d{4})_(\d{4})\.zip$', re.IGNORECASE)
+
+
+# --- Catálogo persistente {chave: url} com TTL ---
+
+def _ler_catalogo_completo(caminho=CAMINHO_CATALOGO):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def carregar_catalogo(fonte, ttl=TTL_CATALOGO_PADRAO, caminho=CAMINHO_CATALOGO):
+    """
+    Devolve o dicionário de links em cache para a `fonte` ('censo' ou
+    'trajetoria'), ou None se não existir ou tiver passado do TTL.
+    """
+    entrada = _ler_catalogo_completo(caminho).get(fonte)
+    if not entrada or time.time() - entrada.get('gerado_em', 0) > ttl:
+        return None
+    return entrada.get('links', {})
+
+
+def salvar_catalogo(fonte, links, caminho=CAMINHO_CATALOGO):
+    """Grava (ou substitui) os links de uma fonte no catálogo em disco."""
+    catalogo = _ler_catalogo_completo(caminho)
+    catalogo[fonte] = {'gerado_em': time.time(), 'links': dict(sorted(links.items()))}
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    caminho_temporario = caminho + '.tmp'
+    with open(caminho_temporario, 'w', encoding='utf-8') as f:
+        json.dump(catalogo, f, ensure_ascii=False, indent=2)
+    os.replace(caminho_temporario, caminho)
+
+
+# --- Parsers estáticos (requests + BeautifulSoup) ---
+
+def baixar_pagina(url, headers=None, timeout=60):
+    r = requests.get(url, headers=headers or HEADERS_PAGINA, timeout=timeout)
+    r.raise_for_status()
+    return r.text
+
+
+def extrair_links_censo(html, url_pagina=URL_BASE_CENSO):
+    """
+    Lê o HTML da página do Censo e devolve {ano: url} a partir dos links cujo
+    texto contém 'Microdados do Censo da Educação Superior' e um ano.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    links = {}
+    for link in soup.find_all('a', href=True):
+        texto = ' '.join(link.get_text(' ', strip=True).split())
+        if TEXTO_LINK_CENSO not in texto:
+            continue
+        anos = PADRAO_ANO.findall(texto)
+        if anos:
+            links.setdefault(anos[-1], urljoin(url_pagina, link['href']))
+    return links
+
+
+def extrair_links_trajetoria(html, url_pagina=URL_BASE_TRAJETORIA):
+    """
+    Lê o HTML da página de indicadores de trajetória e devolve {'AAAA-AAAA': url}.
+    Todas as abas do carrossel já vêm no HTML; a janela de cada link é lida do
+    nome do arquivo (ex: ..._2015_2024.zip), sem precisar clicar em nada.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    links = {}
+    for link in soup.find_all('a', href=True):
+        href = urljoin(url_pagina, link['href'])
+        if 'download.inep.gov.br' not in href:
+            continue
+        janela = janela_trajetoria(href)
+        if janela:
+            links.setdefault(janela, href)
+    return links
+
+
+def janela_trajetoria(url):
+    """'AAAA-AAAA' a partir do nome do zip de trajetória (ex: ..._2015_2024.zip), ou None."""
+    encontrado = PADRAO_JANELA_TRAJETORIA.search(url)
+    return f"{encontrado.group(1)}-{encontrado.group(2)}" if encontrado else None
+
+
+def _resolver(fonte, url_pagina, extrator, ttl, forcar):
+    if not forcar:
+        links = carregar_catalogo(fonte, ttl=ttl)
+        if links:
+            print(f"Usando catálogo de links em cache ({len(links)} link(s) de '{fonte}').")
+            return links
+
+    print(f"Lendo a página do INEP sem navegador para encontrar os links de '{fonte}'...")
+    try:
+        links = extrator(baixar_pagina(url_pagina), url_pagina)
+    except requests.exceptions.RequestException as e:
+        print(f"   FALHA ao baixar a página: {e}")
+        return {}
+
+    if links:
+        salvar_catalogo(fonte, links)
+    return links
+
+
+def resolver_links_censo(ttl=TTL_CATALOGO_PADRAO, forcar=False):
+    """{ano: url} de todos os anos publicados, via catálogo ou parse estático."""
+    return _resolver('censo', URL_BASE_CENSO, extrair_links_censo, ttl, forcar)
+
+
+def resolver_links_trajetoria(ttl=TTL_CATALOGO_PADRAO, forcar=False):
+    """{'ano1-ano2': url} de todas as janelas publicadas, via catálogo ou parse estático."""
+    return _resolver('trajetoria', URL_BASE_TRAJETORIA, extrair_links_trajetoria, ttl, forcar)
@@ -0,0 +1,114 @@
+import os
+import re
+import time
+import threading
+import http.server
+from email.utils import formatdate
+from urllib.parse import urlsplit
+
+# Servidor HTTP local que se comporta como o servidor de downloads do INEP
+# (ETag, Last-Modified, Range/If-Range e 304), usado pelo benchmark e pelos
+# testes para exercitar os downloads sem rede. Subclasses preenchem
+# `paginas` ({caminho: bytes do HTML}) e `arquivos` ({caminho: arquivo local}).
+
+
+class ManipuladorInep(http.server.BaseHTTPRequestHandler):
+    """Páginas de listagem e arquivos, com ETag, Last-Modified, Range/If-Range e 304 como o servidor do INEP."""
+    protocol_version = 'HTTP/1.1'
+    paginas = {}
+    arquivos = {}
+    taxa = None  # bytes/s por conexão (None = sem limite)
+
+    def log_message(self, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # O cliente largou a conexão mantida aberta (ex: segmento cancelado)
+
+    def do_HEAD(self):
+        self._responder(enviar_corpo=False)
+
+    def do_GET(self):
+        self._responder(enviar_corpo=True)
+
+    def _responder(self, enviar_corpo):
+        caminho = urlsplit(self.path).path
+        if caminho in self.paginas:
+            corpo = self.paginas[caminho]
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            if enviar_corpo:
+                self.wfile.write(corpo)
+            return
+        if caminho not in self.arquivos:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        arquivo = self.arquivos[caminho]
+        tamanho = os.path.getsize(arquivo)
+        modificado = os.path.getmtime(arquivo)
+        etag = f'"{tamanho:x}-{int(modificado):x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        inicio, fim = 0, tamanho - 1
+        faixa = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        if_range = self.headers.get('If-Range')
+        if faixa and (if_range is None or if_range == etag):
+            inicio = int(faixa.group(1))
+            fim = min(int(faixa.group(2)) if faixa.group(2) else tamanho - 1, tamanho - 1)
+            if inicio >= tamanho:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{tamanho}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {inicio}-{fim}/{tamanho}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(modificado, usegmt=True))
+        self.send_header('Content-Length', str(fim - inicio + 1))
+        self.end_headers()
+        if enviar_corpo:
+            self._enviar(arquivo, inicio, fim)
+
+    def _enviar(self, arquivo, inicio, fim):
+        bloco = 64 * 1024
+        cronometro = time.perf_counter()
+        enviados = 0
+        try:
+            with open(arquivo, 'rb') as f:
+                f.seek(inicio)
+                while enviados < fim - inicio + 1:
+                    dados = f.read(min(bloco, fim - inicio + 1 - enviados))
+                    self.wfile.write(dados)
+                    enviados += len(dados)
+                    if self.taxa:
+                        espera = cronometro + enviados / self.taxa - time.perf_counter()
+                        if espera > 0:
+                            time.sleep(espera)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # O cliente fechou a conexão (ex: a sondagem de Range lê só o primeiro byte)
+
+
+def subir_servidor(manipulador):
+    """Sobe `manipulador` numa porta livre, numa thread, e devolve (servidor, url_base)."""
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), manipulador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f'http://127.0.0.1:{servidor.server_address[1]}'
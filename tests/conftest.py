@@ -0,0 +1,86 @@
+import os
+import sys
+import functools
+import http.server
+
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from servidor_local import ManipuladorInep, subir_servidor
+
+
+class ManipuladorRegistrando(ManipuladorInep):
+    """O servidor local do benchmark (Range, If-Range, ETag, 304), anotando cada resposta enviada."""
+    requisicoes = None
+
+    def send_response(self, codigo, mensagem=None):
+        self.requisicoes.append({
+            'status': codigo,
+            'range': self.headers.get('Range'),
+            'if_range': self.headers.get('If-Range'),
+            'if_none_match': self.headers.get('If-None-Match'),
+        })
+        super().send_response(codigo, mensagem)
+
+
+class ManipuladorSemRange(http.server.SimpleHTTPRequestHandler):
+    """Servidor de arquivos comum: ignora Range e responde sempre 200 com o arquivo inteiro."""
+
+    def log_message(self, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # O cliente fecha a conexão depois de ver que o Range foi ignorado
+
+
+@pytest.fixture
+def servidor_http():
+    """servidor_http(manipulador) sobe um servidor numa porta livre e devolve a URL base."""
+    servidores = []
+
+    def subir(manipulador):
+        servidor, url_base = subir_servidor(manipulador)
+        servidores.append(servidor)
+        return url_base
+
+    yield subir
+    for servidor in servidores:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+@pytest.fixture
+def manipulador_registrando():
+    """A classe base de servidor_range, para testes que alteram o comportamento do servidor (ex: _enviar)."""
+    return ManipuladorRegistrando
+
+
+@pytest.fixture
+def servidor_range(servidor_http):
+    """
+    servidor_range({'/caminho': arquivo_local}, base=ManipuladorRegistrando)
+    devolve (url_base, requisicoes), com as respostas anotadas em `requisicoes`.
+    `base` pode ser uma subclasse de manipulador_registrando.
+    """
+    def subir(arquivos, base=ManipuladorRegistrando):
+        requisicoes = []
+        manipulador = type('ManipuladorTeste', (base,), {
+            'paginas': {},
+            'arquivos': arquivos,
+            'requisicoes': requisicoes,
+        })
+        return servidor_http(manipulador), requisicoes
+    return subir
+
+
+@pytest.fixture
+def servidor_sem_range(servidor_http):
+    """servidor_sem_range(pasta) serve os arquivos da pasta sem suporte a Range e devolve a URL base."""
+    def subir(pasta):
+        return servidor_http(functools.partial(ManipuladorSemRange, directory=str(pasta)))
+    return subir
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from instituicoes import CO_IES_UFRJ
+from armazenamento_colunar import ler_particao
+from armazem_coortes import incorporar_janela, reconstruir_janela, ler_coortes, janelas_incorporadas
+
+pytest.importorskip('pyarrow')
+
+
+def _janela(linhas):
+    """Planilha de trajetória mínima: (CO_CURSO, NU_ANO_INGRESSO, NU_ANO_REFERENCIA, QT_PERMANENCIA, TAP)."""
+    return pd.DataFrame(linhas, columns=['CO_CURSO', 'NU_ANO_INGRESSO', 'NU_ANO_REFERENCIA', 'QT_PERMANENCIA', 'TAP'])
+
+
+def _ordenado(df):
+    colunas = ['CO_CURSO', 'NU_ANO_INGRESSO', 'NU_ANO_REFERENCIA', 'QT_PERMANENCIA', 'TAP']
+    df = df[colunas].astype('float64')
+    return df.sort_values(colunas[:3], ignore_index=True)
+
+
+JANELA_A = _janela([
+    (1, 2015, 2015, 40, 100), (1, 2015, 2016, 35, 87.5),
+    (2, 2015, 2015, 20, 100), (2, 2015, 2016, 18, 90),
+])
+# Republicação: uma linha igual, uma revisada, uma nova e a outra igual
+JANELA_B = _janela([
+    (1, 2015, 2015, 40, 100), (1, 2015, 2016, 34, 85),
+    (2, 2015, 2015, 20, 100), (2, 2015, 2016, 18, 90), (2, 2015, 2017, 15, 75),
+])
+
+
+def test_contagens_de_identicas_novas_e_revisadas(tmp_path):
+    estatisticas, particoes = incorporar_janela(JANELA_A, '2015-2024', CO_IES_UFRJ, str(tmp_path))
+    assert estatisticas == {'identicas': 0, 'novas': 4, 'revisadas': 0}
+    assert len(particoes) == 1
+
+    estatisticas, _ = incorporar_janela(JANELA_B, '2015-2025', CO_IES_UFRJ, str(tmp_path))
+
+    assert estatisticas == {'identicas': 3, 'novas': 1, 'revisadas': 1}
+    guardado = ler_particao(CO_IES_UFRJ, 'trajetoria', 2015, str(tmp_path))
+    assert len(guardado) == 6  # 4 de A, a revisão e a linha nova de B
+    assert janelas_incorporadas(CO_IES_UFRJ, str(tmp_path)) == ['2015-2024', '2015-2025']
+    # A versão atual de cada linha é a da janela mais recente
+    atual = ler_coortes(CO_IES_UFRJ, str(tmp_path))
+    assert len(atual) == 5
+    assert atual.loc[(atual['CO_CURSO'] == 1) & (atual['NU_ANO_REFERENCIA'] == 2016), 'QT_PERMANENCIA'].item() == 34
+
+
+def test_mesmo_valor_como_inteiro_ou_decimal_nao_e_revisao(tmp_path):
+    # Em A a coluna TAP só tem inteiros (vira Int64); em B tem um decimal (fica float)
+    a = _janela([(1, 2015, 2015, 10, 100), (2, 2015, 2015, 10, 50)])
+    b = _janela([(1, 2015, 2015, 10, 100), (2, 2015, 2015, 10, 33.3)])
+    incorporar_janela(a, '2015-2024', CO_IES_UFRJ, str(tmp_path))
+
+    estatisticas, _ = incorporar_janela(b, '2015-2025', CO_IES_UFRJ, str(tmp_path))
+
+    assert estatisticas == {'identicas': 1, 'novas': 0, 'revisadas': 1}
+    assert len(ler_particao(CO_IES_UFRJ, 'trajetoria', 2015, str(tmp_path))) == 3
+
+
+def test_reincorporar_a_mesma_janela_nao_duplica(tmp_path):
+    incorporar_janela(JANELA_A, '2015-2024', CO_IES_UFRJ, str(tmp_path))
+    incorporar_janela(JANELA_B, '2015-2025', CO_IES_UFRJ, str(tmp_path))
+
+    incorporar_janela(JANELA_B, '2015-2025', CO_IES_UFRJ, str(tmp_path))
+
+    assert len(ler_particao(CO_IES_UFRJ, 'trajetoria', 2015, str(tmp_path))) == 6
+    assert janelas_incorporadas(CO_IES_UFRJ, str(tmp_path)) == ['2015-2024', '2015-2025']
+
+
+def test_reconstruir_janela_devolve_as_linhas_originais(tmp_path):
+    incorporar_janela(JANELA_A, '2015-2024', CO_IES_UFRJ, str(tmp_path))
+    incorporar_janela(JANELA_B, '2015-2025', CO_IES_UFRJ, str(tmp_path))
+
+    pd.testing.assert_frame_equal(_ordenado(reconstruir_janela('2015-2024', CO_IES_UFRJ, str(tmp_path))),
+                                  _ordenado(JANELA_A))
+    pd.testing.assert_frame_equal(_ordenado(reconstruir_janela('2015-2025', CO_IES_UFRJ, str(tmp_path))),
+                                  _ordenado(JANELA_B))
+    assert reconstruir_janela('2016-2025', CO_IES_UFRJ, str(tmp_path)).empty
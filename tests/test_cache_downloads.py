@@ -0,0 +1,130 @@
+import os
+import hashlib
+
+import pytest
+
+import cache_downloads
+from cache_downloads import obter_arquivo, consultar_cache
+
+TAMANHO_ARQUIVO = 4 * 1024 ** 2
+TAMANHO_SEGMENTO = 1024 ** 2
+
+
+@pytest.fixture(autouse=True)
+def segmentos_pequenos(monkeypatch):
+    # Vários segmentos mesmo num arquivo de poucos MB
+    monkeypatch.setattr(cache_downloads, 'TAMANHO_SEGMENTO_MINIMO', TAMANHO_SEGMENTO)
+
+
+@pytest.fixture
+def arquivo_remoto(tmp_path):
+    caminho = tmp_path / 'servidor' / 'microdados.zip'
+    caminho.parent.mkdir()
+    caminho.write_bytes(os.urandom(TAMANHO_ARQUIVO))
+    return caminho
+
+
+def _sha256(dados):
+    return hashlib.sha256(dados).hexdigest()
+
+
+def test_download_segmentado_confere_tamanho_e_sha256(arquivo_remoto, servidor_range, tmp_path):
+    url_base, requisicoes = servidor_range({'/microdados.zip': str(arquivo_remoto)})
+    conteudo = arquivo_remoto.read_bytes()
+    url = f'{url_base}/microdados.zip'
+
+    caminho = obter_arquivo(url, pasta_cache=str(tmp_path / 'cache'), conexoes=2, sha256_esperado=_sha256(conteudo))
+
+    assert open(caminho, 'rb').read() == conteudo
+    metadados = consultar_cache(url, str(tmp_path / 'cache'))
+    assert metadados['sha256'] == _sha256(conteudo)
+    assert metadados['bytes_ultima_execucao'] == TAMANHO_ARQUIVO
+    faixas = sorted(requisicao['range'] for requisicao in requisicoes if requisicao['range'] != 'bytes=0-0')
+    assert faixas == [f'bytes={inicio}-{inicio + TAMANHO_SEGMENTO - 1}'
+                      for inicio in range(0, TAMANHO_ARQUIVO, TAMANHO_SEGMENTO)]
+    assert all(requisicao['status'] == 206 and requisicao['if_range'] for requisicao in requisicoes
+               if requisicao['range'] != 'bytes=0-0')
+
+
+def test_sha256_diferente_do_esperado_falha(arquivo_remoto, servidor_range, tmp_path):
+    url_base, _ = servidor_range({'/microdados.zip': str(arquivo_remoto)})
+    url = f'{url_base}/microdados.zip'
+
+    with pytest.raises(Exception, match='sha256'):
+        obter_arquivo(url, pasta_cache=str(tmp_path / 'cache'), conexoes=2, sha256_esperado='0' * 64)
+    assert consultar_cache(url, str(tmp_path / 'cache')) is None
+
+
+def test_segmento_interrompido_retoma_de_onde_parou(arquivo_remoto, servidor_range, manipulador_registrando,
+                                                   tmp_path):
+    quedas = []
+
+    class ManipuladorQueCai(manipulador_registrando):
+        def _enviar(self, arquivo, inicio, fim):
+            if inicio == TAMANHO_SEGMENTO and not quedas:
+                # Envia pouco mais de meio segmento e derruba a conexão
+                quedas.append(inicio)
+                with open(arquivo, 'rb') as f:
+                    f.seek(inicio)
+                    self.wfile.write(f.read(600 * 1024))
+                self.close_connection = True
+                return
+            super()._enviar(arquivo, inicio, fim)
+
+    url_base, requisicoes = servidor_range({'/microdados.zip': str(arquivo_remoto)}, base=ManipuladorQueCai)
+
+    caminho = obter_arquivo(f'{url_base}/microdados.zip', pasta_cache=str(tmp_path / 'cache'), conexoes=2)
+
+    assert quedas
+    assert open(caminho, 'rb').read() == arquivo_remoto.read_bytes()
+    # Os chunks já recebidos (2 de 256 KB) não são pedidos de novo
+    retomada = f'bytes={TAMANHO_SEGMENTO + 2 * cache_downloads.CHUNK_MINIMO}-{2 * TAMANHO_SEGMENTO - 1}'
+    assert retomada in [requisicao['range'] for requisicao in requisicoes]
+
+
+def test_arquivo_inalterado_reaproveita_o_cache(arquivo_remoto, servidor_range, tmp_path):
+    url_base, requisicoes = servidor_range({'/microdados.zip': str(arquivo_remoto)})
+    url = f'{url_base}/microdados.zip'
+    primeiro = obter_arquivo(url, pasta_cache=str(tmp_path / 'cache'), conexoes=2)
+    del requisicoes[:]
+
+    segundo = obter_arquivo(url, pasta_cache=str(tmp_path / 'cache'), conexoes=2)
+
+    assert segundo == primeiro
+    assert [requisicao['status'] for requisicao in requisicoes] == [304]
+    assert requisicoes[0]['if_none_match']
+    assert consultar_cache(url, str(tmp_path / 'cache'))['bytes_ultima_execucao'] == 0
+
+
+def test_servidor_sem_range_baixa_em_uma_conexao(arquivo_remoto, servidor_sem_range, tmp_path):
+    url_base = servidor_sem_range(arquivo_remoto.parent)
+
+    caminho = obter_arquivo(f'{url_base}/{arquivo_remoto.name}', pasta_cache=str(tmp_path / 'cache'), conexoes=4)
+
+    assert open(caminho, 'rb').read() == arquivo_remoto.read_bytes()
+    assert not os.listdir(tmp_path / 'cache' / 'parciais')
+
+
+def test_arquivo_alterado_durante_o_download_recomeca(arquivo_remoto, servidor_range, manipulador_registrando,
+                                                     tmp_path):
+    novo_conteudo = os.urandom(TAMANHO_ARQUIVO + 12_345)
+
+    class ManipuladorQueAltera(manipulador_registrando):
+        def _enviar(self, arquivo, inicio, fim):
+            super()._enviar(arquivo, inicio, fim)
+            if (inicio, fim) == (0, 0) and open(arquivo, 'rb').read() != novo_conteudo:
+                # Publicado de novo logo depois da sondagem: os segmentos levam o ETag antigo no If-Range
+                with open(arquivo, 'wb') as f:
+                    f.write(novo_conteudo)
+                os.utime(arquivo, (os.path.getmtime(arquivo) + 60,) * 2)
+
+    url_base, requisicoes = servidor_range({'/microdados.zip': str(arquivo_remoto)}, base=ManipuladorQueAltera)
+    url = f'{url_base}/microdados.zip'
+
+    caminho = obter_arquivo(url, pasta_cache=str(tmp_path / 'cache'), conexoes=2)
+
+    assert open(caminho, 'rb').read() == novo_conteudo
+    assert consultar_cache(url, str(tmp_path / 'cache'))['sha256'] == _sha256(novo_conteudo)
+    # O servidor recusou o If-Range antigo com o arquivo inteiro (200) em vez de misturar versões
+    assert any(requisicao['if_range'] and requisicao['status'] == 200 for requisicao in requisicoes)
+    assert not os.listdir(tmp_path / 'cache' / 'parciais')
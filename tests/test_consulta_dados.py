@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+import pytest
+
+from instituicoes import CO_IES_UFRJ
+from consulta_dados import tabela_censo
+from update_censo import filtrar_csv_por_ies, salvar_saidas_censo, caminho_csv_censo
+
+
+@pytest.fixture
+def csv_microdados(tmp_path):
+    caminho = tmp_path / 'MICRODADOS_CADASTRO_CURSOS_2022.CSV'
+    pd.DataFrame({
+        'NU_ANO_CENSO': 2022,
+        'CO_IES': [CO_IES_UFRJ, 1, CO_IES_UFRJ, 2],
+        'CO_CURSO': [10, 11, 12, 13],
+        'NO_CURSO': ['Física', 'Química', 'Música', 'Pedagogia'],
+        'QT_MAT': [100, 200, 300, 400],
+        'QT_ING': [10, 20, 30, 40],
+    }).to_csv(caminho, sep=';', index=False, encoding='latin-1')
+    return caminho
+
+
+@pytest.mark.parametrize('formatos', [('csv',), ('csv', 'parquet')])
+def test_consulta_sobre_saida_com_selecao_de_colunas(csv_microdados, tmp_path, formatos):
+    if 'parquet' in formatos:
+        pytest.importorskip('pyarrow')
+    pasta_base = str(tmp_path / 'saida')
+    dfs = filtrar_csv_por_ies(str(csv_microdados), codigos_ies=[CO_IES_UFRJ], colunas=['QT_MAT'])
+    salvar_saidas_censo(2022, dfs, pasta_base, formatos)
+
+    resultado = tabela_censo(pasta_base=pasta_base).consultar(cursos=[12], colunas=['QT_MAT'])
+
+    assert resultado.to_dict('records') == [{'CO_CURSO': 12, 'NU_ANO_CENSO': 2022, 'QT_MAT': 300}]
+    assert 'QT_ING' not in tabela_censo(pasta_base=pasta_base).colunas()
+
+
+def test_saida_sem_as_chaves_tem_erro_claro(tmp_path):
+    pasta_base = str(tmp_path)
+    caminho = caminho_csv_censo(2022, CO_IES_UFRJ, pasta_base)
+    os.makedirs(os.path.dirname(caminho))
+    pd.DataFrame({'CO_IES': [CO_IES_UFRJ], 'QT_MAT': [1]}).to_csv(caminho, index=False, encoding='utf-8-sig')
+
+    with pytest.raises(Exception, match="não tem as colunas"):
+        tabela_censo(pasta_base=pasta_base).consultar(cursos=[12])
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+import update_censo
+from instituicoes import CO_IES_UFRJ, pasta_saida_ies
+from manifesto import registrar_saida, registrar_saidas, motivo_reprocessamento
+
+URL = 'https://download.inep.gov.br/microdados/microdados_censo_da_educacao_superior_2022.zip'
+ORIGEM = {'etag': '"abc"', 'last_modified': 'Mon, 02 Oct 2023 10:00:00 GMT', 'tamanho': 1000, 'sha256': None}
+
+
+def _saida(pasta_base, nome):
+    pasta = pasta_saida_ies(CO_IES_UFRJ, 'censo_es', pasta_base)
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, nome)
+    with open(caminho, 'w') as f:
+        f.write('CO_CURSO\n1\n')
+    return caminho
+
+
+def _registrar(pasta_base, origem=ORIGEM, formato='csv', nome='censo_2022.csv'):
+    caminho = _saida(pasta_base, nome)
+    registrar_saida(CO_IES_UFRJ, caminho, 'censo', '2022', URL, origem, 1, 1, pasta_base=pasta_base, formato=formato)
+    return caminho
+
+
+def _motivo(pasta_base, origem=ORIGEM, formatos=('csv',)):
+    return motivo_reprocessamento(CO_IES_UFRJ, 'censo', '2022', URL, origem, 1, pasta_base=pasta_base,
+                                  formatos=formatos)
+
+
+def test_fonte_sem_registro_e_nova(tmp_path):
+    assert _motivo(str(tmp_path)) == 'nova'
+
+
+def test_saida_registrada_e_inalterada_nao_e_reprocessada(tmp_path):
+    _registrar(str(tmp_path))
+
+    assert _motivo(str(tmp_path)) is None
+    assert _motivo(str(tmp_path), origem={}) is None  # Servidor fora do ar: mantém o que já existe
+
+
+def test_etag_alterado(tmp_path):
+    _registrar(str(tmp_path))
+
+    assert _motivo(str(tmp_path), origem=dict(ORIGEM, etag='"def"')) == 'ETag alterado'
+
+
+def test_sha256_prevalece_sobre_o_etag(tmp_path):
+    _registrar(str(tmp_path), origem=dict(ORIGEM, sha256='1' * 64))
+
+    # Republicado com o mesmo conteúdo: ETag novo, mas nada a refazer
+    assert _motivo(str(tmp_path), origem=dict(ORIGEM, etag='"def"', sha256='1' * 64)) is None
+    assert _motivo(str(tmp_path), origem=dict(ORIGEM, sha256='2' * 64)) == 'conteúdo alterado'
+
+
+def test_saida_apagada(tmp_path):
+    os.remove(_registrar(str(tmp_path)))
+
+    assert _motivo(str(tmp_path)) == 'saída ausente'
+
+
+def test_particao_apagada(tmp_path):
+    pasta_base = str(tmp_path)
+    particoes = [_saida(pasta_base, 'ano=2021.parquet'), _saida(pasta_base, 'ano=2022.parquet')]
+    registrar_saidas(CO_IES_UFRJ, [{'caminho': os.path.join(os.path.dirname(particoes[0]), 'janela=2022'),
+                                    'formato': 'csv', 'linhas': 2, 'particoes': particoes}],
+                     'censo', '2022', URL, ORIGEM, 1, pasta_base=pasta_base)
+    assert _motivo(pasta_base) is None
+
+    os.remove(particoes[1])
+
+    assert _motivo(pasta_base) == 'saída ausente'
+
+
+def test_formato_ainda_nao_gerado(tmp_path):
+    _registrar(str(tmp_path))
+
+    assert _motivo(str(tmp_path), formatos=('csv', 'parquet')) == 'formato parquet ausente'
+    _registrar(str(tmp_path), formato='parquet', nome='ano=2022.parquet')
+    assert _motivo(str(tmp_path), formatos=('csv', 'parquet')) is None
+
+
+def test_sincronizar_censo_so_nos_anos_pedidos(tmp_path, monkeypatch):
+    processados = []
+
+    def processar(pendentes, **kwargs):
+        processados.extend(pendentes)
+        return {ano: {} for ano in pendentes}
+
+    monkeypatch.setattr(update_censo, 'resolver_links_censo',
+                        lambda forcar=False: {ano: f'{URL[:-8]}{ano}.zip' for ano in ('2021', '2022', '2023')})
+    monkeypatch.setattr(update_censo, 'metadados_origem', lambda url, headers=None: ORIGEM)
+    monkeypatch.setattr(update_censo, 'processar_anos_censo_lote', processar)
+
+    update_censo.sincronizar_censo(anos=[2022, '2023'], pasta_base=str(tmp_path), formatos=('csv',))
+
+    assert sorted(processados) == ['2022', '2023']
+    assert update_censo.sincronizar_censo(anos=[2030], pasta_base=str(tmp_path), formatos=('csv',)) == {}
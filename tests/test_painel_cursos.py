@@ -0,0 +1,91 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import update_censo
+from instituicoes import CO_IES_UFRJ
+from armazenamento_colunar import caminho_particao, salvar_particao
+from armazem_coortes import incorporar_janela
+from painel_cursos import atualizar_painel, ler_ano_painel
+
+pytest.importorskip('pyarrow')
+
+
+def _salvar_censo(ano, qt_mat, pasta_base):
+    df = pd.DataFrame({'NU_ANO_CENSO': ano, 'CO_IES': CO_IES_UFRJ, 'CO_CURSO': [1, 2],
+                       'NO_CURSO': ['Física', 'Música'], 'QT_MAT': qt_mat})
+    caminho = salvar_particao(df, CO_IES_UFRJ, 'censo', ano, pasta_base=pasta_base)
+    # A assinatura usa tamanho e mtime: garante um mtime diferente numa regravação imediata
+    mtime = os.path.getmtime(caminho) + ano
+    os.utime(caminho, (mtime, mtime))
+
+
+def _janela(linhas):
+    return pd.DataFrame(linhas, columns=['CO_CURSO', 'NU_ANO_INGRESSO', 'NU_ANO_REFERENCIA',
+                                         'QT_INGRESSANTE', 'QT_PERMANENCIA'])
+
+
+@pytest.fixture
+def pasta_base(tmp_path):
+    pasta_base = str(tmp_path)
+    _salvar_censo(2021, [100, 200], pasta_base)
+    _salvar_censo(2022, [110, 210], pasta_base)
+    incorporar_janela(_janela([(1, 2021, 2021, 50, 50), (1, 2021, 2022, 50, 45)]), '2021-2022',
+                      CO_IES_UFRJ, pasta_base)
+    assert atualizar_painel(CO_IES_UFRJ, pasta_base) == {'atualizados': [2021, 2022], 'removidos': []}
+    return pasta_base
+
+
+def _valor(ano, curso, coluna, pasta_base):
+    painel = ler_ano_painel(ano, CO_IES_UFRJ, pasta_base)
+    return painel.loc[painel['CO_CURSO'] == curso, coluna].item()
+
+
+def test_sem_mudancas_nada_e_refeito(pasta_base):
+    assert atualizar_painel(CO_IES_UFRJ, pasta_base) == {'atualizados': [], 'removidos': []}
+
+
+def test_ano_do_censo_alterado_refaz_so_aquele_ano(pasta_base):
+    _salvar_censo(2022, [111, 211], pasta_base)
+
+    assert atualizar_painel(CO_IES_UFRJ, pasta_base) == {'atualizados': [2022], 'removidos': []}
+    assert _valor(2022, 1, 'QT_MAT', pasta_base) == 111
+    assert _valor(2022, 1, 'QT_PERMANENCIA_COORTES', pasta_base) == 45
+
+
+def test_coorte_nova_refaz_os_anos_de_referencia_dela(pasta_base):
+    incorporar_janela(_janela([(2, 2022, 2022, 30, 30)]), '2022-2022', CO_IES_UFRJ, pasta_base)
+
+    assert atualizar_painel(CO_IES_UFRJ, pasta_base) == {'atualizados': [2022], 'removidos': []}
+    assert _valor(2022, 2, 'QT_INGRESSANTE_COORTE', pasta_base) == 30
+    assert _valor(2022, 1, 'QT_PERMANENCIA_COORTES', pasta_base) == 45
+
+
+def test_origem_removida(pasta_base):
+    # 2022 ainda tem a trajetória: o ano é refeito sem as colunas do Censo
+    shutil.rmtree(os.path.dirname(caminho_particao(CO_IES_UFRJ, 'censo', 2022, pasta_base)))
+    assert atualizar_painel(CO_IES_UFRJ, pasta_base) == {'atualizados': [2022], 'removidos': []}
+    assert pd.isna(_valor(2022, 1, 'QT_MAT', pasta_base))
+
+    # Sem a coorte, 2022 perde todas as origens e sai do painel
+    shutil.rmtree(os.path.dirname(caminho_particao(CO_IES_UFRJ, 'trajetoria', 2021, pasta_base)))
+    assert atualizar_painel(CO_IES_UFRJ, pasta_base) == {'atualizados': [2021], 'removidos': [2022]}
+    assert ler_ano_painel(2022, CO_IES_UFRJ, pasta_base) is None
+    assert pd.isna(_valor(2021, 1, 'QT_PERMANENCIA_COORTES', pasta_base))
+
+
+def test_download_em_lote_atualiza_o_painel(tmp_path, monkeypatch):
+    atualizados = []
+    monkeypatch.setattr(update_censo, 'coletar_links_censo', lambda anos: {ano: f'{ano}.zip' for ano in anos})
+    monkeypatch.setattr(update_censo, 'processar_anos_censo_lote',
+                        lambda links, **kwargs: {ano: {CO_IES_UFRJ: 1} for ano in links})
+    monkeypatch.setattr('painel_cursos.atualizar_painel',
+                        lambda co_ies, pasta_base: atualizados.append((co_ies, pasta_base)))
+
+    update_censo.baixar_censo_superior_lote(2021, 2022, pasta_base=str(tmp_path))
+    assert atualizados == [(CO_IES_UFRJ, str(tmp_path))]
+
+    update_censo.baixar_censo_superior_lote(2021, 2022, pasta_base=str(tmp_path), formatos=('csv',))
+    assert len(atualizados) == 1
@@ -0,0 +1,92 @@
+import os
+import time
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import update_trajetoria
+from instituicoes import CO_IES_UFRJ, pasta_saida_ies
+from update_trajetoria import processar_links_em_pipeline, HEADERS_DOWNLOAD
+
+JANELAS = ((2015, 2024), (2016, 2024), (2017, 2024), (2018, 2024))
+
+
+def _gerar_zip(caminho_zip, inicio, fim):
+    planilha = openpyxl.Workbook()
+    aba = planilha.active
+    aba.append(['Indicadores de Trajetória da Educação Superior'])
+    aba.append(['CO_IES', 'CO_CURSO', 'NU_ANO_INGRESSO', 'NU_ANO_REFERENCIA', 'QT_PERMANENCIA'])
+    for co_ies in (1, CO_IES_UFRJ, 2):
+        for ano in range(inicio, fim + 1):
+            aba.append([co_ies, 10, inicio, ano, 100 - (ano - inicio)])
+    caminho_xlsx = caminho_zip.with_suffix('.xlsx')
+    planilha.save(caminho_xlsx)
+    with zipfile.ZipFile(caminho_zip, 'w') as zip_ref:
+        zip_ref.write(caminho_xlsx, f'dados/{caminho_xlsx.name}')
+    os.remove(caminho_xlsx)
+
+
+@pytest.fixture
+def servidor_trajetoria(tmp_path, servidor_sem_range, monkeypatch):
+    """Zips pequenos de trajetória servidos localmente; o cache de downloads fica em tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    pasta = tmp_path / 'servidor'
+    pasta.mkdir()
+    for inicio, fim in JANELAS:
+        _gerar_zip(pasta / f'indicadores_trajetoria_{inicio}_{fim}.zip', inicio, fim)
+    with zipfile.ZipFile(pasta / 'indicadores_trajetoria_2019_2024.zip', 'w') as zip_ref:
+        zip_ref.writestr('leiame.txt', 'sem planilha')
+    return servidor_sem_range(pasta)
+
+
+def _processar(url_base, links, tmp_path, **kwargs):
+    pasta_temporaria = tmp_path / 'temp'
+    pastas_csv = {CO_IES_UFRJ: pasta_saida_ies(CO_IES_UFRJ, 'indicadores_trajetoria', str(tmp_path))}
+    os.makedirs(pastas_csv[CO_IES_UFRJ])
+    erros = processar_links_em_pipeline([f'{url_base}/{link}' for link in links], str(pasta_temporaria), pastas_csv,
+                                        [CO_IES_UFRJ], HEADERS_DOWNLOAD, pasta_base=str(tmp_path), formatos=('csv',),
+                                        **kwargs)
+    return erros, pastas_csv[CO_IES_UFRJ]
+
+
+@pytest.mark.parametrize('max_extraidos', [1, 2])
+def test_limite_de_planilhas_extraidas_em_disco(servidor_trajetoria, tmp_path, monkeypatch, max_extraidos):
+    ler_original = update_trajetoria.ler_xlsx_filtrando_ies
+    extraidas = []
+
+    def ler_devagar(caminho_xlsx, *args, **kwargs):
+        # Leitura lenta: sem o limite, as outras extrações se acumulariam em disco enquanto isso
+        time.sleep(0.2)
+        extraidas.append(len(os.listdir(tmp_path / 'temp')))
+        return ler_original(caminho_xlsx, *args, **kwargs)
+
+    monkeypatch.setattr(update_trajetoria, 'ler_xlsx_filtrando_ies', ler_devagar)
+    links = [f'indicadores_trajetoria_{inicio}_{fim}.zip' for inicio, fim in JANELAS]
+
+    erros, pasta_csv = _processar(servidor_trajetoria, links, tmp_path, max_downloads=4, max_extracoes=4,
+                                  max_leituras=4, max_extraidos=max_extraidos)
+
+    assert erros == {}
+    assert len(extraidas) == len(JANELAS)
+    assert max(extraidas) <= max_extraidos
+    assert len(os.listdir(pasta_csv)) == len(JANELAS)
+    assert not os.listdir(tmp_path / 'temp')
+
+
+def test_falha_num_arquivo_nao_interrompe_os_outros(servidor_trajetoria, tmp_path, monkeypatch):
+    monkeypatch.setattr('cache_downloads.time.sleep', lambda segundos: None)  # Sem espera entre as tentativas
+    links = ['indicadores_trajetoria_2015_2024.zip', 'indicadores_trajetoria_2019_2024.zip',
+             'indicadores_trajetoria_2020_2024.zip', 'indicadores_trajetoria_2016_2024.zip']
+
+    erros, pasta_csv = _processar(servidor_trajetoria, links, tmp_path, max_extraidos=1)
+
+    # Um zip sem planilha (falha na extração) e um link inexistente (falha no download)
+    assert sorted(erros) == ['indicadores_trajetoria_2019_2024.zip', 'indicadores_trajetoria_2020_2024.zip']
+    assert sorted(os.listdir(pasta_csv)) == ['UFRJ_indicadores_trajetoria_2015_2024.csv',
+                                             'UFRJ_indicadores_trajetoria_2016_2024.csv']
+    df = pd.read_csv(os.path.join(pasta_csv, 'UFRJ_indicadores_trajetoria_2015_2024.csv'), encoding='utf-8-sig')
+    assert set(df['CO_IES']) == {CO_IES_UFRJ}
+    assert len(df) == 10
+    assert not os.listdir(tmp_path / 'temp')
@@ -0,0 +1,72 @@
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from instituicoes import CO_IES_UFRJ
+from zip_remoto import abrir_zip_remoto
+from update_censo import filtrar_url_por_ies, filtrar_zip_censo, localizar_zip_censo
+
+MEMBRO_DADOS = 'microdados_censo_da_educacao_superior_2022/dados/MICRODADOS_CADASTRO_CURSOS_2022.CSV'
+LINHAS = 2_000
+
+
+@pytest.fixture
+def zip_censo(tmp_path):
+    """
+    Zip no formato dos microdados: um anexo grande e incompressível antes do
+    CSV de dados (que a leitura parcial não deve baixar) e o CSV com um curso
+    da UFRJ a cada 50 linhas. Devolve (caminho, linhas da UFRJ).
+    """
+    df = pd.DataFrame({
+        'NU_ANO_CENSO': 2022,
+        'CO_IES': [CO_IES_UFRJ if linha % 50 == 0 else 1_000 + linha for linha in range(LINHAS)],
+        'CO_CURSO': range(1, LINHAS + 1),
+        'NO_CURSO': ['Física' if linha % 2 else 'Educação' for linha in range(LINHAS)],
+    })
+    caminho = tmp_path / 'servidor' / 'microdados_censo_da_educacao_superior_2022.zip'
+    caminho.parent.mkdir()
+    with zipfile.ZipFile(caminho, 'w') as zip_ref:
+        zip_ref.writestr('microdados_censo_da_educacao_superior_2022/anexos/anexo.bin', os.urandom(12 * 1024 ** 2))
+        zip_ref.writestr(MEMBRO_DADOS, df.to_csv(sep=';', index=False).encode('latin-1'),
+                         compress_type=zipfile.ZIP_DEFLATED)
+    return caminho, df[df['CO_IES'] == CO_IES_UFRJ]
+
+
+def test_filtrar_url_por_ies_le_so_o_membro_de_dados(zip_censo, servidor_range):
+    caminho, esperado = zip_censo
+    url_base, requisicoes = servidor_range({'/microdados.zip': str(caminho)})
+
+    membro, dfs, bytes_baixados = filtrar_url_por_ies(f'{url_base}/microdados.zip', codigos_ies=[CO_IES_UFRJ])
+
+    assert membro == MEMBRO_DADOS
+    assert list(dfs) == [CO_IES_UFRJ]
+    assert dfs[CO_IES_UFRJ]['CO_CURSO'].tolist() == esperado['CO_CURSO'].tolist()
+    assert dfs[CO_IES_UFRJ]['NO_CURSO'].tolist() == esperado['NO_CURSO'].tolist()
+    # O anexo de 12 MB nunca é pedido
+    assert bytes_baixados < os.path.getsize(caminho) / 2
+    assert all(requisicao['status'] == 206 for requisicao in requisicoes)
+
+
+def test_abrir_zip_remoto_sem_range_devolve_none(zip_censo, servidor_sem_range):
+    caminho, _ = zip_censo
+    url_base = servidor_sem_range(caminho.parent)
+
+    assert abrir_zip_remoto(f'{url_base}/{caminho.name}') is None
+    assert filtrar_url_por_ies(f'{url_base}/{caminho.name}') is None
+
+
+def test_localizar_zip_censo_sem_range_baixa_o_zip_inteiro(zip_censo, servidor_sem_range, tmp_path, monkeypatch):
+    caminho, esperado = zip_censo
+    url_base = servidor_sem_range(caminho.parent)
+    monkeypatch.chdir(tmp_path)  # O cache de downloads fica na pasta atual
+
+    origem, caminho_local = localizar_zip_censo(f'{url_base}/{caminho.name}', conexoes=1)
+
+    assert origem == 'local'
+    assert caminho_local.startswith('.cache_inep')
+    assert open(caminho_local, 'rb').read() == caminho.read_bytes()
+    membro, dfs = filtrar_zip_censo(origem, caminho_local, codigos_ies=[CO_IES_UFRJ])
+    assert membro == MEMBRO_DADOS
+    assert dfs[CO_IES_UFRJ]['CO_CURSO'].tolist() == esperado['CO_CURSO'].tolist()
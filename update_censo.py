@@ -1,64 +1,201 @@
 import os
+import sys
 import time
 import pandas as pd
-import requests
 import zipfile
-import glob
-import shutil
-import gc
-import subprocess, time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
-from bs4 import BeautifulSoup
+from zip_remoto import abrir_zip_remoto, verificar_suporte_range
+from resolvedor_links import URL_BASE_CENSO, resolver_links_censo
+from cache_downloads import CONEXOES_PADRAO, consultar_cache, obter_arquivo
+from esquema_microdados import opcoes_leitura, converter_tipos, carregar_esquema
+from instituicoes import (CODIGOS_IES_PADRAO, normalizar_codigos_ies, sigla_ies, pasta_saida_ies,
+                          mascara_ies, separar_por_ies, encontrar_coluna_ies)
+from manifesto import metadados_origem, registrar_saida, motivo_reprocessamento
+from armazenamento_colunar import FORMATOS_SAIDA_PADRAO, formatos_disponiveis, caminho_particao, salvar_particao
+from painel_cursos import atualizar_paineis
+from metricas import medir_etapa, medir_memoria, registrar_etapa, iterar_cronometrado, coletar_metricas, emitir, perfil
 
-# Importações do Selenium
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+# Ordem de preferência do arquivo de dados dentro do zip dos microdados
+PREFERENCIAS_ARQUIVO_DADOS = [
+    "CADASTRO_CURSOS",  # quero este primeiro
+    "CURSOS"
+]
+SUBPASTAS_DADOS = ('dados', 'microdados')
 
-def baixar_censo_superior_ufrj():
+# Quantidade de linhas lidas por vez do CSV nacional (limita o pico de memória)
+TAMANHO_CHUNK_PADRAO = 100_000
+
+# Versão da lógica de extração registrada no manifesto. Incremente quando uma
+# mudança alterar o conteúdo dos CSVs gerados, para que o sync os refaça.
+VERSAO_EXTRATOR_CENSO = 1
+
+
+def escolher_arquivo_dados(nomes_membros):
     """
-    Versão corrigida que busca o link de download diretamente, sem a necessidade
-    de cliques para expandir seções.
+    Recebe a lista de nomes de membros de um zip dos microdados e devolve o
+    CSV de dados preferido (ver PREFERENCIAS_ARQUIVO_DADOS), ou None.
+    Só considera arquivos .csv que estejam diretamente numa subpasta
+    'dados' ou 'microdados' (maiúsculas ou minúsculas).
     """
-    # --- Parte 1: Entrada do Usuário ---
-    ano_desejado = input("Digite o ano do Censo Superior que deseja baixar (ex: 2022): ")
-    if not ano_desejado.isdigit() or len(ano_desejado) != 4:
-        print("Entrada inválida. Por favor, digite um ano com 4 dígitos.")
-        return
+    arquivos_encontrados = []
+    for nome in nomes_membros:
+        partes = nome.replace('\\', '/').split('/')
+        if len(partes) < 2 or not partes[-1].lower().endswith('.csv'):
+            continue
+        if partes[-2].lower() in SUBPASTAS_DADOS:
+            arquivos_encontrados.append(nome)
 
-    print(f"Iniciando processo para o Censo da Educação Superior de {ano_desejado}...")
-    
-    pasta_raiz_temporaria = f"censo_superior_{ano_desejado}_temp"
-    if os.path.isdir(pasta_raiz_temporaria):
-        shutil.rmtree(pasta_raiz_temporaria, ignore_errors=True)
-    os.makedirs(pasta_raiz_temporaria, exist_ok=True)
+    for preferencia in PREFERENCIAS_ARQUIVO_DADOS:
+        for arquivo in arquivos_encontrados:
+            if preferencia in os.path.basename(arquivo).upper():
+                return arquivo
 
-    pasta_csv_final = os.path.join('DADOS_ES_UFRJ', 'censo_es_ufrj')
-    os.makedirs(pasta_csv_final, exist_ok=True)
+    return arquivos_encontrados[0] if arquivos_encontrados else None  # fallback
 
-    headers_download = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36'
-    }
 
-    # --- Parte 2: Coletar o link de download com Selenium (LÓGICA SIMPLIFICADA) ---
-    print("Iniciando Selenium para encontrar o link de download...")
+def filtrar_csv_por_ies(arquivo, codigos_ies=CODIGOS_IES_PADRAO, tamanho_chunk=TAMANHO_CHUNK_PADRAO,
+                        ano=None, colunas=None, esquema=None):
+    """
+    Lê um CSV dos microdados (';', latin-1) em blocos de `tamanho_chunk` linhas
+    e mantém apenas as linhas cuja coluna CO_IES esteja em `codigos_ies`.
+    `arquivo` pode ser um caminho ou um objeto binário aberto (ex.: ZipFile.open),
+    de modo que o arquivo nacional nunca é carregado inteiro na memória.
+    O arquivo é lido uma única vez para todas as IES; devolve {co_ies: DataFrame}.
+    Com `ano`, os tipos das colunas vêm do dicionário de dados (esquema_microdados)
+    em vez de inferidos (`esquema` evita carregar o esquema compilado de novo);
+    com `colunas`, só essas colunas (e CO_IES) são lidas.
+    """
+    codigos_ies = normalizar_codigos_ies(codigos_ies)
+    # 'ler' e 'filtrar' dividem o mesmo laço e levam a mesma medição de memória
+    with medir_memoria() as memoria:
+        cronometro = time.perf_counter()
+        leitor = pd.read_csv(arquivo, sep=';', encoding='latin-1', chunksize=tamanho_chunk, low_memory=False,
+                             **opcoes_leitura(ano, colunas, esquema))
+
+        # O parse (e a descompressão) acontece dentro do próprio laço: é medido à parte do filtro
+        leitura = {}
+        linhas_lidas = 0
+        partes_filtradas = []
+        coluna_ies = None
+        colunas = None
+        for chunk in iterar_cronometrado(leitor, leitura):
+            linhas_lidas += len(chunk)
+            if coluna_ies is None:
+                colunas = chunk.columns
+                coluna_ies = encontrar_coluna_ies(chunk.columns)
+                if not coluna_ies:
+                    raise Exception(f"A coluna 'CO_IES' não foi encontrada. Colunas disponíveis: {chunk.columns.tolist()}")
+
+            mascara = mascara_ies(chunk[coluna_ies], codigos_ies)
+            if mascara.any():
+                partes_filtradas.append(chunk[mascara])
+
+        if not partes_filtradas:
+            dfs = {co_ies: pd.DataFrame(columns=colunas) for co_ies in codigos_ies}
+        else:
+            filtrado = pd.concat(partes_filtradas, ignore_index=True)
+            if ano is not None:
+                filtrado = converter_tipos(filtrado, ano, esquema)
+            dfs = {co_ies: df.reset_index(drop=True) for co_ies, df in separar_por_ies(filtrado, coluna_ies, codigos_ies).items()}
+
+    registrar_etapa('ler', leitura['segundos'], 'censo', ano, linhas_lidas=linhas_lidas, **memoria)
+    registrar_etapa('filtrar', time.perf_counter() - cronometro - leitura['segundos'], 'censo', ano,
+                    linhas_lidas=linhas_lidas, linhas_mantidas=sum(len(df) for df in dfs.values()), **memoria)
+    return dfs
+
+
+def _filtrar_membro_dados(zip_ref, codigos_ies, tamanho_chunk, ano, colunas, esquema=None):
+    """Escolhe o CSV de dados do zip e o filtra em streaming."""
+    membro = escolher_arquivo_dados(zip_ref.namelist())
+    if not membro:
+        raise Exception("Nenhum arquivo de dados (.csv) encontrado nas subpastas esperadas.")
+    with zip_ref.open(membro) as arquivo_dados:
+        return membro, filtrar_csv_por_ies(arquivo_dados, codigos_ies=codigos_ies, tamanho_chunk=tamanho_chunk,
+                                           ano=ano, colunas=colunas, esquema=esquema)
+
+
+def filtrar_zip_por_ies(caminho_zip, codigos_ies=CODIGOS_IES_PADRAO, tamanho_chunk=TAMANHO_CHUNK_PADRAO,
+                        ano=None, colunas=None, esquema=None):
+    """
+    Abre o CSV de dados direto de dentro do zip (sem extrair o arquivo) e
+    devolve (nome_do_membro, {co_ies: DataFrame filtrado}).
+    """
+    with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
+        return _filtrar_membro_dados(zip_ref, codigos_ies, tamanho_chunk, ano, colunas, esquema)
+
+
+def filtrar_url_por_ies(url, codigos_ies=CODIGOS_IES_PADRAO, headers=None, tamanho_chunk=TAMANHO_CHUNK_PADRAO,
+                        ano=None, colunas=None, esquema=None):
+    """
+    Versão remota de filtrar_zip_por_ies: usa requisições HTTP Range para ler
+    apenas o diretório central e o membro de dados do zip, descompactando-o em
+    streaming. Devolve (nome_do_membro, {co_ies: DataFrame}, bytes_baixados), ou
+    None se o servidor não aceitar Range (nesse caso, baixe o zip completo).
+    """
+    zip_ref = abrir_zip_remoto(url, headers=headers)
+    if zip_ref is None:
+        return None
+    with zip_ref:
+        membro, dfs = _filtrar_membro_dados(zip_ref, codigos_ies, tamanho_chunk, ano, colunas, esquema)
+        return membro, dfs, zip_ref.fp.bytes_baixados
+
+
+HEADERS_DOWNLOAD = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36'
+}
+
+
+def coletar_links_censo(anos):
+    """
+    Devolve {ano: link_de_download} para cada ano de `anos` que tiver link
+    publicado. Usa o catálogo em cache / parse estático da página
+    (resolvedor_links) e só abre o Selenium para os anos que não forem achados.
+    """
+    anos = [str(ano) for ano in anos]
+    catalogo = resolver_links_censo()
+    if any(ano not in catalogo for ano in anos):
+        # Catálogo possivelmente desatualizado: relê a página antes de apelar para o navegador
+        catalogo = resolver_links_censo(forcar=True)
+
+    links = {ano: catalogo[ano] for ano in anos if ano in catalogo}
+    for ano, link in links.items():
+        print(f"Link encontrado para {ano}: {link}")
+
+    anos_faltando = [ano for ano in anos if ano not in links]
+    if anos_faltando:
+        print(f"Parse estático não encontrou {', '.join(anos_faltando)}. Tentando com o Selenium...")
+        links.update(coletar_links_censo_selenium(anos_faltando))
+    return links
+
+
+def coletar_links_censo_selenium(anos):
+    """
+    Abre a página do Censo uma única vez com Selenium e devolve um dicionário
+    {ano: link_de_download} para cada ano de `anos` que tiver link publicado.
+    """
+    # Importações do Selenium (só necessárias neste fallback)
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from webdriver_manager.chrome import ChromeDriverManager
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
+
+    print("Iniciando Selenium para encontrar o(s) link(s) de download...")
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--log-level=3")
     chrome_options.add_argument("--start-maximized")
     service = ChromeService(ChromeDriverManager().install())
     driver = webdriver.Chrome(service=service, options=chrome_options)
-    
-    link_para_baixar = None
+
+    links = {}
 
     try:
-        url_base = "https://www.gov.br/inep/pt-br/acesso-a-informacao/dados-abertos/microdados/censo-da-educacao-superior"
-        driver.get(url_base)
+        driver.get(URL_BASE_CENSO)
         wait = WebDriverWait(driver, 20)
         
         try:
@@ -69,158 +206,402 @@ def baixar_censo_superior_ufrj():
             time.sleep(2)
         except TimeoutException:
             print("Banner de cookies não foi encontrado, prosseguindo.")
-        
-        print(f"Procurando diretamente pelo link de download para o ano de {ano_desejado}...")
+
+        # Espera a lista de links aparecer uma vez; depois cada ano é só uma consulta ao DOM
+        seletor_lista = "//a[contains(text(), 'Microdados do Censo da Educação Superior')]"
         try:
+            wait.until(EC.presence_of_element_located((By.XPATH, seletor_lista)))
+        except TimeoutException:
+            pass
 
+        for ano in anos:
+            print(f"Procurando diretamente pelo link de download para o ano de {ano}...")
             # O seletor procura por um link <a> que contenha ambos os textos no seu conteúdo.
-            seletor_link = f"//a[contains(text(), 'Microdados do Censo da Educação Superior') and contains(text(), '{ano_desejado}')]"
-            
-            # Espera até que o link esteja presente no DOM da página
-            link_element = wait.until(EC.presence_of_element_located((By.XPATH, seletor_link)))
-            
-            link_para_baixar = link_element.get_attribute('href')
-            print(f"Link encontrado: {link_para_baixar}")
-            
-        except TimeoutException:
-            print(f"ERRO: Não foi possível encontrar o link de download para o ano de {ano_desejado}.")
+            seletor_link = f"//a[contains(text(), 'Microdados do Censo da Educação Superior') and contains(text(), '{ano}')]"
+            elementos = driver.find_elements(By.XPATH, seletor_link)
+            if elementos:
+                links[ano] = elementos[0].get_attribute('href')
+                print(f"Link encontrado: {links[ano]}")
+            else:
+                print(f"ERRO: Não foi possível encontrar o link de download para o ano de {ano}.")
+
+        if not links:
             # Se mesmo assim falhar, os arquivos de diagnóstico serão úteis novamente.
             driver.save_screenshot("debug_screenshot.png")
             with open("debug_page_source.html", "w", encoding="utf-8") as f:
                 f.write(driver.page_source)
 
     finally:
-        print("Coleta de link finalizada. Fechando o navegador.")
+        print("Coleta de links finalizada. Fechando o navegador.")
         driver.quit()
 
-    # --- Parte 3: Download, Processamento e Limpeza (sem alterações) ---
-    if not link_para_baixar:
-        print("\nNenhum link de download foi coletado. Processo encerrado.")
-        if os.path.isdir(pasta_raiz_temporaria):
-            shutil.rmtree(pasta_raiz_temporaria, ignore_errors=True)
-        return
+    return links
 
-    nome_arquivo_zip = os.path.basename(link_para_baixar)
-    caminho_zip = os.path.join(pasta_raiz_temporaria, nome_arquivo_zip)
-    
-    print(f"\n--- Processando Arquivo: {nome_arquivo_zip} ---")
-    
-    try:
-        # 1. Download
-        sucesso_download = False
-        for tentativa in range(3):
+
+def localizar_zip_censo(link, headers=None, conexoes=CONEXOES_PADRAO):
+    """
+    Decide de onde o zip de um ano será lido e devolve (origem, caminho):
+    ('local', caminho_no_cache) se o zip já estiver no cache de downloads (só
+    revalidado com o servidor), se `conexoes` > 1 (download segmentado em
+    paralelo) ou se o servidor não aceitar Range (download completo e
+    retomável); ('remoto', link) para leitura parcial via Range em uma conexão.
+
+    O arquivo de microdados é quase todo o zip, então a leitura parcial
+    economiza pouco; com várias conexões, baixar o zip inteiro é mais rápido
+    e ele fica no cache para as próximas execuções.
+    """
+    if consultar_cache(link):
+        print("   Zip encontrado no cache local. Revalidando com o servidor...")
+        return 'local', obter_arquivo(link, headers=headers, conexoes=conexoes)
+    if conexoes > 1:
+        return 'local', obter_arquivo(link, headers=headers, conexoes=conexoes)
+    if verificar_suporte_range(link, headers=headers) is not None:
+        return 'remoto', link
+    print("   Servidor não aceita Range. Baixando o arquivo completo...")
+    caminho_zip = obter_arquivo(link, headers=headers, conexoes=conexoes)
+    print("   Download concluído com sucesso!")
+    return 'local', caminho_zip
+
+
+def _localizar_medindo(ano, link, headers, conexoes):
+    """localizar_zip_censo registrado como a etapa 'baixar' do ano."""
+    with medir_etapa('baixar', 'censo', ano) as medicao:
+        origem, caminho = localizar_zip_censo(link, headers=headers, conexoes=conexoes)
+        medicao['origem'] = origem
+        if origem == 'local':
+            medicao['bytes'] = (consultar_cache(link) or {}).get('bytes_ultima_execucao')
+    return origem, caminho
+
+
+def filtrar_zip_censo(origem, caminho, headers=None, codigos_ies=CODIGOS_IES_PADRAO, ano=None, colunas=None,
+                      esquema=None):
+    """Filtra as IES a partir do que localizar_zip_censo devolveu: (membro, {co_ies: DataFrame})."""
+    if origem == 'remoto':
+        resultado = filtrar_url_por_ies(caminho, codigos_ies=codigos_ies, headers=headers, ano=ano, colunas=colunas,
+                                        esquema=esquema)
+        if resultado is None:
+            raise Exception("O servidor deixou de aceitar Range durante a leitura.")
+        membro, dfs, bytes_baixados = resultado
+        print(f"   Leitura parcial concluída: {bytes_baixados / 1024 ** 2:.1f} MB transferidos.")
+        # Os bytes chegam durante a leitura, cujo tempo já está na etapa 'ler'
+        registrar_etapa('baixar', None, 'censo', ano, bytes=bytes_baixados, origem='remoto')
+        return membro, dfs
+    return filtrar_zip_por_ies(caminho, codigos_ies=codigos_ies, ano=ano, colunas=colunas, esquema=esquema)
+
+
+def caminho_csv_censo(ano, co_ies, pasta_base='.'):
+    """Ex: DADOS_ES_UFRJ/censo_es_ufrj/UFRJ_CENSO_2022.csv"""
+    return os.path.join(pasta_saida_ies(co_ies, 'censo_es', pasta_base), f"{sigla_ies(co_ies)}_CENSO_{ano}.csv")
+
+
+def caminhos_saida_censo(ano, co_ies, formatos=FORMATOS_SAIDA_PADRAO, pasta_base='.'):
+    """{formato: caminho} das saídas de uma IES em um ano."""
+    caminhos = {
+        'csv': caminho_csv_censo(ano, co_ies, pasta_base),
+        'parquet': caminho_particao(co_ies, 'censo', ano, pasta_base),
+    }
+    return {formato: caminhos[formato] for formato in formatos_disponiveis(formatos)}
+
+
+def salvar_saida_censo(ano, co_ies, df_ies, pasta_base='.', formatos=FORMATOS_SAIDA_PADRAO, metadados=None):
+    """
+    Grava o recorte de uma IES em um ano (CSV e/ou partição Parquet, conforme
+    `formatos`) e devolve o número de registros salvos.
+    """
+    sigla = sigla_ies(co_ies)
+    if df_ies.empty:
+        print(f"   AVISO [{ano}]: Nenhum dado encontrado para a {sigla} (CO_IES {co_ies}) neste arquivo.")
+        return 0
+    for formato, caminho in caminhos_saida_censo(ano, co_ies, formatos, pasta_base).items():
+        with medir_etapa('gravar', 'censo', ano, co_ies=co_ies, formato=formato) as medicao:
+            if formato == 'csv':
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                df_ies.to_csv(caminho, index=False, encoding='utf-8-sig')
+            else:
+                salvar_particao(df_ies, co_ies, 'censo', ano, metadados=metadados, pasta_base=pasta_base)
+            medicao['linhas_mantidas'] = len(df_ies)
+            medicao['bytes'] = os.path.getsize(caminho)
+        print(f"   SUCESSO [{ano}]: {len(df_ies)} registros da {sigla} salvos em '{caminho}'")
+    return len(df_ies)
+
+
+def salvar_saidas_censo(ano, dfs, pasta_base='.', formatos=FORMATOS_SAIDA_PADRAO, metadados=None):
+    """Grava as saídas de cada IES e devolve {co_ies: registros salvos}."""
+    return {co_ies: salvar_saida_censo(ano, co_ies, df_ies, pasta_base, formatos, metadados)
+            for co_ies, df_ies in dfs.items()}
+
+
+def registrar_saidas_censo(ano, link, registros, headers=None, pasta_base='.', colunas=None, origem=None,
+                           formatos=FORMATOS_SAIDA_PADRAO):
+    """
+    Registra no manifesto de cada IES as saídas de um ano recém-processado.
+    `origem` (metadados_origem) pode vir de quem já consultou o servidor.
+    """
+    if origem is None:
+        origem = metadados_origem(link, headers=headers)
+    for co_ies, linhas in registros.items():
+        for formato, caminho in caminhos_saida_censo(ano, co_ies, formatos, pasta_base).items():
+            registrar_saida(co_ies, caminho, 'censo', ano, link, origem, VERSAO_EXTRATOR_CENSO, linhas,
+                            colunas=colunas, pasta_base=pasta_base, formato=formato)
+
+
+def _metadados_particao(link, colunas):
+    return {'url': link, 'versao_extrator': VERSAO_EXTRATOR_CENSO, 'colunas': sorted(colunas) if colunas else None}
+
+
+def processar_ano_censo(ano, link_para_baixar, headers=None, codigos_ies=CODIGOS_IES_PADRAO, pasta_base='.',
+                        colunas=None, formatos=FORMATOS_SAIDA_PADRAO, conexoes=CONEXOES_PADRAO):
+    """
+    Download (cache local, parcial via Range, ou completo como fallback),
+    filtro das IES e gravação de um CSV por IES para um único ano. O arquivo
+    nacional é lido uma só vez, qualquer que seja o número de IES. Nada é
+    extraído para o disco. Os tipos das colunas vêm do dicionário de dados e
+    `colunas` restringe a leitura a um subconjunto (None = todas). `formatos`
+    escolhe entre CSV e Parquet particionado por ano (padrão: os dois) e
+    `conexoes` o número de conexões do download (1 = leitura parcial via Range).
+    Exceções são propagadas para quem chamou. Devolve {co_ies: registros salvos}.
+    """
+    codigos_ies = normalizar_codigos_ies(codigos_ies)
+    print(f"\n--- Processando Arquivo: {os.path.basename(link_para_baixar)} ---")
+
+    # 1. Localizar o zip: cache de downloads, leitura parcial via Range ou download completo
+    print("1. Localizando o arquivo (cache local, leitura parcial ou download completo)...")
+    origem, caminho = _localizar_medindo(ano, link_para_baixar, headers, conexoes)
+
+    # 2. Ler o arquivo de dados em streaming direto do zip, sem extrair
+    print(f"2. Lendo em blocos e filtrando dados das IES (CO_IES em {list(codigos_ies)})...")
+    membro, dfs = filtrar_zip_censo(origem, caminho, headers=headers, codigos_ies=codigos_ies, ano=ano, colunas=colunas)
+    print(f"   Arquivo de dados lido: {os.path.basename(membro)}")
+
+    # 3. Salvar e registrar no manifesto
+    print("3. Salvando...")
+    registros = salvar_saidas_censo(ano, dfs, pasta_base, formatos, _metadados_particao(link_para_baixar, colunas))
+    registrar_saidas_censo(ano, link_para_baixar, registros, headers=headers, pasta_base=pasta_base, colunas=colunas,
+                           formatos=formatos)
+    return registros
+
+
+# --- Modo em lote (vários anos) ---
+
+def _preparar_ano_lote(ano, link, headers, conexoes):
+    """
+    Etapa de rede do modo em lote (roda numa thread). Com conexoes=1 e um
+    servidor que aceite Range, não baixa nada aqui: a leitura parcial
+    acontece no processo de filtro.
+    """
+    print(f"   [{ano}] Localizando '{os.path.basename(link)}'...")
+    return _localizar_medindo(ano, link, headers, conexoes)
+
+
+def _filtrar_ano_lote(ano, link, origem, caminho, headers, codigos_ies, pasta_base, colunas, formatos, esquema):
+    """
+    Etapa de CPU do modo em lote (roda num processo separado). Devolve os
+    registros salvos e as métricas das etapas, emitidas pelo processo principal.
+    """
+    with coletar_metricas() as registros_metricas:
+        dfs = filtrar_zip_censo(origem, caminho, headers=headers, codigos_ies=codigos_ies, ano=ano, colunas=colunas,
+                                esquema=esquema)[1]
+        registros = salvar_saidas_censo(ano, dfs, pasta_base, formatos, _metadados_particao(link, colunas))
+    return registros, registros_metricas
+
+
+def baixar_censo_superior_lote(ano_inicial, ano_final, max_downloads=4, max_processos=None,
+                               headers=None, codigos_ies=CODIGOS_IES_PADRAO, pasta_base='.', colunas=None,
+                               formatos=FORMATOS_SAIDA_PADRAO, conexoes=CONEXOES_PADRAO):
+    """
+    Reconstrói vários anos de uma vez: coleta todos os links numa única visita
+    à página, baixa em paralelo num pool de threads limitado a `max_downloads`
+    (cada um em até `conexoes` conexões) e filtra num pool de processos. Cada
+    ano tem a sua própria entrada no cache de downloads e falha de forma
+    independente.
+    Devolve {ano: {co_ies: registros salvos} ou exceção}.
+    """
+    anos = [str(ano) for ano in range(int(ano_inicial), int(ano_final) + 1)]
+    if not anos:
+        raise Exception(f"Intervalo de anos vazio: {ano_inicial} a {ano_final}.")
+
+    print(f"Iniciando processo em lote para os anos {anos[0]} a {anos[-1]}...")
+    with medir_etapa('descobrir', 'censo', f'{anos[0]}-{anos[-1]}') as medicao:
+        links = coletar_links_censo(anos)
+        medicao['itens'] = len(links)
+    resultados = {ano: Exception("Link de download não encontrado.") for ano in anos if ano not in links}
+    resultados.update(processar_anos_censo_lote(
+        links, max_downloads=max_downloads, max_processos=max_processos, headers=headers,
+        codigos_ies=codigos_ies, pasta_base=pasta_base, colunas=colunas, formatos=formatos, conexoes=conexoes,
+    ))
+    imprimir_resumo_lote(anos, resultados)
+    atualizar_paineis(normalizar_codigos_ies(codigos_ies), pasta_base, formatos)
+    return resultados
+
+
+def processar_anos_censo_lote(links, max_downloads=4, max_processos=None, headers=None,
+                              codigos_ies=CODIGOS_IES_PADRAO, pasta_base='.', colunas=None, origens=None,
+                              formatos=FORMATOS_SAIDA_PADRAO, conexoes=CONEXOES_PADRAO):
+    """
+    Núcleo do modo em lote para links já conhecidos ({ano: url}): downloads
+    num pool de threads, filtro num pool de processos e registro no manifesto
+    (feito aqui, no processo principal). `origens` ({ano: metadados_origem})
+    evita consultar o servidor de novo. Devolve {ano: {co_ies: registros} ou exceção}.
+    """
+    headers = headers or HEADERS_DOWNLOAD
+    codigos_ies = normalizar_codigos_ies(codigos_ies)
+    origens = origens or {}
+    resultados = {}
+    # Carregado (e, se preciso, compilado) uma vez aqui e enviado aos processos de filtro
+    esquema = carregar_esquema()
+
+    with ThreadPoolExecutor(max_workers=max_downloads) as pool_downloads, \
+            ProcessPoolExecutor(max_workers=max_processos) as pool_filtros:
+        futuros_download = {
+            pool_downloads.submit(_preparar_ano_lote, ano, link, headers, conexoes): ano
+            for ano, link in links.items()
+        }
+
+        futuros_filtro = {}
+        for futuro in as_completed(futuros_download):
+            ano = futuros_download[futuro]
             try:
-                with requests.get(link_para_baixar, stream=True, headers=headers_download, timeout=120) as r:
-                    r.raise_for_status()
-                    with open(caminho_zip, 'wb') as f:
-                        for chunk in r.iter_content(chunk_size=8192): f.write(chunk)
-                print("1. Download concluído com sucesso!")
-                sucesso_download = True
-                break
-            except requests.exceptions.RequestException as e:
-                print(f"   FALHA no download (tentativa {tentativa + 1}/3): {e}")
-                if tentativa < 2: time.sleep(10)
-        
-        if not sucesso_download:
-            raise Exception("Não foi possível baixar o arquivo após 3 tentativas.")
-
-        # 2. Descompactar
-        print(f"2. Descompactando '{nome_arquivo_zip}'...")
-        with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
-            zip_ref.extractall(pasta_raiz_temporaria)
-
-        # 3. Encontrar o arquivo de DADOS
-        print("3. Procurando pelo arquivo de dados principal...")
-        preferencias = [
-            "CADASTRO_CURSOS",  # quero este primeiro
-            "CURSOS"
-        ]
-
-        arquivos_encontrados = []
-        for subfolder_name in ['dados', 'DADOS', 'microdados', 'MICRODADOS']:
-            for extension in ['*.csv', '*.CSV']:
-                arquivos_encontrados.extend(
-                    glob.glob(os.path.join(pasta_raiz_temporaria, '**', subfolder_name, extension), recursive=True)
-                )
-
-        # ordenar pela prioridade
-        caminho_dados = None
-        for preferencia in preferencias:
-            for arquivo in arquivos_encontrados:
-                if preferencia in os.path.basename(arquivo).upper():
-                    caminho_dados = arquivo
-                    break
-            if caminho_dados:
-                break
-
-        if not caminho_dados and arquivos_encontrados:
-            caminho_dados = arquivos_encontrados[0]  # fallback
-            
-        if not caminho_dados:
-            raise Exception("Nenhum arquivo de dados (.csv) encontrado nas subpastas esperadas.")
-        
-        print(f"   Arquivo de dados encontrado: {os.path.basename(caminho_dados)}")
+                origem, caminho = futuro.result()
+            except Exception as e:
+                print(f"   ERRO [{ano}] no download: {e}")
+                resultados[ano] = e
+                continue
+            futuro_filtro = pool_filtros.submit(_filtrar_ano_lote, ano, links[ano], origem, caminho, headers,
+                                                codigos_ies, pasta_base, colunas, formatos, esquema)
+            futuros_filtro[futuro_filtro] = ano
 
-        # 4. Ler, Filtrar e Salvar
-        print("4. Lendo, filtrando dados da UFRJ (CO_IES == 586) e salvando...")
-        df = pd.read_csv(caminho_dados, sep=';', encoding='latin-1', low_memory=False)
-        
-        coluna_ies = next((col for col in df.columns if str(col).strip().upper() == 'CO_IES'), None)
-        
-        if not coluna_ies:
-            raise Exception(f"A coluna 'CO_IES' não foi encontrada. Colunas disponíveis: {df.columns.tolist()}")
+        for futuro in as_completed(futuros_filtro):
+            ano = futuros_filtro[futuro]
+            try:
+                resultados[ano], registros_metricas = futuro.result()
+                for registro in registros_metricas:
+                    emitir(registro)
+                registrar_saidas_censo(ano, links[ano], resultados[ano], headers=headers, pasta_base=pasta_base,
+                                       colunas=colunas, origem=origens.get(ano), formatos=formatos)
+            except Exception as e:
+                print(f"   ERRO [{ano}] no processamento: {e}")
+                resultados[ano] = e
 
-        ufrj_df = df[df[coluna_ies] == 586].copy()
+    return resultados
 
-        if ufrj_df.empty:
-            print("   AVISO: Nenhum dado encontrado para a UFRJ (CO_IES 586) neste arquivo.")
+
+def imprimir_resumo_lote(anos, resultados):
+    print("\nResumo do lote:")
+    for ano in anos:
+        resultado = resultados.get(ano)
+        if isinstance(resultado, Exception):
+            print(f"   {ano}: ERRO - {resultado}")
         else:
-            nome_csv_final = f"UFRJ_CENSO_{ano_desejado}.csv"
-            caminho_csv = os.path.join(pasta_csv_final, nome_csv_final)
-            ufrj_df.to_csv(caminho_csv, index=False, encoding='utf-8-sig')
-            print(f"   SUCESSO: {len(ufrj_df)} registros da UFRJ salvos em '{caminho_csv}'")
-    
-    except Exception as e:
-        print(f"   ERRO GERAL no processamento do arquivo: {e}")
+            registros = ', '.join(f"{sigla_ies(co_ies)}={n}" for co_ies, n in resultado.items())
+            print(f"   {ano}: {registros} registros")
 
-    finally:
-        print("5. Limpando a pasta de arquivos temporários...")
-        try:
-            del df, ufrj_df
-        except:
-            pass
-        gc.collect()
 
-        # tenta remover o zip antes
-        if os.path.exists(caminho_zip):
-            try:
-                os.remove(caminho_zip)
-            except PermissionError:
-                print("   Aviso: zip ainda em uso, ignorando...")
-
-        # remove a pasta temporária inteira
-        if os.path.isdir(pasta_raiz_temporaria):
-            for tentativa in range(5):
-                try:
-                    shutil.rmtree(pasta_raiz_temporaria)
-                    if not os.path.exists(pasta_raiz_temporaria):
-                        print(f"   Pasta temporária '{pasta_raiz_temporaria}' removida com sucesso.")
-                        break
-                except Exception as e:
-                    print(f"   Tentativa {tentativa+1}/5 falhou: {e}")
-                    time.sleep(3)
-            else:
-                # fallback: usar comando nativo do Windows
-                try:
-                    subprocess.run(["cmd", "/c", "rmdir", "/s", "/q", pasta_raiz_temporaria], check=True)
-                    if not os.path.exists(pasta_raiz_temporaria):
-                        print(f"   Pasta temporária '{pasta_raiz_temporaria}' removida via rmdir.")
-                    else:
-                        print(f"   ERRO FINAL: pasta '{pasta_raiz_temporaria}' ainda existe mesmo após rmdir.")
-                except Exception as e:
-                    print(f"   ERRO FINAL: não foi possível remover '{pasta_raiz_temporaria}': {e}")
+def sincronizar_censo(anos=None, codigos_ies=CODIGOS_IES_PADRAO, pasta_base='.', colunas=None, max_downloads=4,
+                      max_processos=None, headers=None, formatos=FORMATOS_SAIDA_PADRAO, conexoes=CONEXOES_PADRAO):
+    """
+    Sincronização incremental: compara o catálogo atual do INEP com o
+    manifesto de cada IES e processa só os anos novos ou alterados (link,
+    ETag, tamanho, versão do extrator, saída apagada ou formato ainda não
+    gerado). Cada ano custa um HEAD; quando nada mudou, nada é baixado.
+    `anos` restringe a busca a alguns anos (None = todos os anos publicados).
+    Com o Parquet habilitado, o painel de cursos (painel_cursos) é atualizado
+    nos anos processados. Devolve {ano: resultado} dos anos processados.
+    """
+    headers = headers or HEADERS_DOWNLOAD
+    codigos_ies = normalizar_codigos_ies(codigos_ies)
+    anos = {str(ano) for ano in anos} if anos else None
+
+    print("Sincronizando o Censo da Educação Superior com o catálogo do INEP...")
+    with medir_etapa('descobrir', 'censo', 'sync') as medicao:
+        links = resolver_links_censo(forcar=True)
+        medicao['itens'] = len(links)
+    if not links:
+        print("Não foi possível obter o catálogo de links. Nada foi alterado.")
+        return {}
+    if anos:
+        links = {ano: link for ano, link in links.items() if ano in anos}
+        if not links:
+            print(f"Nenhum dos anos pedidos ({', '.join(sorted(anos))}) está no catálogo. Nada foi alterado.")
+            return {}
+
+    pendentes, origens = {}, {}
+    for ano, link in sorted(links.items()):
+        origem = metadados_origem(link, headers=headers)
+        motivos = {}
+        for co_ies in codigos_ies:
+            motivo = motivo_reprocessamento(co_ies, 'censo', ano, link, origem, VERSAO_EXTRATOR_CENSO,
+                                            colunas=colunas, pasta_base=pasta_base,
+                                            formatos=formatos_disponiveis(formatos))
+            if motivo:
+                motivos[sigla_ies(co_ies)] = motivo
+        if motivos:
+            print(f"   [{ano}] será processado: {', '.join(f'{sigla}: {m}' for sigla, m in motivos.items())}")
+            pendentes[ano] = link
+            origens[ano] = origem
+
+    if not pendentes:
+        print(f"Tudo em dia: {len(links)} ano(s) já processados e inalterados.")
+        return {}
+
+    resultados = processar_anos_censo_lote(
+        pendentes, max_downloads=max_downloads, max_processos=max_processos, headers=headers,
+        codigos_ies=codigos_ies, pasta_base=pasta_base, colunas=colunas, origens=origens, formatos=formatos,
+        conexoes=conexoes,
+    )
+    imprimir_resumo_lote(sorted(pendentes), resultados)
+    atualizar_paineis(codigos_ies, pasta_base, formatos)
+    return resultados
+
+
+def baixar_censo_superior_ufrj(ano_desejado=None, codigos_ies=CODIGOS_IES_PADRAO):
+    """
+    Versão corrigida que busca o link de download diretamente, sem a necessidade
+    de cliques para expandir seções. Aceita um ano (ex: 2022) ou um intervalo
+    (ex: 2009-2024), que é processado no modo em lote. Se `ano_desejado` não
+    for informado, pergunta ao usuário. `codigos_ies` define as instituições
+    extraídas (por padrão, só a UFRJ).
+    """
+    # --- Parte 1: Entrada do Usuário ---
+    if ano_desejado is None:
+        ano_desejado = input("Digite o ano do Censo Superior que deseja baixar (ex: 2022, ou 2009-2024 para vários anos): ")
+    entrada = str(ano_desejado).strip()
+    partes = [parte.strip() for parte in entrada.split('-')]
+    if not all(parte.isdigit() and len(parte) == 4 for parte in partes) or len(partes) > 2 \
+            or int(partes[0]) > int(partes[-1]):
+        print("Entrada inválida. Por favor, digite um ano com 4 dígitos ou um intervalo (ex: 2009-2024).")
+        return
+
+    if len(partes) == 2:
+        baixar_censo_superior_lote(partes[0], partes[1], codigos_ies=codigos_ies)
+        print(f"\nProcesso concluído!")
+        return
+
+    ano_desejado = partes[0]
+    print(f"Iniciando processo para o Censo da Educação Superior de {ano_desejado}...")
+
+    # --- Parte 2: Coletar o link de download (catálogo, HTML estático ou Selenium) ---
+    with medir_etapa('descobrir', 'censo', ano_desejado) as medicao:
+        link_para_baixar = coletar_links_censo([ano_desejado]).get(ano_desejado)
+        medicao['itens'] = int(link_para_baixar is not None)
+
+    # --- Parte 3: Download, Processamento e Limpeza ---
+    if not link_para_baixar:
+        print("\nNenhum link de download foi coletado. Processo encerrado.")
+        return
+
+    try:
+        processar_ano_censo(ano_desejado, link_para_baixar, headers=HEADERS_DOWNLOAD, codigos_ies=codigos_ies)
+        atualizar_paineis(normalizar_codigos_ies(codigos_ies))
+    except Exception as e:
+        print(f"   ERRO GERAL no processamento do arquivo: {e}")
 
     print(f"\nProcesso concluído!")
 
 if __name__ == "__main__":
-    baixar_censo_superior_ufrj()
\ No newline at end of file
+    # `python update_censo.py sync` processa só os anos novos ou alterados
+    # DEXINEP_METRICAS=arquivo.jsonl grava as métricas por etapa; DEXINEP_PERFIL=1 liga o perfil (ver metricas)
+    with perfil('censo'):
+        if sys.argv[1:] == ['sync']:
+            sincronizar_censo()
+        else:
+            baixar_censo_superior_ufrj()
\ No newline at end of file
@@ -1,48 +1,67 @@
 import os
+import sys
 import time
-import pandas as pd
-import requests
 import zipfile
-import glob
 import shutil
+import queue
+import threading
 from bs4 import BeautifulSoup
 
-# Importações do Selenium
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, ElementClickInterceptedException
-
-def baixar_e_processar_dados():
+from resolvedor_links import URL_BASE_TRAJETORIA, resolver_links_trajetoria, janela_trajetoria
+from cache_downloads import consultar_cache, obter_arquivo
+from instituicoes import (CODIGOS_IES_PADRAO, normalizar_codigos_ies, sigla_ies, pasta_saida_ies,
+                          separar_por_ies, encontrar_coluna_ies)
+from leitor_xlsx import ler_xlsx_filtrando_ies
+from manifesto import metadados_origem, metadados_do_cache, registrar_saidas, motivo_reprocessamento
+from armazenamento_colunar import FORMATOS_SAIDA_PADRAO, formatos_disponiveis, pasta_colunar_ies
+from armazem_coortes import incorporar_janela
+from painel_cursos import atualizar_paineis
+from metricas import medir_etapa, medir_memoria, registrar_etapa, perfil
+
+HEADERS_DOWNLOAD = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36'
+}
+
+# Versão da lógica de extração registrada no manifesto. Incremente quando uma
+# mudança alterar o conteúdo dos CSVs gerados, para que o sync os refaça.
+VERSAO_EXTRATOR_TRAJETORIA = 1
+
+def coletar_links_trajetoria(ano_final_desejado):
     """
-    Versão final que salva os CSVs na pasta correta (DADOS_ES_UFRJ/indicadores_trajetoria_ufrj)
-    e limpa os arquivos temporários.
+    Devolve o conjunto de links .zip das abas cujo ano final seja
+    `ano_final_desejado`. Usa o catálogo em cache / parse estático da página
+    (resolvedor_links) e só abre o Selenium se nada for encontrado.
     """
-    # --- Parte 1: Entrada do Usuário ---
-    ano_final_desejado = input("Digite o ano FINAL de acompanhamento (ano2, ex: 2024): ")
-    if not ano_final_desejado.isdigit() or len(ano_final_desejado) != 4:
-        print("Entrada inválida. Por favor, digite um ano com 4 dígitos.")
-        return
+    for forcar in (False, True):
+        catalogo = resolver_links_trajetoria(forcar=forcar)
+        links_para_baixar = set()
+        for janela, link in catalogo.items():
+            partes = janela.split('-')
+            if len(partes) == 2 and partes[1].strip() == ano_final_desejado:
+                print(f"Aba correspondente encontrada: '{janela}'")
+                links_para_baixar.add(link)
+        if links_para_baixar:
+            return links_para_baixar
 
-    print(f"Procurando por abas cujo ano final seja {ano_final_desejado}...")
-    
-    # Pasta para downloads temporários e extração (será criada e depois deletada)
-    pasta_raiz_temporaria = f"dados_inep_{ano_final_desejado}_temp"
-    os.makedirs(pasta_raiz_temporaria, exist_ok=True)
+    print("Parse estático não encontrou nenhuma aba correspondente. Tentando com o Selenium...")
+    return coletar_links_trajetoria_selenium(ano_final_desejado)
 
-    # --- CORREÇÃO: Define a pasta final fixa para os arquivos .csv, conforme sua estrutura ---
-    pasta_csv_final = os.path.join('DADOS_ES_UFRJ', 'indicadores_trajetoria_ufrj')
-    os.makedirs(pasta_csv_final, exist_ok=True) # Garante que a pasta exista
 
-    headers_download = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36'
-    }
+def coletar_links_trajetoria_selenium(ano_final_desejado):
+    """
+    Percorre o carrossel de abas da página com Selenium e devolve o conjunto
+    de links .zip das abas cujo ano final seja `ano_final_desejado`.
+    """
+    # Importações do Selenium (só necessárias neste fallback)
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from webdriver_manager.chrome import ChromeDriverManager
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, ElementClickInterceptedException
 
-    # --- Parte 2: Coletar links de todas as abas correspondentes ---
     print("Iniciando Selenium para encontrar os links...")
     chrome_options = Options()
     chrome_options.add_argument("--headless")
@@ -55,8 +74,7 @@ def baixar_e_processar_dados():
     textos_das_abas_alvo = set()
 
     try:
-        url_base = "https://www.gov.br/inep/pt-br/acesso-a-informacao/dados-abertos/indicadores-educacionais/indicadores-de-trajetoria-da-educacao-superior"
-        driver.get(url_base)
+        driver.get(URL_BASE_TRAJETORIA)
         wait = WebDriverWait(driver, 20)
         
         try:
@@ -113,6 +131,217 @@ def baixar_e_processar_dados():
         print("Coleta de links finalizada. Fechando o navegador.")
         driver.quit()
 
+    return links_para_baixar
+
+
+# --- Pipeline download -> extração -> leitura ---
+
+FIM_DA_FILA = object()
+
+
+def _iniciar_etapa(funcao, fila_entrada, fila_saida, n_trabalhadores, erros):
+    """
+    Sobe `n_trabalhadores` threads que consomem `fila_entrada`, aplicam
+    `funcao` e publicam o resultado em `fila_saida` (que, sendo limitada,
+    bloqueia a etapa quando a seguinte está atrasada). Um erro numa tarefa é
+    registrado em `erros` e só descarta aquela tarefa.
+    """
+    def trabalhador():
+        while True:
+            tarefa = fila_entrada.get()
+            if tarefa is FIM_DA_FILA:
+                fila_entrada.put(FIM_DA_FILA)  # avisa as outras threads da mesma etapa
+                return
+            try:
+                resultado = funcao(tarefa)
+            except Exception as e:
+                print(f"   ERRO [{tarefa['nome']}]: {e}")
+                erros[tarefa['nome']] = e
+                continue
+            if fila_saida is not None:
+                fila_saida.put(resultado)
+
+    threads = [threading.Thread(target=trabalhador, daemon=True) for _ in range(n_trabalhadores)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def processar_links_em_pipeline(links, pasta_raiz_temporaria, pastas_csv_finais, codigos_ies, headers,
+                                max_downloads=3, max_extracoes=1, max_leituras=1, max_extraidos=2,
+                                tamanho_filas=2, pasta_base='.', formatos=FORMATOS_SAIDA_PADRAO):
+    """
+    Processa os zips de trajetória em três etapas encadeadas por filas
+    limitadas, para que o download do arquivo N+1 aconteça enquanto o
+    arquivo N é lido:
+
+    1. download (até `max_downloads` em paralelo, via cache de downloads);
+    2. extração só do .xlsx (até `max_extracoes` em paralelo);
+    3. leitura, filtro e gravação dos CSVs (até `max_leituras` em paralelo).
+
+    No máximo `max_extraidos` planilhas ficam extraídas em disco ao mesmo
+    tempo: a extração espera uma vaga, liberada quando a leitura termina e
+    apaga a pasta temporária. Cada saída (CSV e/ou armazém de coortes em
+    Parquet, conforme `formatos`) é registrada no manifesto da IES.
+    Devolve {nome_do_zip: exceção} das falhas.
+    """
+    vagas_em_disco = threading.BoundedSemaphore(max_extraidos)
+    formatos = formatos_disponiveis(formatos)
+    erros = {}
+
+    def liberar_pasta(tarefa):
+        shutil.rmtree(tarefa['pasta_temporaria'], ignore_errors=True)
+        if tarefa.pop('ocupa_vaga', False):
+            vagas_em_disco.release()
+
+    def baixar(tarefa):
+        # 1. Download (cache local com revalidação e retomada de downloads interrompidos)
+        with medir_etapa('baixar', 'trajetoria', tarefa['nome']) as medicao:
+            tarefa['caminho_zip'] = obter_arquivo(tarefa['link'], headers=headers, timeout=45)
+            medicao['bytes'] = (consultar_cache(tarefa['link']) or {}).get('bytes_ultima_execucao')
+        print(f"   [{tarefa['nome']}] 1. Download concluído com sucesso!")
+        return tarefa
+
+    def extrair(tarefa):
+        # 2. Descompactar só a planilha, respeitando o limite de arquivos extraídos em disco
+        vagas_em_disco.acquire()
+        tarefa['ocupa_vaga'] = True
+        try:
+            with medir_etapa('extrair', 'trajetoria', tarefa['nome']) as medicao, \
+                    zipfile.ZipFile(tarefa['caminho_zip'], 'r') as zip_ref:
+                arquivos_xlsx = [nome for nome in zip_ref.namelist() if nome.lower().endswith('.xlsx')]
+                if not arquivos_xlsx:
+                    raise Exception("Nenhum arquivo .xlsx encontrado no zip.")
+                os.makedirs(tarefa['pasta_temporaria'], exist_ok=True)
+                tarefa['caminho_xlsx'] = zip_ref.extract(arquivos_xlsx[0], tarefa['pasta_temporaria'])
+                medicao['bytes'] = os.path.getsize(tarefa['caminho_xlsx'])
+        except Exception:
+            liberar_pasta(tarefa)
+            raise
+        print(f"   [{tarefa['nome']}] 2. Planilha extraída: {os.path.basename(tarefa['caminho_xlsx'])}")
+        return tarefa
+
+    def ler_e_salvar(tarefa):
+        # 3. Ler em streaming, filtrar as IES e salvar; a pasta temporária é apagada em seguida
+        try:
+            # O leitor da planilha e o filtro das linhas rodam no mesmo laço: o tempo do leitor é medido à parte
+            leitura = {}
+            cronometro = time.perf_counter()
+            with medir_memoria() as memoria:
+                filtrado = ler_xlsx_filtrando_ies(tarefa['caminho_xlsx'], codigos_ies, leitura=leitura)
+            registrar_etapa('ler', leitura['segundos'], 'trajetoria', tarefa['nome'],
+                            bytes=os.path.getsize(tarefa['caminho_xlsx']), linhas_lidas=leitura['itens'], **memoria)
+            registrar_etapa('filtrar', time.perf_counter() - cronometro - leitura['segundos'], 'trajetoria',
+                            tarefa['nome'], linhas_lidas=leitura['itens'], linhas_mantidas=len(filtrado), **memoria)
+            coluna_ies = encontrar_coluna_ies(filtrado.columns)
+            nome_base = os.path.splitext(os.path.basename(tarefa['caminho_xlsx']))[0]
+
+            origem = metadados_do_cache(tarefa['link'])
+            janela = janela_trajetoria(tarefa['link']) or janela_trajetoria(nome_base + '.zip') or nome_base
+
+            for co_ies, df_ies in separar_por_ies(filtrado, coluna_ies, codigos_ies).items():
+                sigla = sigla_ies(co_ies)
+                if df_ies.empty:
+                    print(f"   AVISO [{tarefa['nome']}]: Nenhum dado encontrado para a {sigla} (CO_IES {co_ies}) neste arquivo.")
+                saidas = []
+                for formato in formatos:
+                    if formato == 'csv':
+                        caminho_csv = os.path.join(pastas_csv_finais[co_ies], f"{sigla}_{nome_base}.csv")
+                        if not df_ies.empty:
+                            # Salva o CSV na pasta final correta
+                            with medir_etapa('gravar', 'trajetoria', tarefa['nome'], co_ies=co_ies, formato=formato) as medicao:
+                                df_ies.to_csv(caminho_csv, index=False, encoding='utf-8-sig')
+                                medicao['linhas_mantidas'] = len(df_ies)
+                                medicao['bytes'] = os.path.getsize(caminho_csv)
+                            print(f"   SUCESSO [{tarefa['nome']}]: {len(df_ies)} registros da {sigla} salvos em '{caminho_csv}'")
+                        saidas.append({'caminho': caminho_csv, 'formato': formato, 'linhas': len(df_ies)})
+                    elif formato == 'parquet':
+                        particoes = []
+                        if not df_ies.empty:
+                            # Parquet: upsert no armazém de coortes, sem duplicar o que outras janelas já trouxeram
+                            with medir_etapa('gravar', 'trajetoria', tarefa['nome'], co_ies=co_ies, formato=formato) as medicao:
+                                estatisticas, particoes = incorporar_janela(df_ies, janela, co_ies, pasta_base, metadados={
+                                    'versao_extrator': VERSAO_EXTRATOR_TRAJETORIA,
+                                })
+                                medicao['linhas_mantidas'] = len(df_ies)
+                                medicao['bytes'] = sum(os.path.getsize(particao) for particao in particoes)
+                            print(f"   SUCESSO [{tarefa['nome']}]: janela {janela} da {sigla} incorporada ao armazém de coortes "
+                                  f"({estatisticas['novas']} novas, {estatisticas['identicas']} idênticas, "
+                                  f"{estatisticas['revisadas']} revisadas)")
+                        # Uma entrada por janela, com todas as partições (coortes) que ela gravou
+                        saidas.append({
+                            'caminho': os.path.join(pasta_colunar_ies(co_ies, 'trajetoria', pasta_base), f'janela={janela}'),
+                            'formato': formato,
+                            'linhas': len(df_ies),
+                            'particoes': particoes,
+                        })
+                # Só depois de todos os formatos: uma falha no meio não deixa a janela registrada pela metade
+                registrar_saidas(co_ies, saidas, 'trajetoria', janela, tarefa['link'], origem,
+                                 VERSAO_EXTRATOR_TRAJETORIA, pasta_base=pasta_base)
+        finally:
+            liberar_pasta(tarefa)
+
+    filas = [queue.Queue(maxsize=tamanho_filas) for _ in range(3)]
+    etapas = [(baixar, max_downloads), (extrair, max_extracoes), (ler_e_salvar, max_leituras)]
+    threads_por_etapa = [
+        _iniciar_etapa(funcao, filas[i], filas[i + 1] if i + 1 < len(filas) else None, n, erros)
+        for i, (funcao, n) in enumerate(etapas)
+    ]
+
+    for link in sorted(links):
+        nome_arquivo_zip = os.path.basename(link)
+        filas[0].put({
+            'link': link,
+            'nome': nome_arquivo_zip,
+            'pasta_temporaria': os.path.join(pasta_raiz_temporaria, os.path.splitext(nome_arquivo_zip)[0]),
+        })
+
+    # Encerra as etapas em ordem: cada uma só recebe o fim depois que a anterior esvaziou
+    for fila, threads in zip(filas, threads_por_etapa):
+        fila.put(FIM_DA_FILA)
+        for thread in threads:
+            thread.join()
+
+    return erros
+
+
+def baixar_e_processar_dados(ano_final_desejado=None, codigos_ies=CODIGOS_IES_PADRAO, pasta_base='.',
+                             max_downloads=3, max_extracoes=1, max_leituras=1, max_extraidos=2,
+                             formatos=FORMATOS_SAIDA_PADRAO):
+    """
+    Versão final que salva os CSVs na pasta correta (DADOS_ES_UFRJ/indicadores_trajetoria_ufrj)
+    e limpa os arquivos temporários. Cada planilha nacional é lida uma única vez e
+    gera um CSV por instituição de `codigos_ies` (por padrão, só a UFRJ). Se
+    `ano_final_desejado` não for informado, pergunta ao usuário. Os parâmetros
+    max_* configuram o pipeline (ver processar_links_em_pipeline) e `formatos`
+    escolhe entre CSV e o armazém de coortes em Parquet (padrão: os dois).
+    """
+    codigos_ies = normalizar_codigos_ies(codigos_ies)
+
+    # --- Parte 1: Entrada do Usuário ---
+    if ano_final_desejado is None:
+        ano_final_desejado = input("Digite o ano FINAL de acompanhamento (ano2, ex: 2024): ")
+    ano_final_desejado = str(ano_final_desejado).strip()
+    if not ano_final_desejado.isdigit() or len(ano_final_desejado) != 4:
+        print("Entrada inválida. Por favor, digite um ano com 4 dígitos.")
+        return
+
+    print(f"Procurando por abas cujo ano final seja {ano_final_desejado}...")
+    
+    # Pasta para downloads temporários e extração (será criada e depois deletada)
+    pasta_raiz_temporaria = os.path.join(pasta_base, f"dados_inep_{ano_final_desejado}_temp")
+    os.makedirs(pasta_raiz_temporaria, exist_ok=True)
+
+    # Pastas finais dos arquivos .csv, uma por IES (para a UFRJ: DADOS_ES_UFRJ/indicadores_trajetoria_ufrj)
+    pastas_csv_finais = {co_ies: pasta_saida_ies(co_ies, 'indicadores_trajetoria', pasta_base) for co_ies in codigos_ies}
+    for pasta_csv_final in pastas_csv_finais.values():
+        os.makedirs(pasta_csv_final, exist_ok=True) # Garante que a pasta exista
+
+    # --- Parte 2: Coletar links de todas as abas correspondentes ---
+    with medir_etapa('descobrir', 'trajetoria', ano_final_desejado) as medicao:
+        links_para_baixar = coletar_links_trajetoria(ano_final_desejado)
+        medicao['itens'] = len(links_para_baixar)
+
     # --- Parte 3: Download, Processamento e Limpeza ---
     if not links_para_baixar:
         print("\nNenhum link de download foi coletado. Processo encerrado.")
@@ -122,92 +351,12 @@ def baixar_e_processar_dados():
         return
 
     print(f"\nIniciando o download e processamento de {len(links_para_baixar)} arquivos...")
-    
-    for i, link_arquivo in enumerate(sorted(list(links_para_baixar))):
-        nome_arquivo_zip = os.path.basename(link_arquivo)
-        caminho_zip = os.path.join(pasta_raiz_temporaria, nome_arquivo_zip)
-        
-        nome_subpasta_temp = os.path.splitext(nome_arquivo_zip)[0]
-        pasta_temporaria = os.path.join(pasta_raiz_temporaria, nome_subpasta_temp)
-        os.makedirs(pasta_temporaria, exist_ok=True)
-        
-        print(f"\n--- Processando Arquivo [{i+1}/{len(links_para_baixar)}]: {nome_arquivo_zip} ---")
-        
-        try:
-            # 1. Download
-            sucesso_download = False
-            for tentativa in range(3):
-                try:
-                    with requests.get(link_arquivo, stream=True, headers=headers_download, timeout=45) as r:
-                        r.raise_for_status()
-                        with open(caminho_zip, 'wb') as f:
-                            for chunk in r.iter_content(chunk_size=8192): f.write(chunk)
-                    print("1. Download concluído com sucesso!")
-                    sucesso_download = True
-                    break
-                except requests.exceptions.RequestException as e:
-                    print(f"   FALHA no download (tentativa {tentativa + 1}/3): {e}")
-                    if tentativa < 2: time.sleep(5)
-            
-            if not sucesso_download:
-                print(f"   ERRO FINAL: Não foi possível baixar o arquivo. Pulando para o próximo.")
-                continue
-
-            # 2. Descompactar
-            print(f"2. Descompactando em '{pasta_temporaria}'...")
-            with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
-                zip_ref.extractall(pasta_temporaria)
-
-            # 3. Encontrar .xlsx
-            print("3. Procurando pelo arquivo .xlsx...")
-            arquivos_xlsx = glob.glob(os.path.join(pasta_temporaria, '**', '*.xlsx'), recursive=True)
-            if not arquivos_xlsx:
-                print("   ERRO: Nenhum arquivo .xlsx encontrado na subpasta.")
-                continue
-            caminho_xlsx = arquivos_xlsx[0]
-            print(f"   Arquivo encontrado: {os.path.basename(caminho_xlsx)}")
-
-            # 4. Ler, Filtrar e Salvar
-            print("4. Lendo, filtrando dados da UFRJ e salvando em .csv...")
-            df = pd.read_excel(caminho_xlsx, skiprows=8)
-            coluna_ies = None
-            for col in df.columns:
-                if str(col).strip().upper() == 'CO_IES':
-                    coluna_ies = col
-                    break
-            
-            if not coluna_ies:
-                print(f"   ERRO: A coluna 'CO_IES' não foi encontrada.")
-                print(f"   Colunas disponíveis: {df.columns.tolist()}")
-                continue
-
-            ufrj_df = df[df[coluna_ies] == 586].copy()
-
-            if ufrj_df.empty:
-                print("   AVISO: Nenhum dado encontrado para a UFRJ (CO_IES 586) neste arquivo.")
-            else:
-                nome_base = os.path.splitext(os.path.basename(caminho_xlsx))[0]
-                nome_csv = f"UFRJ_{nome_base}.csv"
-                # Salva o CSV na pasta final correta
-                caminho_csv = os.path.join(pasta_csv_final, nome_csv)
-                ufrj_df.to_csv(caminho_csv, index=False, encoding='utf-8-sig')
-                print(f"   SUCESSO: {len(ufrj_df)} registros da UFRJ salvos em '{caminho_csv}'")
-        
-        except Exception as e:
-            print(f"   ERRO GERAL no processamento do arquivo: {e}")
-
-        # 5. Limpeza dos arquivos temporários individuais
-        finally:
-            print("5. Limpando arquivos temporários do processamento atual...")
-            try:
-                if os.path.exists(caminho_zip):
-                    os.remove(caminho_zip)
-                    print(f"   Arquivo .zip '{nome_arquivo_zip}' deletado.")
-                if os.path.exists(pasta_temporaria):
-                    shutil.rmtree(pasta_temporaria)
-                    print(f"   Pasta temporária '{os.path.basename(pasta_temporaria)}' deletada.")
-            except OSError as e:
-                print(f"   ERRO durante a limpeza: {e}")
+    processar_links_em_pipeline(
+        links_para_baixar, pasta_raiz_temporaria, pastas_csv_finais, codigos_ies, HEADERS_DOWNLOAD,
+        max_downloads=max_downloads, max_extracoes=max_extracoes, max_leituras=max_leituras,
+        max_extraidos=max_extraidos, pasta_base=pasta_base, formatos=formatos,
+    )
+    atualizar_paineis(codigos_ies, pasta_base, formatos)
 
     # Limpeza final da pasta raiz temporária, que agora deve estar vazia
     try:
@@ -218,7 +367,72 @@ def baixar_e_processar_dados():
         print(f"   Aviso: não foi possível remover a pasta temporária principal. {e}")
 
 
-    print(f"\nProcesso concluído! Arquivos CSV finais salvos em '{pasta_csv_final}'.")
+    print(f"\nProcesso concluído! Arquivos CSV finais salvos em {', '.join(repr(p) for p in pastas_csv_finais.values())}.")
+
+def sincronizar_trajetoria(anos_finais=None, codigos_ies=CODIGOS_IES_PADRAO, pasta_base='.',
+                           max_downloads=3, max_extracoes=1, max_leituras=1, max_extraidos=2,
+                           formatos=FORMATOS_SAIDA_PADRAO):
+    """
+    Sincronização incremental: compara o catálogo atual do INEP com o
+    manifesto de cada IES e processa só as janelas novas ou alteradas (ex: uma
+    aba 2021-2025 recém-publicada). `anos_finais` restringe a busca a alguns
+    anos finais (None = todas as janelas publicadas). Com o Parquet
+    habilitado, o painel de cursos (painel_cursos) é atualizado nos anos de
+    referência das janelas processadas. Devolve {nome_do_zip: exceção} das falhas.
+    """
+    codigos_ies = normalizar_codigos_ies(codigos_ies)
+    anos_finais = {str(ano) for ano in anos_finais} if anos_finais else None
+
+    print("Sincronizando os indicadores de trajetória com o catálogo do INEP...")
+    with medir_etapa('descobrir', 'trajetoria', 'sync') as medicao:
+        links = resolver_links_trajetoria(forcar=True)
+        medicao['itens'] = len(links)
+    if anos_finais:
+        links = {janela: link for janela, link in links.items() if janela.split('-')[1] in anos_finais}
+    if not links:
+        print("Nenhuma janela encontrada no catálogo. Nada foi alterado.")
+        return {}
+
+    pendentes = []
+    for janela, link in sorted(links.items()):
+        origem = metadados_origem(link, headers=HEADERS_DOWNLOAD)
+        motivos = {}
+        for co_ies in codigos_ies:
+            motivo = motivo_reprocessamento(co_ies, 'trajetoria', janela, link, origem, VERSAO_EXTRATOR_TRAJETORIA,
+                                            pasta_base=pasta_base, formatos=formatos_disponiveis(formatos))
+            if motivo:
+                motivos[sigla_ies(co_ies)] = motivo
+        if motivos:
+            print(f"   [{janela}] será processada: {', '.join(f'{sigla}: {m}' for sigla, m in motivos.items())}")
+            pendentes.append(link)
+
+    if not pendentes:
+        print(f"Tudo em dia: {len(links)} janela(s) já processadas e inalteradas.")
+        return {}
+
+    pasta_raiz_temporaria = os.path.join(pasta_base, "dados_inep_sync_temp")
+    pastas_csv_finais = {co_ies: pasta_saida_ies(co_ies, 'indicadores_trajetoria', pasta_base) for co_ies in codigos_ies}
+    for pasta in [pasta_raiz_temporaria, *pastas_csv_finais.values()]:
+        os.makedirs(pasta, exist_ok=True)
+    try:
+        erros = processar_links_em_pipeline(
+            pendentes, pasta_raiz_temporaria, pastas_csv_finais, codigos_ies, HEADERS_DOWNLOAD,
+            max_downloads=max_downloads, max_extracoes=max_extracoes, max_leituras=max_leituras,
+            max_extraidos=max_extraidos, pasta_base=pasta_base, formatos=formatos,
+        )
+    finally:
+        shutil.rmtree(pasta_raiz_temporaria, ignore_errors=True)
+
+    atualizar_paineis(codigos_ies, pasta_base, formatos)
+    print(f"\nSincronização concluída: {len(pendentes) - len(erros)} de {len(pendentes)} janela(s) processadas.")
+    return erros
+
 
 if __name__ == "__main__":
-    baixar_e_processar_dados()
\ No newline at end of file
+    # `python update_trajetoria.py sync` processa só as janelas novas ou alteradas
+    # DEXINEP_METRICAS=arquivo.jsonl grava as métricas por etapa; DEXINEP_PERFIL=1 liga o perfil (ver metricas)
+    with perfil('trajetoria'):
+        if sys.argv[1:] == ['sync']:
+            sincronizar_trajetoria()
+        else:
+            baixar_e_processar_dados()
\ No newline at end of file
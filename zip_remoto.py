@@ -0,0 +1,137 @@
+import io
+import time
+import zipfile
+import requests
+
+# Tamanho mínimo de cada requisição com Range (leituras menores são agrupadas)
+TAMANHO_BLOCO_PADRAO = 4 * 1024 * 1024
+
+
+def verificar_suporte_range(url, headers=None, sessao=None, timeout=60):
+    """
+    Pede apenas o primeiro byte do arquivo. Se o servidor responder 206 com um
+    Content-Range válido, devolve o tamanho total do arquivo; caso contrário
+    (servidor ignora Range, erro de rede etc.) devolve None.
+    """
+    sessao = sessao or requests.Session()
+    cabecalhos = dict(headers or {})
+    cabecalhos['Range'] = 'bytes=0-0'
+    try:
+        with sessao.get(url, headers=cabecalhos, stream=True, timeout=timeout) as r:
+            if r.status_code != 206:
+                return None
+            content_range = r.headers.get('Content-Range', '')
+    except requests.exceptions.RequestException:
+        return None
+
+    # Formato esperado: "bytes 0-0/123456"
+    total = content_range.rsplit('/', 1)[-1]
+    return int(total) if total.isdigit() else None
+
+
+class ArquivoRemoto(io.RawIOBase):
+    """
+    Objeto tipo arquivo, somente leitura e com seek, sobre uma URL HTTP.
+    Cada leitura que não está no buffer vira uma requisição com Range de pelo
+    menos `tamanho_bloco` bytes, de forma que o zipfile consegue ler o diretório
+    central e um único membro sem baixar o arquivo inteiro.
+    """
+
+    def __init__(self, url, tamanho, headers=None, sessao=None,
+                 tamanho_bloco=TAMANHO_BLOCO_PADRAO, timeout=120, tentativas=3):
+        super().__init__()
+        self.url = url
+        self.tamanho = tamanho
+        self.headers = dict(headers or {})
+        self.sessao = sessao or requests.Session()
+        self.tamanho_bloco = tamanho_bloco
+        self.timeout = timeout
+        self.tentativas = tentativas
+
+        self.posicao = 0
+        self._buffer = b''
+        self._inicio_buffer = 0
+
+        # Estatísticas, úteis para conferir quanto foi realmente transferido
+        self.bytes_baixados = 0
+        self.requisicoes = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.posicao
+
+    def seek(self, deslocamento, origem=io.SEEK_SET):
+        if origem == io.SEEK_SET:
+            nova_posicao = deslocamento
+        elif origem == io.SEEK_CUR:
+            nova_posicao = self.posicao + deslocamento
+        elif origem == io.SEEK_END:
+            nova_posicao = self.tamanho + deslocamento
+        else:
+            raise ValueError(f"Origem de seek inválida: {origem}")
+        if nova_posicao < 0:
+            raise ValueError("Posição negativa no seek.")
+        self.posicao = nova_posicao
+        return self.posicao
+
+    def _baixar_intervalo(self, inicio, fim):
+        """Baixa os bytes [inicio, fim) com uma requisição Range."""
+        cabecalhos = dict(self.headers)
+        cabecalhos['Range'] = f'bytes={inicio}-{fim - 1}'
+        for tentativa in range(self.tentativas):
+            try:
+                with self.sessao.get(self.url, headers=cabecalhos, timeout=self.timeout) as r:
+                    r.raise_for_status()
+                    if r.status_code != 206:
+                        raise Exception("O servidor ignorou o cabeçalho Range.")
+                    dados = r.content
+                self.requisicoes += 1
+                self.bytes_baixados += len(dados)
+                return dados
+            except requests.exceptions.RequestException as e:
+                print(f"   FALHA ao ler intervalo {inicio}-{fim - 1} (tentativa {tentativa + 1}/{self.tentativas}): {e}")
+                if tentativa < self.tentativas - 1:
+                    time.sleep(5)
+        raise Exception(f"Não foi possível ler o intervalo {inicio}-{fim - 1} após {self.tentativas} tentativas.")
+
+    def read(self, n=-1):
+        if self.posicao >= self.tamanho:
+            return b''
+        if n is None or n < 0:
+            n = self.tamanho - self.posicao
+        fim = min(self.posicao + n, self.tamanho)
+
+        fim_buffer = self._inicio_buffer + len(self._buffer)
+        if not (self._inicio_buffer <= self.posicao and fim <= fim_buffer):
+            fim_requisicao = min(max(fim, self.posicao + self.tamanho_bloco), self.tamanho)
+            self._buffer = self._baixar_intervalo(self.posicao, fim_requisicao)
+            self._inicio_buffer = self.posicao
+
+        inicio_relativo = self.posicao - self._inicio_buffer
+        dados = self._buffer[inicio_relativo:inicio_relativo + (fim - self.posicao)]
+        self.posicao += len(dados)
+        return dados
+
+    def readinto(self, b):
+        dados = self.read(len(b))
+        b[:len(dados)] = dados
+        return len(dados)
+
+
+def abrir_zip_remoto(url, headers=None, sessao=None, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+    """
+    Abre um zip remoto sem baixá-lo. Devolve um zipfile.ZipFile cujo arquivo
+    subjacente é um ArquivoRemoto (acessível em `zip_ref.fp`), ou None se o
+    servidor não aceitar requisições com Range.
+    """
+    sessao = sessao or requests.Session()
+    tamanho = verificar_suporte_range(url, headers=headers, sessao=sessao)
+    if tamanho is None:
+        return None
+    arquivo = ArquivoRemoto(url, tamanho, headers=headers, sessao=sessao, tamanho_bloco=tamanho_bloco)
+    return zipfile.ZipFile(arquivo, 'r')